@@ -18,8 +18,8 @@ class SubjectAdmin(admin.ModelAdmin):
 
 @admin.register(Class)
 class ClassAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name')  # Show 'id' and 'name' in the admin list view
-    search_fields = ('name',)  # Enable searching by the 'name' field
+    list_display = ('id', 'name', 'cohort')  # Show 'id', 'name' and 'cohort' in the admin list view
+    search_fields = ('name', 'cohort')  # Enable searching by name or cohort
 
 
 @admin.register(ClassSubject)
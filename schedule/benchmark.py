@@ -0,0 +1,143 @@
+"""
+Synthetic colleges and a benchmark runner for `SchedulingService`.
+
+`build_college` fills the database with a seeded random instance described by a `CollegeSpec`; `run_benchmark`
+generates a timetable for it and measures wall time, database queries, peak Python memory and how many
+lectures were placed. The `benchmark_scheduler` management command runs the presets on a throwaway database
+and appends the results to a JSON Lines file.
+"""
+import random
+import tracemalloc
+from typing import Dict, List, NamedTuple, Optional
+
+from .metrics import RunMetrics
+from .models import (DAYS_PER_WEEK, HOURS_PER_DAY, Class, ClassroomOccupancy, ClassroomType, Classrooms, ClassSubject,
+                     Schedule, Subject, Teacher)
+from .scheduler import SchedulingService
+
+
+class CollegeSpec(NamedTuple):
+    classes: int
+    teachers: int
+    subjects: int
+    halls: int  # Lecture halls
+    labs: int
+    lab_share: float = 0.25  # Share of subjects that are 2 hour lab sessions
+    hours_per_class: int = 24  # Lecture hours each class is given per week
+    unavailability: float = 0.1  # Share of each teacher's week marked unavailable
+    departments: int = 1  # Parts sharing no teacher, subject or room type, each with its share of the above
+
+
+PRESETS = {
+    'small': CollegeSpec(classes=10, teachers=10, subjects=8, halls=6, labs=3),
+    'medium': CollegeSpec(classes=60, teachers=60, subjects=30, halls=35, labs=16),
+    'large': CollegeSpec(classes=250, teachers=250, subjects=100, halls=140, labs=65),
+    'departments': CollegeSpec(classes=250, teachers=250, subjects=100, halls=140, labs=65, departments=5),
+}
+
+
+def clear_college():
+    """Delete every row the scheduler reads or writes."""
+    for model in (Schedule, ClassroomOccupancy, ClassSubject, Subject, Class, Teacher, Classrooms, ClassroomType):
+        model.objects.all().delete()
+
+
+def build_college(spec: CollegeSpec, seed: int = 0) -> int:
+    """Create a random college matching `spec`. Returns the number of lectures to place."""
+    rng = random.Random(seed)
+    return sum(_build_department(spec, rng, department) for department in range(spec.departments))
+
+
+def _build_department(spec: CollegeSpec, rng: random.Random, department: int) -> int:
+    """Create department `department` of the college: its share of every count in `spec`."""
+    def share(total):
+        return range(total * department // spec.departments, total * (department + 1) // spec.departments)
+
+    suffix = f" {department}" if spec.departments > 1 else ""
+    hall_type = ClassroomType.objects.create(name=f"Lecture Hall{suffix}")
+    lab_type = ClassroomType.objects.create(name=f"Lab{suffix}")
+    Classrooms.objects.bulk_create(
+        [Classrooms(classroom_type=hall_type, classroom_name=f"LH-{i}") for i in share(spec.halls)]
+        + [Classrooms(classroom_type=lab_type, classroom_name=f"LAB-{i}") for i in share(spec.labs)])
+
+    week_hours = DAYS_PER_WEEK * HOURS_PER_DAY
+    # One `Teacher.unavailable` bit per hour of the week
+    teachers = Teacher.objects.bulk_create([
+        Teacher(name=f"Teacher {i}", unavailable=sum(
+            1 << bit for bit in rng.sample(range(week_hours), int(week_hours * spec.unavailability))))
+        for i in share(spec.teachers)])
+
+    subject_ids = share(spec.subjects)
+    labs = spec.subjects * spec.lab_share
+    subjects = Subject.objects.bulk_create([
+        Subject(name=f"Lab {i}", subject_code=f"L{i}", duration=2, classroom_type=lab_type)
+        if i - subject_ids.start < labs / spec.departments else
+        Subject(name=f"Subject {i}", subject_code=f"S{i}", duration=1, classroom_type=hall_type)
+        for i in subject_ids])
+    classes = Class.objects.bulk_create([Class(name=f"Class {i}") for i in share(spec.classes)])
+
+    # Every class takes random subjects until its weekly hours are filled, each from the least loaded teacher
+    load = {teacher.id: 0 for teacher in teachers}
+    class_subjects = []
+    lectures = 0
+    for class_object in classes:
+        hours = 0
+        for subject in rng.sample(subjects, len(subjects)):
+            if hours >= spec.hours_per_class:
+                break
+            number = min(rng.randint(1, 4), DAYS_PER_WEEK, -(-(spec.hours_per_class - hours) // subject.duration))
+            teacher_id = min(load, key=lambda teacher_id: (load[teacher_id], rng.random()))
+            load[teacher_id] += number * subject.duration
+            hours += number * subject.duration
+            lectures += number
+            class_subjects.append(ClassSubject(class_name=class_object, subject=subject, teacher_id=teacher_id,
+                                               number_of_lectures=number))
+    ClassSubject.objects.bulk_create(class_subjects, batch_size=500)
+    return lectures
+
+
+def run_benchmark(name: str, spec: CollegeSpec, seed: int = 0, solver: Optional[str] = None,
+                  repeat: int = 1) -> Dict:
+    """
+    Build the college and time `generate_timetable` on it `repeat` times, then run it once more under
+    `tracemalloc` for the peak memory, which would otherwise slow the timed runs down.
+    """
+    clear_college()
+    lectures = build_college(spec, seed)
+
+    runs: List[Dict] = []
+    for _ in range(repeat):
+        service = SchedulingService(solver=solver, seed=seed)
+        metrics = RunMetrics()
+        with metrics.phase('generate'):
+            service.generate_timetable()
+        placed = service.metrics.counters['placed']
+        runs.append({
+            'wall_time': metrics.timings['generate'],
+            'queries': metrics.counters['db_queries.generate'],
+            'timings': dict(service.timings),
+            'placed': placed,
+            'placement_rate': placed / lectures if lectures else 1.0,
+            'score': list(service.score),
+        })
+
+    tracemalloc.start()
+    try:
+        SchedulingService(solver=solver, seed=seed).generate_timetable()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best = min(runs, key=lambda run: run['wall_time'])
+    return {
+        'preset': name,
+        'spec': spec._asdict(),
+        'seed': seed,
+        'solver': service.solver,
+        'lectures': lectures,
+        'wall_time': best['wall_time'],
+        'queries': best['queries'],
+        'peak_memory': peak_memory,
+        'placement_rate': best['placement_rate'],
+        'runs': runs,
+    }
@@ -0,0 +1,105 @@
+"""
+Slots booked by hand into the published timetable.
+
+Bookings are checked and written with optimistic locking, so concurrent requests never both take an hour.
+A booking reads the teacher's and the class's `booking_revision`, checks their hours for clashes without
+holding any lock, then writes in a short transaction that first bumps both revisions with conditional
+UPDATEs: `SET booking_revision = booking_revision + 1 WHERE booking_revision = <read>`. An UPDATE that matches
+no row means another booking for the same teacher or class committed in between, so the check is repeated
+against the new state. Room bookings need no revision, as `ClassroomOccupancyManager.book` sets the hour bits
+in one conditional UPDATE.
+
+Like generated lectures, a booking is stored as one 1 hour `Schedule` row per hour, and it is refused at hours the
+teacher is unavailable or the class has its break (see `schedule.breaks`).
+"""
+import logging
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from .breaks import BreakPolicy
+from .models import (FIRST_HOUR, HOURS_PER_DAY, POINTER_ID, Class, ClassSubject, PublishedTimetable, Schedule,
+                     SlotTaken, Teacher, hour_mask, published_version_id)
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5  # Checks repeated after losing a race, before giving up with `SlotTaken`
+
+
+def _revisions(class_subject: ClassSubject):
+    """(booking revision, unavailable hours) of the teacher and (booking revision, cohort) of the class."""
+    teacher = Teacher.objects.filter(pk=class_subject.teacher_id).values_list('booking_revision', 'unavailable').get()
+    class_ = Class.objects.filter(pk=class_subject.class_name_id).values_list('booking_revision', 'cohort').get()
+    return teacher, class_
+
+
+def _claim(model, pk, revision) -> bool:
+    """Bump the revision of one teacher or class, unless it moved on since it was read."""
+    return bool(model.objects.filter(pk=pk, booking_revision=revision)
+                .update(booking_revision=F('booking_revision') + 1))
+
+
+def clash(class_subject: ClassSubject, version_id: int, day: int, hour: int, duration: int):
+    """The first row of the version the teacher or the class of `class_subject` has in the hours asked for."""
+    return (Schedule.all_versions
+            .filter(version_id=version_id, day=day, hour__gte=hour, hour__lt=hour + duration)
+            .filter(Q(class_subject__teacher_id=class_subject.teacher_id)
+                    | Q(class_subject__class_name_id=class_subject.class_name_id)
+                    | Q(class_object_id=class_subject.class_name_id))
+            .order_by('hour').only('hour').first())
+
+
+def closed_hours(class_subject: ClassSubject, unavailable: int, cohort: str, day: int, hour: int,
+                 duration: int) -> Optional[str]:
+    """Why the hours asked for are closed to `class_subject` whatever is booked, or None if they are not."""
+    mask = hour_mask(hour, duration)
+    if (unavailable >> (day * HOURS_PER_DAY)) & mask:
+        return f"{class_subject.teacher} is not available then on day {day}."
+    policy = BreakPolicy.from_setting(getattr(settings, 'SCHEDULE_BREAKS', {}))
+    if policy.masks(policy.group(class_subject.class_name_id, cohort), day + 1, FIRST_HOUR)[day] & mask:
+        return f"{class_subject.class_name} has its break then on day {day}."
+    return None
+
+
+def book_slot(class_subject: ClassSubject, day: int, hour: int, duration: int = 1) -> List[Schedule]:
+    """
+    Book `duration` hours from clock hour `hour` on `day` for `class_subject` in the published timetable, and
+    return their rows. Raises `SlotTaken` if its teacher or its class is busy or unavailable in any of them.
+    """
+    if hour < FIRST_HOUR or hour + duration > FIRST_HOUR + HOURS_PER_DAY:
+        raise ValueError("Hour must be between 9 and 16 (inclusive).")
+    for attempt in range(MAX_ATTEMPTS):
+        booked = _try_booking(class_subject, day, hour, duration)
+        if booked is not None:
+            return booked
+        logger.debug("Booking for class subject %d lost a race, attempt %d", class_subject.id, attempt + 1)
+    raise SlotTaken(f"{class_subject} is being booked concurrently, try again.")
+
+
+def _try_booking(class_subject: ClassSubject, day: int, hour: int, duration: int):
+    """
+    One optimistic attempt of `book_slot`: the new rows, or None if another booking or a publish committed first.
+    """
+    (teacher_revision, unavailable), (class_revision, cohort) = _revisions(class_subject)
+    closed = closed_hours(class_subject, unavailable, cohort, day, hour, duration)
+    if closed is not None:
+        raise SlotTaken(closed)
+    version_id = published_version_id()
+    taken = clash(class_subject, version_id, day, hour, duration)
+    if taken is not None:
+        raise SlotTaken(f"{class_subject} clashes with a booking at {taken.hour}:00 on day {day}.")
+    with transaction.atomic():
+        # Teachers before classes, so concurrent bookings take the row locks in the same order. The rows go into
+        # the version checked only if it is still the published one, not one a concurrent publish is archiving
+        if (_claim(Teacher, class_subject.teacher_id, teacher_revision)
+                and _claim(Class, class_subject.class_name_id, class_revision)
+                and PublishedTimetable.objects.select_for_update().filter(pk=POINTER_ID,
+                                                                           version_id=version_id).exists()):
+            return [Schedule.all_versions.create(
+                version_id=version_id, class_subject=class_subject, class_object_id=class_subject.class_name_id,
+                day=day, hour=hour + offset, duration=timedelta(hours=1)) for offset in range(duration)]
+        transaction.set_rollback(True)
+    return None
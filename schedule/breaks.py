@@ -0,0 +1,77 @@
+"""
+Break policies, compiled into the hours each class is kept free of lectures.
+
+A policy is a list of windows, each giving every class one break a day of `length` hours starting somewhere in
+the window. Where in the window is fixed up front rather than searched for: classes (or with `align='cohort'`,
+whole cohorts) are staggered over the possible starts and move one start along each day, so breaks spread evenly
+over the window instead of all classes leaving the same hours to the lectures. `SchedulingService` blocks the
+compiled masks like teacher availability; breaks are part of the policy, not of the stored timetable.
+"""
+import zlib
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .occupancy import span_mask
+
+ALIGNMENTS = ('class', 'cohort')
+
+
+class BreakWindow(NamedTuple):
+    start: int  # Clock hours: the break lies within [start, end)
+    end: int
+    length: int = 1
+
+
+class BreakPolicy(NamedTuple):
+    windows: Tuple[BreakWindow, ...] = (BreakWindow(11, 14),)  # One hour between 11 AM and 2 PM
+    align: str = 'class'  # 'class' staggers every class on its own, 'cohort' gives a cohort's classes one break
+
+    @classmethod
+    def from_setting(cls, value: Dict) -> 'BreakPolicy':
+        """The policy described by a `SCHEDULE_BREAKS` setting, e.g. {'windows': [(11, 14)], 'align': 'cohort'}."""
+        options = dict(value)
+        if 'windows' in options:
+            options['windows'] = tuple(BreakWindow(*window) for window in options['windows'])
+        policy = cls(**options)
+        policy.check()
+        return policy
+
+    def check(self, first_hour: int = 9, time_slots: int = 8):
+        """Raise `ValueError` unless every window fits in the day and has room for its break."""
+        if self.align not in ALIGNMENTS:
+            raise ValueError(f"Unknown break alignment '{self.align}', expected one of {', '.join(ALIGNMENTS)}.")
+        for window in self.windows:
+            if not (first_hour <= window.start and window.end <= first_hour + time_slots
+                    and 1 <= window.length <= window.end - window.start):
+                raise ValueError(f"Break window {tuple(window)} does not fit a day from {first_hour}:00 to "
+                                 f"{first_hour + time_slots}:00.")
+
+    def group(self, class_id: int, cohort: Optional[str] = None) -> int:
+        """Number the class is staggered by: its own id, or that of its cohort when breaks are aligned by cohort."""
+        if self.align == 'cohort' and cohort:
+            return zlib.crc32(cohort.encode())  # Stable across processes, unlike `hash`
+        return class_id
+
+    def breaks(self, group: int, day: int, first_hour: int = 9) -> List[Tuple[int, int]]:
+        """(hour index, length) of each break of stagger `group` on `day`."""
+        starts = []
+        for window in self.windows:
+            choices = window.end - window.start - window.length + 1
+            starts.append((window.start - first_hour + (group + day) % choices, window.length))
+        return starts
+
+    def masks(self, group: int, num_days: int, first_hour: int = 9) -> List[int]:
+        """Hours kept free by breaks, one bitmask per day as in `Occupancy`."""
+        days = []
+        for day in range(num_days):
+            mask = 0
+            for time, length in self.breaks(group, day, first_hour):
+                mask |= span_mask(time, length)
+            days.append(mask)
+        return days
+
+
+def compile_breaks(policy: BreakPolicy, classes: Sequence[Tuple[Hashable, int, Optional[str]]],
+                   num_days: int, first_hour: int = 9) -> Dict[Hashable, List[int]]:
+    """Break masks of `classes`, given as (name, id, cohort), by name."""
+    return {name: policy.masks(policy.group(class_id, cohort), num_days, first_hour)
+            for name, class_id, cohort in classes}
@@ -0,0 +1,208 @@
+"""
+Streaming timetable exports in CSV, iCalendar and XLSX.
+
+Rows come from one joined `Schedule` query read with `.iterator()`, are merged into lectures on the fly (a
+2 hour lab is stored as two 1 hour rows) and are encoded chunk by chunk, so memory stays flat however large
+the timetable and the first bytes go out as soon as the query returns. XLSX is written with `zipfile` into
+a stream, without a spreadsheet library.
+"""
+import csv
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Iterator, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+from .queries import timetable_rows
+
+CHUNK_SIZE = 2000
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+COLUMNS = ['Day', 'Start', 'End', 'Class', 'Subject', 'Teacher', 'Classroom']
+
+
+class ExportLecture(NamedTuple):
+    day: int
+    start: int  # Clock hours
+    end: int
+    class_id: int
+    class_name: str
+    class_subject_id: Optional[int]  # None for a recess
+    subject: str
+    teacher: str
+    classroom: str
+
+    def columns(self):
+        return [DAY_NAMES[self.day], f'{self.start}:00', f'{self.end}:00', self.class_name, self.subject,
+                self.teacher, self.classroom]
+
+
+def export_lectures(**filters) -> Iterator[ExportLecture]:
+    """
+    Stored lectures and recesses matching `filters`, with consecutive hours of the same lecture merged. Rows
+    arrive ordered by day and hour, so only the lectures running in the current hour are held in memory.
+    """
+    running = {}  # (class, class subject, classroom) -> lecture still running at the current hour
+    current = None
+    rows = timetable_rows(**filters).iterator(chunk_size=CHUNK_SIZE)
+    for (day, hour, class_id, class_name, class_subject_id, subject, _, teacher, classroom_id,
+         classroom) in rows:
+        if (day, hour) != current:
+            # Lectures that did not continue into this hour are complete
+            for key in [key for key, lecture in running.items() if lecture.day != day or lecture.end < hour]:
+                yield running.pop(key)
+            current = (day, hour)
+
+        key = (class_id, class_subject_id, classroom_id)
+        lecture = running.get(key)
+        if lecture and lecture.day == day and lecture.end == hour:
+            running[key] = lecture._replace(end=hour + 1)
+            continue
+        if lecture:
+            yield running.pop(key)
+        running[key] = ExportLecture(day, hour, hour + 1, class_id, class_name, class_subject_id,
+                                     subject or 'Recess', teacher or '', classroom or '')
+    yield from running.values()
+
+
+class _Echo:
+    """File-like object that hands back what is written to it, for writers that expect a file."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(lectures: Iterable[ExportLecture]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for lecture in lectures:
+        yield writer.writerow(lecture.columns())
+
+
+def _ics_text(value: str) -> str:
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_line(line: str) -> str:
+    """Fold a content line at 75 octets as RFC 5545 requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74  # Continuation lines start with a space
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1  # Never split a UTF-8 sequence
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def ics_stream(lectures: Iterable[ExportLecture], week_of: date) -> Iterator[str]:
+    """One weekly recurring VEVENT per lecture, starting in the week of `week_of`. Recesses are left out."""
+    monday = week_of - timedelta(days=week_of.weekday())
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(_ics_line(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Timetable Scheduler//Timetable//EN', 'CALSCALE:GREGORIAN'))
+    for lecture in lectures:
+        if lecture.class_subject_id is None:
+            continue
+        day = monday + timedelta(days=lecture.day)
+        yield ''.join(_ics_line(line) for line in (
+            'BEGIN:VEVENT',
+            f'UID:{lecture.class_id}-{lecture.class_subject_id}-{lecture.day}-{lecture.start}@timetable',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{day:%Y%m%d}T{lecture.start:02d}0000',
+            f'DTEND:{day:%Y%m%d}T{lecture.end:02d}0000',
+            'RRULE:FREQ=WEEKLY',
+            f'SUMMARY:{_ics_text(f"{lecture.subject} ({lecture.class_name})")}',
+            f'LOCATION:{_ics_text(lecture.classroom)}',
+            f'DESCRIPTION:{_ics_text(lecture.teacher)}',
+            'END:VEVENT',
+        ))
+    yield _ics_line('END:VCALENDAR')
+
+
+class _ZipSink:
+    """Unseekable file for `zipfile` that collects what is written until it is taken."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Timetable" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+
+def _xlsx_row(number: int, values) -> str:
+    cells = ''.join(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>' for value in values)
+    return f'<row r="{number}">{cells}</row>'
+
+
+def xlsx_stream(lectures: Iterable[ExportLecture], rows_per_chunk: int = 500) -> Iterator[bytes]:
+    """A one-sheet workbook with inline strings, zipped as it is written."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>' + _xlsx_row(1, COLUMNS).encode('utf-8'))
+            rows = []
+            for number, lecture in enumerate(lectures, start=2):
+                rows.append(_xlsx_row(number, lecture.columns()))
+                if len(rows) == rows_per_chunk:
+                    sheet.write(''.join(rows).encode('utf-8'))
+                    rows.clear()
+                    yield sink.take()
+            sheet.write(''.join(rows).encode('utf-8') + b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ics': 'text/calendar',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
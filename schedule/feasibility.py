@@ -0,0 +1,126 @@
+"""
+Feasibility matrices for the placement phase, as boolean NumPy arrays.
+
+Teachers, classes and rooms each become a resources x days x hours array that is True where the hour is taken,
+unpacked from the bitmasks of an `Occupancy`. Rooms are stored grouped by classroom type, so the rooms of one
+type are a contiguous block of rows. The start hours at which a lecture fits are then found for every lecture
+at once: one OR of its teacher's and its class's rows, a sliding-window reduction over the hours for its
+duration, and an AND with the starts some room of its type can still serve. Results are packed back into
+bitmasks, which is what the solvers keep working with.
+"""
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .occupancy import Occupancy
+
+
+def busy_matrix(masks: Sequence[Sequence[int]], num_days: int, time_slots: int) -> np.ndarray:
+    """Rows of per-day hour bitmasks unpacked into a rows x days x hours boolean array."""
+    masks = np.asarray(masks, dtype=np.int64).reshape(len(masks), num_days)
+    return (masks[..., np.newaxis] >> np.arange(time_slots) & 1).astype(bool)
+
+
+def window_starts(free: np.ndarray, duration: int) -> np.ndarray:
+    """
+    Along the last axis, True at each hour from which `duration` consecutive hours are all free. The result is
+    `duration - 1` hours shorter than `free`. Lectures last an hour or two, so the window is reduced with one
+    shifted AND per extra hour, which is cheaper than a strided view at this size.
+    """
+    width = free.shape[-1] - duration + 1
+    if width <= 0:
+        return np.zeros(free.shape[:-1] + (0,), dtype=bool)
+    starts = free[..., :width].copy()
+    for offset in range(1, duration):
+        starts &= free[..., offset:offset + width]
+    return starts
+
+
+def pack(hours: np.ndarray) -> np.ndarray:
+    """Boolean hours along the last axis packed into bitmasks, bit `t` for hour index `t`."""
+    return (hours.astype(np.int64) << np.arange(hours.shape[-1])).sum(axis=-1)
+
+
+def popcount_table(time_slots: int) -> np.ndarray:
+    """Set bits of every hour bitmask of a day, for counting the bits of a whole array with one lookup."""
+    return np.array([bin(mask).count('1') for mask in range(1 << time_slots)], dtype=np.int64)
+
+
+class RoomMatrix:
+    """Room bookings of a run as a rooms x days x hours array, with the rooms of each type in adjacent rows."""
+
+    def __init__(self, rooms_by_type: Dict[Hashable, List[Hashable]], occupancy: Occupancy):
+        self.groups: Dict[Hashable, slice] = {}
+        self.rooms: List[Hashable] = []
+        for room_type, rooms in rooms_by_type.items():
+            self.groups[room_type] = slice(len(self.rooms), len(self.rooms) + len(rooms))
+            self.rooms.extend(rooms)
+        self.rows = {room: row for row, room in enumerate(self.rooms)}
+        self.busy = busy_matrix([[occupancy.room_busy(room, day) for day in range(occupancy.num_days)]
+                                 for room in self.rooms], occupancy.num_days, occupancy.time_slots)
+
+    def _group(self, room_type: Hashable) -> slice:
+        return self.groups.get(room_type, slice(0, 0))
+
+    def type_starts(self, room_type: Hashable, duration: int) -> np.ndarray:
+        """Days x start hours at which some room of `room_type` is free for `duration` hours."""
+        return window_starts(~self.busy[self._group(room_type)], duration).any(axis=0)
+
+    def day_starts(self, room_type: Hashable, day: int, duration: int) -> int:
+        """`type_starts` for a single day, as a bitmask."""
+        return int(pack(window_starts(~self.busy[self._group(room_type), day], duration).any(axis=0)))
+
+    def best_fit(self, room_type: Hashable, day: int, time: int, duration: int) -> Optional[Hashable]:
+        """
+        The busiest room of `room_type` that is free for `duration` hours from `time` on `day`, keeping whole
+        rooms free for longer lectures; ties go to the room listed first. None if every room is taken.
+        """
+        group = self._group(room_type)
+        busy = self.busy[group, day]
+        free = ~busy[:, time:time + duration].any(axis=1)
+        if not free.any():
+            return None
+        load = np.where(free, busy.sum(axis=1), -1)
+        return self.rooms[group.start + int(load.argmax())]
+
+    def book(self, room: Hashable, day: int, time: int, duration: int):
+        self.busy[self.rows[room], day, time:time + duration] = True
+
+
+def lecture_starts(lectures: Sequence, occupancy: Occupancy, rooms: RoomMatrix) -> np.ndarray:
+    """
+    The start hours each lecture can take, as a lectures x days array of bitmasks: its teacher and its class are
+    free for the whole lecture, the teacher does not already teach the class that day, and some room of its type
+    is free.
+    Lectures sharing a room type and duration are handled as one block of the teacher and class matrices.
+    """
+    num_days, time_slots = occupancy.num_days, occupancy.time_slots
+    if not lectures:
+        return np.zeros((0, num_days), dtype=np.int64)
+    teachers = {lecture.teacher: None for lecture in lectures}
+    classes = {lecture.class_name: None for lecture in lectures}
+    teacher_rows = {teacher: row for row, teacher in enumerate(teachers)}
+    class_rows = {class_name: row for row, class_name in enumerate(classes)}
+    teacher_busy = busy_matrix([[occupancy.teacher_busy(teacher, day) for day in range(num_days)]
+                                for teacher in teachers], num_days, time_slots)
+    class_busy = busy_matrix([[occupancy.class_busy(class_name, day) for day in range(num_days)]
+                              for class_name in classes], num_days, time_slots)
+
+    teacher_index = np.array([teacher_rows[lecture.teacher] for lecture in lectures])
+    class_index = np.array([class_rows[lecture.class_name] for lecture in lectures])
+    free = ~(teacher_busy[teacher_index] | class_busy[class_index])  # Lectures x days x hours
+    # A teacher who already teaches the class on a day cannot take it again that day
+    taught = np.array([[occupancy.has_teacher_class(day, lecture.teacher, lecture.class_name)
+                        for day in range(num_days)] for lecture in lectures], dtype=bool)
+
+    groups: Dict[Tuple[Hashable, int], List[int]] = {}
+    for index, lecture in enumerate(lectures):
+        groups.setdefault((lecture.room_type, lecture.duration), []).append(index)
+
+    domains = np.zeros((len(lectures), num_days), dtype=np.int64)
+    for (room_type, duration), members in groups.items():
+        members = np.array(members)
+        starts = window_starts(free[members], duration) & rooms.type_starts(room_type, duration)
+        starts &= ~taught[members][..., np.newaxis]
+        domains[members] = pack(starts)
+    return domains
@@ -0,0 +1,194 @@
+"""
+Bulk import of teachers, subjects, classes and class subjects from CSV or JSON Lines.
+
+Uploads are read line by line and handled in batches: every row is validated with its import serializer,
+related objects are resolved by name from lookup maps loaded once per import, and the valid rows of a batch
+are written with a single `bulk_create`. Invalid rows are reported with their row number and skipped; they
+never abort the rest of the import. The whole import runs in one transaction.
+"""
+import csv
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.db import connection, transaction
+
+from .models import Class, ClassroomType, ClassSubject, Subject, Teacher
+from .serializers import (ClassImportSerializer, ClassSubjectImportSerializer, SubjectImportSerializer,
+                          TeacherImportSerializer)
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_rows(lines: Iterable[bytes], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Yield (row number, row, parse error) for an upload in 'csv' (with a header line) or 'jsonl' format.
+    Rows are numbered from 1, not counting the CSV header or blank lines.
+    """
+    text = (line.decode('utf-8-sig') for line in lines)
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            if None in row:
+                yield number, None, "Row has more fields than the header."
+            else:
+                yield number, {key.strip(): value.strip() for key, value in row.items() if value is not None}, None
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, "Each line must be a JSON object."
+
+
+def name_map(queryset, field: str = 'name') -> Dict[str, Optional[int]]:
+    """{value of `field`: id}, with None for values shared by several rows."""
+    ids = {}
+    for pk, name in queryset.values_list('pk', field):
+        ids[name] = None if name in ids else pk
+    return ids
+
+
+def resolve(ids: Dict[str, Optional[int]], name: str, label: str) -> int:
+    pk = ids.get(name)
+    if pk is None:
+        raise LookupError(f"{label} '{name}' {'is ambiguous' if name in ids else 'does not exist'}.")
+    return pk
+
+
+class Importer:
+    serializer_class = None
+    model = None
+
+    def load_lookups(self):
+        """Load the lookup maps needed to resolve related objects, once per import."""
+
+    def build(self, data: dict):
+        """
+        Turn validated row data into an unsaved instance. Raises LookupError for unknown related objects or
+        names that are already taken.
+        """
+        return self.model(**data)
+
+
+class UniqueNameImporter(Importer):
+    """For models with a unique name, checked against every existing and imported name instead of per row."""
+
+    def load_lookups(self):
+        self.names = set(self.model.objects.values_list('name', flat=True))
+
+    def build(self, data):
+        if data['name'] in self.names:
+            raise LookupError(f"{self.model._meta.verbose_name.capitalize()} '{data['name']}' already exists.")
+        self.names.add(data['name'])
+        return self.model(**data)
+
+
+class TeacherImporter(UniqueNameImporter):
+    serializer_class = TeacherImportSerializer
+    model = Teacher
+
+
+class ClassImporter(UniqueNameImporter):
+    serializer_class = ClassImportSerializer
+    model = Class
+
+
+class SubjectImporter(Importer):
+    serializer_class = SubjectImportSerializer
+    model = Subject
+
+    def load_lookups(self):
+        self.classroom_types = name_map(ClassroomType.objects.all())
+
+    def build(self, data):
+        classroom_type_id = resolve(self.classroom_types, data.pop('classroom_type'), "Classroom type")
+        return Subject(classroom_type_id=classroom_type_id, **data)
+
+
+class ClassSubjectImporter(Importer):
+    serializer_class = ClassSubjectImportSerializer
+    model = ClassSubject
+
+    def load_lookups(self):
+        self.classes = name_map(Class.objects.all())
+        self.teachers = name_map(Teacher.objects.all())
+        self.subject_codes = name_map(Subject.objects.all(), 'subject_code')
+        self.subject_names = name_map(Subject.objects.all())
+
+    def build(self, data):
+        subject = data['subject']
+        ids = self.subject_codes if subject in self.subject_codes else self.subject_names
+        return ClassSubject(class_name_id=resolve(self.classes, data['class_name'], "Class"),
+                            subject_id=resolve(ids, subject, "Subject"),
+                            teacher_id=resolve(self.teachers, data['teacher'], "Teacher"),
+                            number_of_lectures=data['number_of_lectures'])
+
+
+IMPORTERS = {
+    'teachers': TeacherImporter,
+    'subjects': SubjectImporter,
+    'classes': ClassImporter,
+    'class-subjects': ClassSubjectImporter,
+}
+
+
+def import_rows(kind: str, rows: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+                batch_size: int = BATCH_SIZE) -> Dict:
+    """Import `rows` as produced by `read_rows`. Returns the number created and the per-row errors."""
+    importer = IMPORTERS[kind]()
+    created = 0
+    errors = []
+    error_count = 0
+
+    def fail(number, detail):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': number, 'errors': detail})
+
+    # One INSERT per batch: SQLite caps the parameters of a query, so wide rows get smaller batches
+    fields = [field for field in importer.model._meta.concrete_fields if not field.primary_key]
+    batch_size = min(batch_size, connection.ops.bulk_batch_size(fields, range(batch_size)))
+    rows = iter(rows)
+    with transaction.atomic():
+        importer.load_lookups()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            instances = []
+            for number, row, parse_error in batch:
+                if parse_error:
+                    fail(number, {'non_field_errors': [parse_error]})
+                    continue
+                serializer = importer.serializer_class(data=row)
+                if not serializer.is_valid():
+                    fail(number, serializer.errors)
+                    continue
+                try:
+                    instances.append(importer.build(dict(serializer.validated_data)))
+                except LookupError as e:
+                    fail(number, {'non_field_errors': [str(e.args[0])]})
+            importer.model.objects.bulk_create(instances)
+            created += len(instances)
+    return {'created': created, 'error_count': error_count, 'errors': errors}
+
+
+def upload_format(name: str = '', content_type: str = '') -> Optional[str]:
+    """'csv' or 'jsonl' from a file name or content type, or None if neither says."""
+    if name.endswith('.csv') or content_type.startswith('text/csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or content_type.startswith(('application/jsonl', 'application/x-ndjson')):
+        return 'jsonl'
+    return None
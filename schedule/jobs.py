@@ -0,0 +1,93 @@
+"""
+Background timetable generation.
+
+Jobs run on an in-process thread pool, so no broker is needed. The pool has a single worker by default
+(`SCHEDULE_JOB_WORKERS`): every generation replaces the whole timetable, so running them one after the
+other is what callers expect anyway.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import GenerationJob
+from .scheduler import SchedulingService
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'SCHEDULE_JOB_WORKERS', 1),
+                                           thread_name_prefix='timetable-job')
+    return _executor
+
+
+def enqueue_generation(num_days: int = 6, solver: Optional[str] = None, seed: Optional[int] = None,
+                       attempts: int = 1, time_budget: Optional[float] = None) -> GenerationJob:
+    """Create a job and hand it to the worker pool once the job row is committed."""
+    solver = SchedulingService(num_days, solver=solver).solver  # Raises ValueError for unknown solvers
+    job = GenerationJob.objects.create(num_days=num_days, solver=solver, seed=seed, attempts=attempts,
+                                       time_budget=time_budget)
+    transaction.on_commit(lambda: get_executor().submit(_work, job.id))
+    return job
+
+
+class ProgressReporter:
+    """Progress callback for the solver that writes to the job row at most every `interval` seconds."""
+
+    def __init__(self, job_id: int, interval: float = 0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.last_write = None
+
+    def __call__(self, placed: int, total: int):
+        now = monotonic()
+        if self.last_write is None or now - self.last_write >= self.interval:
+            self.last_write = now
+            GenerationJob.objects.filter(id=self.job_id).update(placed=placed, total=total)
+
+
+def run_generation_job(job_id: int):
+    """Worker entry point: run the job and record its outcome on the job row."""
+    job = GenerationJob.objects.get(id=job_id)
+    job.status = GenerationJob.Status.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+    try:
+        service = SchedulingService(job.num_days, solver=job.solver, seed=job.seed,
+                                    progress=ProgressReporter(job.id), attempts=job.attempts,
+                                    time_budget=job.time_budget)
+        result = service.run()
+        job.placed = len(result.placements)
+        job.total = len(result.placements) + len(result.unplaced)
+        job.timings = service.timings
+        job.counters = dict(service.metrics.counters)
+        job.unplaced = service.unplaced
+        job.version = service.version
+        job.status = GenerationJob.Status.SUCCEEDED
+    except Exception as e:
+        logger.exception("Generation job %s failed", job.id)
+        job.status = GenerationJob.Status.FAILED
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        job.save()
+
+
+def _work(job_id: int):
+    """`run_generation_job` on a pool thread, which then drops its connection rather than leaving it open."""
+    try:
+        run_generation_job(job_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,203 @@
+"""
+Local search over a solved timetable, for the soft constraints.
+
+The solvers only guarantee the hard constraints. `LocalSearch` then lowers the soft penalty of `schedule.scoring`
+by simulated annealing over two neighbourhoods: moving one lecture to another start and room, and swapping the
+slots of two lectures of the same duration. Every move is checked against the attempt's `Occupancy`, so hard
+constraints keep holding. The penalty is kept as per-day hour bitmasks of every teacher and class, and a move is
+scored from the few days and classes it touches, so its cost does not grow with the timetable. A class's breaks,
+blocked in the occupancy, do not count as gaps. Moves made since the best placements seen are logged, so getting
+back to them costs the moves undone rather than a copy of the timetable at every improvement.
+"""
+import math
+import random
+from collections import Counter
+from time import monotonic
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .occupancy import Occupancy, bit_count, span_mask
+from .scoring import SoftWeights, day_balance, gaps, off_hours, soft_penalty
+from .solvers import Placement
+
+
+class LocalSearch:
+    start_temperature = 2.0  # In penalty points: early on, a move costing 2 is taken about a third of the time
+    end_temperature = 0.05
+    swap_rate = 0.5  # Share of the steps that try a swap rather than a move
+
+    def __init__(self, placements: Sequence[Placement], rooms_by_type: Dict[Hashable, List[Hashable]],
+                 occupancy: Occupancy, weights: SoftWeights = SoftWeights(), rng: Optional[random.Random] = None,
+                 deadline: Optional[float] = None):
+        """`occupancy` must hold `placements`; it is kept in step with every move made."""
+        self.placements = list(placements)
+        self.rooms_by_type = rooms_by_type
+        self.occupancy = occupancy
+        self.weights = weights
+        self.rng = rng or random.Random()
+        self.deadline = deadline  # `time.monotonic()` value after which the search stops
+        self.stats = Counter()
+        self.undo: List[Tuple[int, Placement]] = []  # (index, placement replaced) of every move accepted
+        self.teacher_days: Dict[Hashable, List[int]] = {}
+        self.class_days: Dict[Hashable, List[int]] = {}
+        for placement in self.placements:
+            self._add(placement)
+        self.by_duration: Dict[int, List[int]] = {}
+        for index, placement in enumerate(self.placements):
+            self.by_duration.setdefault(placement.lecture.duration, []).append(index)
+        self.penalty = soft_penalty(self.placements, occupancy.num_days, weights, occupancy.class_blocked)
+
+    def _days(self, table: Dict[Hashable, List[int]], key: Hashable) -> List[int]:
+        days = table.get(key)
+        if days is None:
+            days = table[key] = [0] * self.occupancy.num_days
+        return days
+
+    def _add(self, placement: Placement):
+        lecture = placement.lecture
+        mask = span_mask(placement.time, lecture.duration)
+        self._days(self.teacher_days, lecture.teacher)[placement.day] |= mask
+        self._days(self.class_days, lecture.class_name)[placement.day] |= mask
+
+    def _remove(self, placement: Placement):
+        lecture = placement.lecture
+        mask = ~span_mask(placement.time, lecture.duration)
+        self.teacher_days[lecture.teacher][placement.day] &= mask
+        self.class_days[lecture.class_name][placement.day] &= mask
+
+    def _cost(self, teacher_days: Set[Tuple[Hashable, int]], class_days: Set[Tuple[Hashable, int]],
+              placements: Iterable[Placement]) -> int:
+        """The part of the penalty that depends on the given teacher days, class days and placements."""
+        weights = self.weights
+        idle = sum(gaps(self.teacher_days[teacher][day]) for teacher, day in teacher_days)
+        breaks = self.occupancy.class_blocked
+        idle += sum(gaps(self.class_days[class_name][day], breaks[class_name][day] if class_name in breaks else 0)
+                    for class_name, day in class_days)
+        spread = sum(day_balance(bit_count(mask) for mask in self.class_days[class_name])
+                     for class_name in {class_name for class_name, _ in class_days})
+        cost = weights.gaps * idle + weights.day_balance * spread
+        if weights.off_hours:
+            cost += weights.off_hours * sum(off_hours(p.time, p.lecture.duration, weights) for p in placements)
+        return cost
+
+    def _delta(self, old: Sequence[Placement], new: Sequence[Placement]) -> int:
+        """Change of the penalty if `old` were replaced by `new`."""
+        teacher_days = {(p.lecture.teacher, p.day) for p in (*old, *new)}
+        class_days = {(p.lecture.class_name, p.day) for p in (*old, *new)}
+        before = self._cost(teacher_days, class_days, old)
+        for placement in old:
+            self._remove(placement)
+        for placement in new:
+            self._add(placement)
+        after = self._cost(teacher_days, class_days, new)
+        for placement in new:
+            self._remove(placement)
+        for placement in old:
+            self._add(placement)
+        return after - before
+
+    def _fit(self, placement: Placement, day: int, time: int, room: Hashable) -> Optional[Placement]:
+        """`placement` moved to `day` and `time`, in `room` if it is free there or else another room of its type."""
+        lecture = placement.lecture
+        occupancy = self.occupancy
+        if (occupancy.has_teacher_class(day, lecture.teacher, lecture.class_name)
+                or not occupancy.is_free(day, time, lecture.teacher, lecture.class_name, None, lecture.duration)):
+            return None
+        mask = span_mask(time, lecture.duration)
+        rooms = self.rooms_by_type.get(lecture.room_type, [])
+        for candidate in ([room] if room in rooms else []) + rooms:
+            if not occupancy.room_busy(candidate, day) & mask:
+                return Placement(lecture, day, time, candidate)
+        return None
+
+    def _try(self, indexes: Sequence[int], targets: Sequence[Tuple[int, int, Hashable]], temperature: float) -> bool:
+        """Move the placements at `indexes` to the (day, time, room) `targets` if feasible and accepted."""
+        occupancy = self.occupancy
+        old = [self.placements[index] for index in indexes]
+        for placement in old:
+            occupancy.release(placement.day, placement.time, placement.lecture.duration, placement.lecture.teacher,
+                              placement.lecture.class_name, placement.room)
+        new = []
+        for placement, (day, time, room) in zip(old, targets):
+            moved = self._fit(placement, day, time, room)
+            if moved is None:
+                break
+            occupancy.book(day, time, placement.lecture.duration, placement.lecture.teacher,
+                           placement.lecture.class_name, moved.room)
+            new.append(moved)
+        else:
+            delta = self._delta(old, new)
+            if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                for placement in old:
+                    self._remove(placement)
+                for index, placement in zip(indexes, new):
+                    self._add(placement)
+                    self.placements[index] = placement
+                self.undo.extend(zip(indexes, old))
+                self.penalty += delta
+                return True
+        for placement in new:
+            occupancy.release(placement.day, placement.time, placement.lecture.duration, placement.lecture.teacher,
+                              placement.lecture.class_name, placement.room)
+        for placement in old:
+            occupancy.book(placement.day, placement.time, placement.lecture.duration, placement.lecture.teacher,
+                           placement.lecture.class_name, placement.room)
+        return False
+
+    def _step(self, temperature: float):
+        rng = self.rng
+        index = rng.randrange(len(self.placements))
+        placement = self.placements[index]
+        if rng.random() < self.swap_rate:
+            other = rng.choice(self.by_duration[placement.lecture.duration])
+            target = self.placements[other]
+            if other == index or (target.day, target.time) == (placement.day, placement.time):
+                return
+            self.stats['search.swaps_tried'] += 1
+            if self._try([index, other], [(target.day, target.time, target.room),
+                                          (placement.day, placement.time, placement.room)], temperature):
+                self.stats['search.swaps'] += 1
+        else:
+            day = rng.randrange(self.occupancy.num_days)
+            time = rng.randrange(self.occupancy.time_slots - placement.lecture.duration + 1)
+            self.stats['search.moves_tried'] += 1
+            if self._try([index], [(day, time, placement.room)], temperature):
+                self.stats['search.moves'] += 1
+
+    def run(self, steps: int) -> List[Placement]:
+        """
+        Anneal for `steps` steps, or until the deadline, and return the best placements seen. The occupancy is
+        left holding them.
+        """
+        start = best_penalty = self.penalty
+        self.undo.clear()
+        if not self.placements:
+            return list(self.placements)
+        cooling = self.end_temperature / self.start_temperature
+        for step in range(steps):
+            if step % 256 == 0 and self.deadline is not None and monotonic() >= self.deadline:
+                break
+            self._step(self.start_temperature * cooling ** (step / steps))
+            if self.penalty < best_penalty:
+                best_penalty = self.penalty
+                self.undo.clear()
+        if self.undo:
+            best = list(self.placements)
+            for index, placement in reversed(self.undo):
+                best[index] = placement
+            self._restore(best)
+            self.penalty = best_penalty
+            self.undo.clear()
+        self.stats['search.improvement'] += start - best_penalty
+        return list(self.placements)
+
+    def _restore(self, placements: List[Placement]):
+        occupancy = self.occupancy
+        for placement in self.placements:
+            occupancy.release(placement.day, placement.time, placement.lecture.duration, placement.lecture.teacher,
+                              placement.lecture.class_name, placement.room)
+            self._remove(placement)
+        for placement in placements:
+            occupancy.book(placement.day, placement.time, placement.lecture.duration, placement.lecture.teacher,
+                           placement.lecture.class_name, placement.room)
+            self._add(placement)
+        self.placements = list(placements)
@@ -0,0 +1,68 @@
+import json
+import logging
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from schedule.benchmark import PRESETS, run_benchmark
+from schedule.solvers import SOLVERS
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Benchmark timetable generation on synthetic colleges. Runs on a throwaway test database and appends "
+            "one JSON line per run to the output file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', action='append', choices=sorted(PRESETS),
+                            help="Preset to run, may be repeated (default: small and medium).")
+        parser.add_argument('--solver', choices=sorted(SOLVERS))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs per preset, the fastest is reported.")
+        parser.add_argument('--output', default='benchmark-results.jsonl')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        presets = options['preset'] or ['small', 'medium']
+        if options['verbosity'] < 2:
+            logging.getLogger('schedule').setLevel(logging.ERROR)
+
+        # Never touch the real database: build the colleges in a fresh test database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = []
+            for name in presets:
+                result = run_benchmark(name, PRESETS[name], seed=options['seed'], solver=options['solver'],
+                                       repeat=options['repeat'])
+                results.append(result)
+                self.stdout.write(
+                    f"{name:8} {result['lectures']:6} lectures  {result['wall_time']:8.3f}s  "
+                    f"{result['queries']:6} queries  {result['peak_memory'] / 2 ** 20:8.1f} MiB  "
+                    f"{result['placement_rate']:7.2%} placed")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        record = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': results,
+        }
+        with open(options['output'], 'a') as output:
+            output.write(json.dumps(record) + '\n')
+        self.stdout.write(self.style.SUCCESS(f"Results appended to {options['output']}"))
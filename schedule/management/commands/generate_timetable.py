@@ -0,0 +1,59 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.models import DAYS_PER_WEEK
+from schedule.scheduler import SchedulingService
+from schedule.solvers import SOLVERS
+
+
+class Command(BaseCommand):
+    help = ("Generate a timetable and publish it in place of the stored one, outside the web tier. Prints one "
+            "summary line, or with --json the timings and quality of the run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--num-days', type=int, default=DAYS_PER_WEEK)
+        parser.add_argument('--solver', choices=sorted(SOLVERS))
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--attempts', type=int, default=1, help="Independently seeded solves, the best is kept.")
+        parser.add_argument('--workers', type=int, help="Worker processes for the attempts (default: one per CPU).")
+        parser.add_argument('--time-budget', type=float, help="Seconds to keep solving for before storing the best.")
+        parser.add_argument('--search-steps', type=int, help="Local search steps per placed lecture.")
+        parser.add_argument('--dry-run', action='store_true', help="Generate without storing the timetable.")
+        parser.add_argument('--json', action='store_true', help="Print the stats of the run as JSON.")
+
+    def handle(self, *args, **options):
+        if not 1 <= options['num_days'] <= DAYS_PER_WEEK:
+            raise CommandError(f"--num-days must be between 1 and {DAYS_PER_WEEK}.")
+        for name in ('attempts', 'workers'):
+            if options[name] is not None and options[name] < 1:
+                raise CommandError(f"--{name} must be at least 1.")
+        if options['time_budget'] is not None and options['time_budget'] <= 0:
+            raise CommandError("--time-budget must be positive.")
+        if options['search_steps'] is not None and options['search_steps'] < 0:
+            raise CommandError("--search-steps cannot be negative.")
+        if options['json'] and options['verbosity'] < 2:
+            logging.getLogger('schedule').setLevel(logging.ERROR)  # Keep stdout parseable
+
+        service = SchedulingService(options['num_days'], solver=options['solver'], seed=options['seed'],
+                                    attempts=options['attempts'], workers=options['workers'],
+                                    time_budget=options['time_budget'], search_steps=options['search_steps'])
+        result = service.run(persist=not options['dry_run'])
+
+        metrics = service.metrics.summary()
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'solver': service.solver,
+                'seed': options['seed'],
+                'dry_run': options['dry_run'],
+                'version': service.version.id if service.version else None,
+                'score': {'hard': service.score[0], 'soft': service.score[1]},
+                'unplaced': service.unplaced,
+                **metrics,
+            }))
+            return
+        stored = "not stored (dry run)" if options['dry_run'] else f"published as version {service.version.id}"
+        self.stdout.write(f"Placed {len(result.placements)} of {len(result.placements) + len(result.unplaced)} "
+                          f"lectures in {sum(metrics['timings'].values()):.3f}s, soft penalty {service.score[1]}, "
+                          f"{stored}.")
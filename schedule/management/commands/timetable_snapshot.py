@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.models import DAYS_PER_WEEK
+from schedule.scheduler import SchedulingService
+from schedule.snapshots import SnapshotError
+from schedule.solvers import SOLVERS
+
+
+class Command(BaseCommand):
+    help = ("Export the scheduling instance to a problem file that `python -m schedule.snapshots` solves without "
+            "Django, or store and publish the timetable of a result file solved from it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['export', 'import'])
+        parser.add_argument('path')
+        parser.add_argument('--num-days', type=int, default=DAYS_PER_WEEK)
+        parser.add_argument('--solver', choices=sorted(SOLVERS), help="Solver stored with an exported problem.")
+        parser.add_argument('--seed', type=int, help="Seed the stored attempt seeds are drawn from.")
+        parser.add_argument('--attempts', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not 1 <= options['num_days'] <= DAYS_PER_WEEK:
+            raise CommandError(f"--num-days must be between 1 and {DAYS_PER_WEEK}.")
+        if options['attempts'] < 1:
+            raise CommandError("--attempts must be at least 1.")
+        service = SchedulingService(options['num_days'], solver=options['solver'], seed=options['seed'],
+                                    attempts=options['attempts'])
+        path = options['path']
+        if options['action'] == 'export':
+            fingerprint = service.export_problem(path)
+            self.stdout.write(f"Exported the problem to {path} (fingerprint {fingerprint[:12]}).")
+            return
+        try:
+            result = service.import_result(path)
+        except SnapshotError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Published timetable version {service.version.id} from {path}: "
+                          f"{len(result.placements)} lectures placed, {len(result.unplaced)} unplaced.")
@@ -0,0 +1,71 @@
+"""
+Instrumentation for timetable runs.
+
+Each run collects phase timings and counters (solver probes, rejections by reason, database queries per phase)
+in a `RunMetrics`. The summary is attached to the run's result and folded into process-wide totals that the
+metrics endpoint reports. Counting queries uses `connection.execute_wrapper`, so it works without `DEBUG`.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict
+
+from django.db import connection
+
+
+class RunMetrics:
+    def __init__(self):
+        self.timings: Dict[str, float] = {}  # Seconds per phase
+        self.counters: Counter = Counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the block as phase `name` and count the database queries made in it."""
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = perf_counter()
+        try:
+            with connection.execute_wrapper(count_query):
+                yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + perf_counter() - started
+            self.counters[f'db_queries.{name}'] += queries
+
+    def summary(self) -> Dict[str, Dict]:
+        return {'timings': dict(self.timings), 'counters': dict(self.counters)}
+
+
+_lock = threading.Lock()
+_runs: Counter = Counter()
+_timings: Counter = Counter()
+_counters: Counter = Counter()
+_last: Dict[str, Dict] = {}
+
+
+def record(kind: str, metrics: RunMetrics):
+    """Add a finished run (`kind` is 'generate', 'repair' or 'import') to the process-wide totals."""
+    with _lock:
+        _runs[kind] += 1
+        _timings.update(metrics.timings)
+        _counters.update(metrics.counters)
+        _last[kind] = metrics.summary()
+
+
+def snapshot() -> Dict:
+    """Runs, summed timings and counters since the process started, and the latest run of each kind."""
+    with _lock:
+        return {'runs': dict(_runs), 'timings': dict(_timings), 'counters': dict(_counters), 'last': dict(_last)}
+
+
+def reset():
+    with _lock:
+        _runs.clear()
+        _timings.clear()
+        _counters.clear()
+        _last.clear()
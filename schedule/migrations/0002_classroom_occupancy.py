@@ -0,0 +1,89 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SLOT_FIELDS = [f'slot_{hour}_{hour + 1}' for hour in range(9, 17)]
+DAYS_PER_WEEK = 6
+
+
+def slot_flags_to_occupancy(apps, schema_editor):
+    """The old flags had no day, so an hour marked 'N' is booked on every day."""
+    Classrooms = apps.get_model('schedule', 'Classrooms')
+    ClassroomOccupancy = apps.get_model('schedule', 'ClassroomOccupancy')
+    rows = []
+    for classroom in Classrooms.objects.all():
+        booked = sum(1 << time for time, field in enumerate(SLOT_FIELDS) if getattr(classroom, field) == 'N')
+        if booked:
+            rows.extend(ClassroomOccupancy(classroom=classroom, day=day, booked=booked)
+                        for day in range(DAYS_PER_WEEK))
+    ClassroomOccupancy.objects.bulk_create(rows)
+
+
+def occupancy_to_slot_flags(apps, schema_editor):
+    Classrooms = apps.get_model('schedule', 'Classrooms')
+    ClassroomOccupancy = apps.get_model('schedule', 'ClassroomOccupancy')
+    booked = {}
+    for occupancy in ClassroomOccupancy.objects.all():
+        booked[occupancy.classroom_id] = booked.get(occupancy.classroom_id, 0) | occupancy.booked
+    classrooms = list(Classrooms.objects.filter(id__in=booked))
+    for classroom in classrooms:
+        for time, field in enumerate(SLOT_FIELDS):
+            setattr(classroom, field, 'N' if booked[classroom.id] >> time & 1 else 'A')
+    Classrooms.objects.bulk_update(classrooms, SLOT_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassroomOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.IntegerField()),
+                ('booked', models.IntegerField(default=0)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='schedule.classrooms')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='classroomoccupancy',
+            constraint=models.UniqueConstraint(fields=('classroom', 'day'), name='unique_classroom_occupancy_day'),
+        ),
+        migrations.RunPython(slot_flags_to_occupancy, occupancy_to_slot_flags),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_9_10',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_10_11',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_11_12',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_12_13',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_13_14',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_14_15',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_15_16',
+        ),
+        migrations.RemoveField(
+            model_name='classrooms',
+            name='slot_16_17',
+        ),
+    ]
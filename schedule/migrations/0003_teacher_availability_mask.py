@@ -0,0 +1,57 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+SLOT_FIELDS = [f'slot_{hour}_{hour + 1}' for hour in range(9, 17)]
+HOURS_PER_DAY = 8
+DAYS_PER_WEEK = 6
+
+
+def availability_rows_to_mask(apps, schema_editor):
+    """Availability days ran from 1 (Monday) to 6 (Saturday); the mask counts days from 0 like Schedule."""
+    Teacher = apps.get_model('schedule', 'Teacher')
+    Availability = apps.get_model('schedule', 'Availability')
+    unavailable = {}
+    for availability in Availability.objects.all():
+        day = availability.day - 1
+        if not 0 <= day < DAYS_PER_WEEK:
+            continue
+        for time, field in enumerate(SLOT_FIELDS):
+            if getattr(availability, field) == 'N':
+                unavailable[availability.teacher_id] = (unavailable.get(availability.teacher_id, 0)
+                                                        | 1 << (day * HOURS_PER_DAY + time))
+    teachers = list(Teacher.objects.filter(id__in=unavailable))
+    for teacher in teachers:
+        teacher.unavailable = unavailable[teacher.id]
+    Teacher.objects.bulk_update(teachers, ['unavailable'])
+
+
+def mask_to_availability_rows(apps, schema_editor):
+    Teacher = apps.get_model('schedule', 'Teacher')
+    Availability = apps.get_model('schedule', 'Availability')
+    rows = []
+    for teacher in Teacher.objects.all():
+        for day in range(DAYS_PER_WEEK):
+            slots = {field: 'N' if teacher.unavailable >> (day * HOURS_PER_DAY + time) & 1 else 'A'
+                     for time, field in enumerate(SLOT_FIELDS)}
+            rows.append(Availability(teacher=teacher, day=day + 1, **slots))
+    Availability.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0002_classroom_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacher',
+            name='unavailable',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(availability_rows_to_mask, mask_to_availability_rows),
+        migrations.DeleteModel(
+            name='Availability',
+        ),
+    ]
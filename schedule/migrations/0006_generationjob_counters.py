@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0005_generationjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='counters',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
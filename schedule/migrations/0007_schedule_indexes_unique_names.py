@@ -0,0 +1,68 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+def rename_duplicate_names(apps, schema_editor):
+    """Keep the oldest teacher or class under each name and suffix the others with their id."""
+    for model_name in ('Teacher', 'Class'):
+        model = apps.get_model('schedule', model_name)
+        seen = set()
+        for obj in model.objects.order_by('id'):
+            if obj.name in seen:
+                obj.name = f"{obj.name} ({obj.id})"[:100]
+                obj.save(update_fields=['name'])
+            seen.add(obj.name)
+
+
+def delete_double_bookings(apps, schema_editor):
+    """Generated rows that put a class or a classroom in two places at once: keep the first of each."""
+    Schedule = apps.get_model('schedule', 'Schedule')
+    seen = set()
+    clashes = []
+    for pk, class_id, classroom_id, day, hour in Schedule.objects.order_by('id').values_list(
+            'id', 'class_object_id', 'classroom_id', 'day', 'hour'):
+        keys = [key for key in (('class', class_id, day, hour), ('room', classroom_id, day, hour)) if key[1]]
+        if any(key in seen for key in keys):
+            clashes.append(pk)
+        else:
+            seen.update(keys)
+    Schedule.objects.filter(id__in=clashes).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0006_generationjob_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_names, migrations.RunPython.noop),
+        migrations.RunPython(delete_double_bookings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='class',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='teacher',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['class_subject', 'day', 'hour'], name='schedule_class_subject_hour'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['day', 'hour'], name='schedule_day_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('class_object', 'day', 'hour'), name='unique_schedule_class_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('classroom', 'day', 'hour'), name='unique_schedule_classroom_hour'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:25
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+import django.db.models.manager
+import schedule.models
+
+
+def publish_existing_timetable(apps, schema_editor):
+    """The timetable stored so far becomes the first published version."""
+    TimetableVersion = apps.get_model('schedule', 'TimetableVersion')
+    PublishedTimetable = apps.get_model('schedule', 'PublishedTimetable')
+    Schedule = apps.get_model('schedule', 'Schedule')
+    version = TimetableVersion.objects.create(status='published', published_at=timezone.now())
+    PublishedTimetable.objects.create(pk=schedule.models.POINTER_ID, version=version)
+    Schedule.objects.update(version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0007_schedule_indexes_unique_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimetableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('published', 'Published'), ('archived', 'Archived')], default='draft', max_length=10)),
+                ('solver', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PublishedTimetable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='schedule.timetableversion')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='version',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='schedule.timetableversion'),
+        ),
+        migrations.RunPython(publish_existing_timetable, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='schedule',
+            name='version',
+            field=models.ForeignKey(default=schedule.models.published_version_id, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='schedule.timetableversion'),
+        ),
+        migrations.AlterModelOptions(
+            name='schedule',
+            options={'default_manager_name': 'all_versions'},
+        ),
+        migrations.AlterModelManagers(
+            name='schedule',
+            managers=[
+                ('all_versions', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='schedule',
+            name='unique_schedule_class_hour',
+        ),
+        migrations.RemoveConstraint(
+            model_name='schedule',
+            name='unique_schedule_classroom_hour',
+        ),
+        migrations.RemoveIndex(
+            model_name='schedule',
+            name='schedule_day_hour',
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['version', 'day', 'hour'], name='schedule_version_day_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('version', 'class_object', 'day', 'hour'), name='unique_schedule_class_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('version', 'classroom', 'day', 'hour'), name='unique_schedule_classroom_hour'),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='schedule.timetableversion'),
+        ),
+    ]
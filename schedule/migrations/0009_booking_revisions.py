@@ -0,0 +1,23 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_timetable_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='booking_revision',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='booking_revision',
+            field=models.IntegerField(default=0),
+        ),
+    ]
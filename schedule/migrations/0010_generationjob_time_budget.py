@@ -0,0 +1,23 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0009_booking_revisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='time_budget',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='unplaced',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0010_generationjob_time_budget'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='cohort',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
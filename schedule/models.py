@@ -1,34 +1,51 @@
 from datetime import timedelta
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Subquery
+
+FIRST_HOUR = 9  # The first lecture starts at 9 AM
+HOURS_PER_DAY = 8  # 9 AM to 5 PM, 1-hour slots
+DAYS_PER_WEEK = 6  # Monday to Saturday
+
+
+def hour_mask(hour, duration=1):
+    """Bitmask of `duration` hours starting at clock hour `hour` (bit 0 = 9 AM)."""
+    return ((1 << duration) - 1) << (hour - FIRST_HOUR)
+
+
+class SlotTaken(Exception):
+    """A booking clashes with one already made, possibly by a concurrent request."""
 
 
 class Teacher(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)  # The scheduler tells teachers apart by name
+    # Packed weekly availability: bit `day * HOURS_PER_DAY + (hour - FIRST_HOUR)` is set when the teacher is
+    # NOT available at that hour, so a new teacher is available all week
+    unavailable = models.BigIntegerField(default=0)
+    # Bumped by every slot booked by hand for the teacher, see `schedule.bookings`
+    booking_revision = models.IntegerField(default=0)
 
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        # Check if this is a new Teacher object (i.e., not already in the database)
-        is_new = self._state.adding
-        super(Teacher, self).save(*args, **kwargs)
-
-        # If it's a new teacher, create Availability for each day
-        if is_new:
-            for day in range(1, 7):  # Assuming days 1 to 6 represent Monday to Saturday
-                Availability.objects.create(
-                    teacher=self,
-                    day=day,
-                    slot_9_10=AvailabilityStatus.AVAILABLE,
-                    slot_10_11=AvailabilityStatus.AVAILABLE,
-                    slot_11_12=AvailabilityStatus.AVAILABLE,
-                    slot_12_1=AvailabilityStatus.AVAILABLE,
-                    slot_1_2=AvailabilityStatus.AVAILABLE,
-                    slot_2_3=AvailabilityStatus.AVAILABLE,
-                    slot_3_4=AvailabilityStatus.AVAILABLE,
-                    slot_4_5=AvailabilityStatus.AVAILABLE,
-                )
+    def unavailable_hours(self, day):
+        """Bitmask of the hours the teacher is not available on `day` (bit 0 = 9 AM)."""
+        return (self.unavailable >> (day * HOURS_PER_DAY)) & hour_mask(FIRST_HOUR, HOURS_PER_DAY)
+
+    def is_available(self, day, hour):
+        return not self.unavailable_hours(day) & hour_mask(hour)
+
+    def free_slots(self, day):
+        """Clock hours at which the teacher is available on `day`."""
+        busy = self.unavailable_hours(day)
+        return [hour for hour in range(FIRST_HOUR, FIRST_HOUR + HOURS_PER_DAY) if not busy & hour_mask(hour)]
+
+    def set_availability(self, day, hour, available, duration=1):
+        """Mark `duration` hours from `hour` on `day` as (un)available. Call `save()` to store the change."""
+        if hour < FIRST_HOUR or hour + duration > FIRST_HOUR + HOURS_PER_DAY:
+            raise ValueError("Hour must be between 9 and 16 (inclusive).")
+        mask = hour_mask(hour, duration) << (day * HOURS_PER_DAY)
+        self.unavailable = self.unavailable & ~mask if available else self.unavailable | mask
 
 
 class ClassroomType(models.Model):
@@ -38,55 +55,73 @@ class ClassroomType(models.Model):
         return self.name
 
 
-class AvailabilityStatus(models.TextChoices):
-    AVAILABLE = 'A', 'Available'
-    NOT_AVAILABLE = 'N', 'Not Available'
-
-
 class Classrooms(models.Model):
     classroom_type = models.ForeignKey(ClassroomType, on_delete=models.CASCADE)
     classroom_name = models.CharField(max_length=10, blank=False, null=False)
 
-    # Availability for each hour slot (9 AM to 5 PM)
-    slot_9_10 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                 default=AvailabilityStatus.AVAILABLE)
-    slot_10_11 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_11_12 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_12_13 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_13_14 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_14_15 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_15_16 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_16_17 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-
     def __str__(self):
         return f"{self.classroom_name} - {self.id}"
 
-    def check_availability(self, hour):
+    def check_availability(self, hour, day):
         """
-        Check if this specific classroom is available at a specific hour.
+        Check if this specific classroom is available at a specific hour on a specific day.
         """
-        slot_name = f'slot_{hour}_{hour + 1}'  # e.g., 'slot_9_10'
-        return getattr(self, slot_name) == AvailabilityStatus.AVAILABLE
+        return ClassroomOccupancy.objects.is_free(self, day, hour_mask(hour))
 
-    def book_classroom(self, hour):
-        if hour < 9 or hour > 16:
+    def book_classroom(self, hour, day, duration=1):
+        if hour < FIRST_HOUR or hour + duration > FIRST_HOUR + HOURS_PER_DAY:
             raise ValueError("Hour must be between 9 and 16 (inclusive).")
 
-        slot_name = f'slot_{hour}_{hour + 1}'
+        if not ClassroomOccupancy.objects.book(self, day, hour_mask(hour, duration)):
+            raise SlotTaken(f"{self} is not available at {hour}:00.")
+
+    def release_classroom(self, hour, day, duration=1):
+        ClassroomOccupancy.objects.release(self, day, hour_mask(hour, duration))
+
+
+class ClassroomOccupancyManager(models.Manager):
+    """Atomic set / clear of hour bits, each a single conditional UPDATE of one row."""
+
+    def is_free(self, classroom, day, mask):
+        booked = self.filter(classroom=classroom, day=day).values_list('booked', flat=True).first()
+        return not (booked or 0) & mask
+
+    def book(self, classroom, day, mask):
+        """Set the hours in `mask`. Returns False, changing nothing, if any of them is already booked."""
+        rows = self.filter(classroom=classroom, day=day)
+        for _ in range(2):
+            updated = (rows.annotate(clash=F('booked').bitand(mask)).filter(clash=0)
+                       .update(booked=F('booked').bitor(mask)))
+            if updated:
+                return True
+            if rows.exists():
+                return False
+            try:
+                # A missing row means the room is free all day
+                with transaction.atomic():
+                    self.create(classroom=classroom, day=day, booked=mask)
+                return True
+            except IntegrityError:
+                continue  # Created concurrently, retry the conditional update
+        return False
+
+    def release(self, classroom, day, mask):
+        """Clear the hours in `mask`."""
+        self.filter(classroom=classroom, day=day).update(booked=F('booked').bitand(~mask))
+
 
-        if not self.check_availability(hour):
-            raise Exception(f"{self} is not available at {hour}:00.")
+class ClassroomOccupancy(models.Model):
+    """Hours a classroom is booked on one day; bit `h` is set when the hour starting at 9 + h is taken."""
+    classroom = models.ForeignKey(Classrooms, on_delete=models.CASCADE, related_name='occupancy')
+    day = models.IntegerField()  # 0 (Monday) to 5 (Saturday), like Schedule.day
+    booked = models.IntegerField(default=0)
 
-        # Mark the classroom as not available
-        setattr(self, slot_name, 'N')  # Set to Not Available
-        self.save()  # Save changes to the database
+    objects = ClassroomOccupancyManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['classroom', 'day'], name='unique_classroom_occupancy_day'),
+        ]
 
 
 class Subject(models.Model):
@@ -100,7 +135,10 @@ class Subject(models.Model):
 
 
 class Class(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)
+    # Classes of one cohort take their breaks together when `SCHEDULE_BREAKS` aligns them by cohort
+    cohort = models.CharField(max_length=100, blank=True)
+    booking_revision = models.IntegerField(default=0)  # Like `Teacher.booking_revision`
 
     def __str__(self):
         return self.name
@@ -116,30 +154,60 @@ class ClassSubject(models.Model):
         return self.class_name.name + self.subject.name
 
 
-class Availability(models.Model):
-    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
-    day = models.IntegerField()  # Representing days of the week as integers
-
-    # Store availability for each hour as an enum
-    slot_9_10 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                 default=AvailabilityStatus.AVAILABLE)
-    slot_10_11 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_11_12 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_12_13 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_13_14 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_14_15 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_15_16 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
-    slot_16_17 = models.CharField(max_length=1, choices=AvailabilityStatus.choices,
-                                  default=AvailabilityStatus.AVAILABLE)
+class TimetableVersion(models.Model):
+    """
+    One generated timetable. It is built as a draft, published by pointing `PublishedTimetable` at it, and
+    archived once another version is published; archived versions stay available for rollback until they are
+    collected (see `schedule.versions`).
+    """
+
+    class Status(models.TextChoices):
+        DRAFT = 'draft', 'Draft'
+        PUBLISHED = 'published', 'Published'
+        ARCHIVED = 'archived', 'Archived'
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.DRAFT)
+    solver = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Timetable version {self.id} ({self.status})"
+
+
+class PublishedTimetable(models.Model):
+    """The single row naming the published version: publishing a timetable is one UPDATE of it."""
+    version = models.ForeignKey(TimetableVersion, on_delete=models.PROTECT)
+
+
+POINTER_ID = 1  # Primary key of the `PublishedTimetable` row
+
+
+def published_version_id():
+    """Id of the published timetable version, publishing an empty one on a database that has none yet."""
+    pointer = PublishedTimetable.objects.filter(pk=POINTER_ID).values_list('version_id', flat=True).first()
+    if pointer is None:
+        with transaction.atomic():
+            version = TimetableVersion.objects.create(status=TimetableVersion.Status.PUBLISHED)
+            pointer = PublishedTimetable.objects.get_or_create(pk=POINTER_ID, defaults={'version': version})[0]
+            if pointer.version_id != version.id:
+                version.delete()  # Created concurrently
+        pointer = pointer.version_id
+    return pointer
+
+
+class PublishedScheduleManager(models.Manager):
+    """Rows of the published timetable only, read in the same query as the pointer so a flip is never torn."""
+
+    def get_queryset(self):
+        pointer = PublishedTimetable.objects.filter(pk=POINTER_ID).values('version_id')[:1]
+        return super().get_queryset().filter(version_id=Subquery(pointer))
 
 
 class Schedule(models.Model):
+    # Rows created without a version, such as slots booked by hand, belong to the published timetable
+    version = models.ForeignKey(TimetableVersion, on_delete=models.CASCADE, related_name='entries',
+                                default=published_version_id)
     class_subject = models.ForeignKey(ClassSubject, on_delete=models.CASCADE, blank=True, null=True)
     day = models.IntegerField(blank=False, null=False)  # Representing days of the week as integers
     hour = models.IntegerField(blank=False, null=False)  # Representing hour in the 24-hour format
@@ -147,3 +215,52 @@ class Schedule(models.Model):
     duration = models.DurationField(default=timedelta(hours=1))  # Duration of the lecture
     classroom = models.ForeignKey(Classrooms, on_delete=models.CASCADE, blank=True, null=True)  # New field
     class_object = models.ForeignKey(Class, on_delete=models.CASCADE, blank=True, null=True)
+
+    all_versions = models.Manager()
+    objects = PublishedScheduleManager()
+
+    class Meta:
+        default_manager_name = 'all_versions'
+        constraints = [
+            # Within a version a class, or a classroom, is in at most one place per hour. Breaks are kept free by
+            # `schedule.breaks` rather than stored; only recess rows of older versions have no classroom
+            models.UniqueConstraint(fields=['version', 'class_object', 'day', 'hour'],
+                                    name='unique_schedule_class_hour'),
+            models.UniqueConstraint(fields=['version', 'classroom', 'day', 'hour'],
+                                    name='unique_schedule_classroom_hour'),
+        ]
+        indexes = [
+            # Teacher timetables join through ClassSubject; the whole timetable is read in day and hour order
+            models.Index(fields=['class_subject', 'day', 'hour'], name='schedule_class_subject_hour'),
+            models.Index(fields=['version', 'day', 'hour'], name='schedule_version_day_hour'),
+        ]
+
+
+class GenerationJob(models.Model):
+    """A timetable generation queued from the API and run by a background worker (see `schedule.jobs`)."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    num_days = models.IntegerField(default=DAYS_PER_WEEK)
+    solver = models.CharField(max_length=20)
+    seed = models.IntegerField(blank=True, null=True)
+    attempts = models.IntegerField(default=1)  # Independently seeded solves, the best one is kept
+    time_budget = models.FloatField(blank=True, null=True)  # Seconds, see `SchedulingService.time_budget`
+    placed = models.IntegerField(default=0)  # Lectures placed so far
+    total = models.IntegerField(default=0)  # Lectures to place
+    timings = models.JSONField(default=dict, blank=True)  # Seconds per phase
+    counters = models.JSONField(default=dict, blank=True)  # Solver probes, rejections and queries per phase
+    unplaced = models.JSONField(default=list, blank=True)  # `SchedulingService.unplaced_report` of the run
+    version = models.ForeignKey(TimetableVersion, on_delete=models.SET_NULL, blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Generation job {self.id} ({self.status})"
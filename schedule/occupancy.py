@@ -0,0 +1,146 @@
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+def span_mask(time: int, duration: int = 1) -> int:
+    """Bitmask covering `duration` consecutive hour slots starting at hour index `time`."""
+    return ((1 << duration) - 1) << time
+
+
+def free_starts(busy: int, duration: int, time_slots: int) -> int:
+    """Bitmask of the start hours at which `duration` consecutive hours are all clear of `busy`."""
+    if duration > time_slots:
+        return 0
+    free = ~busy & span_mask(0, time_slots)
+    starts = free
+    for offset in range(1, duration):
+        starts &= free >> offset
+    return starts & span_mask(0, time_slots - duration + 1)
+
+
+try:
+    bit_count = int.bit_count
+except AttributeError:  # Python < 3.10
+    def bit_count(mask: int) -> int:
+        return bin(mask).count('1')
+
+
+class Occupancy:
+    """
+    In-memory occupancy of teachers, classes and classrooms for one scheduling run.
+
+    Every resource keeps one integer bitmask per day where bit `t` is set when hour index `t`
+    (0 = 9 AM) is taken, so a feasibility check is a dictionary lookup and a bitwise AND.
+    """
+
+    def __init__(self, num_days: int, time_slots: int):
+        self.num_days = num_days
+        self.time_slots = time_slots
+        self.teachers: Dict[Hashable, List[int]] = {}
+        self.classes: Dict[Hashable, List[int]] = {}
+        self.rooms: Dict[Hashable, List[int]] = {}
+        self.teacher_blocked: Dict[Hashable, List[int]] = {}
+        self.class_blocked: Dict[Hashable, List[int]] = {}
+        self.room_blocked: Dict[Hashable, List[int]] = {}
+        self.teacher_class_days: Counter = Counter()
+
+    def subset(self, teachers: Iterable[Hashable], classes: Iterable[Hashable],
+               rooms: Iterable[Hashable]) -> 'Occupancy':
+        """A copy holding only the given teachers, classes and rooms."""
+        teachers, classes, rooms = set(teachers), set(classes), set(rooms)
+        part = Occupancy(self.num_days, self.time_slots)
+        for table, keys in (('teachers', teachers), ('classes', classes), ('rooms', rooms),
+                            ('teacher_blocked', teachers), ('class_blocked', classes), ('room_blocked', rooms)):
+            setattr(part, table, {key: list(row) for key, row in getattr(self, table).items() if key in keys})
+        part.teacher_class_days = Counter({key: count for key, count in self.teacher_class_days.items()
+                                           if key[0] in teachers and key[1] in classes})
+        return part
+
+    def _row(self, table: Dict[Hashable, List[int]], key: Hashable) -> List[int]:
+        row = table.get(key)
+        if row is None:
+            row = table[key] = [0] * self.num_days
+        return row
+
+    def block_teacher(self, teacher: Hashable, day: int, mask: int):
+        """Mark the hours in `mask` as hours the teacher is not available on `day`."""
+        self._row(self.teacher_blocked, teacher)[day] |= mask
+
+    def block_class(self, class_name: Hashable, day: int, mask: int):
+        """Mark the hours in `mask` as hours the class is kept free of lectures on `day`, such as its breaks."""
+        self._row(self.class_blocked, class_name)[day] |= mask
+
+    def block_room(self, room: Hashable, day: int, mask: int):
+        """Mark the hours in `mask` as hours the room cannot be booked on `day`."""
+        self._row(self.room_blocked, room)[day] |= mask
+
+    def teacher_busy(self, teacher: Hashable, day: int) -> int:
+        """Hours on `day` the teacher cannot take, either unavailable or already booked."""
+        busy = self.teachers.get(teacher)
+        blocked = self.teacher_blocked.get(teacher)
+        return (busy[day] if busy else 0) | (blocked[day] if blocked else 0)
+
+    def class_busy(self, class_name: Hashable, day: int) -> int:
+        busy = self.classes.get(class_name)
+        blocked = self.class_blocked.get(class_name)
+        return (busy[day] if busy else 0) | (blocked[day] if blocked else 0)
+
+    def room_busy(self, room: Hashable, day: int) -> int:
+        busy = self.rooms.get(room)
+        blocked = self.room_blocked.get(room)
+        return (busy[day] if busy else 0) | (blocked[day] if blocked else 0)
+
+    def is_free(self, day: int, time: int, teacher: Optional[Hashable], class_name: Hashable,
+                room: Optional[Hashable] = None, duration: int = 1) -> bool:
+        if time < 0 or time + duration > self.time_slots:
+            return False
+        mask = span_mask(time, duration)
+        if self.class_busy(class_name, day) & mask:
+            return False
+        if teacher is not None and self.teacher_busy(teacher, day) & mask:
+            return False
+        if room is not None and self.room_busy(room, day) & mask:
+            return False
+        return True
+
+    def conflict(self, day: int, time: int, teacher: Optional[Hashable], class_name: Hashable,
+                 room: Optional[Hashable] = None, duration: int = 1) -> Optional[str]:
+        """Why `is_free` would refuse the booking ('hours', 'class', 'teacher' or 'room'), or None."""
+        if time < 0 or time + duration > self.time_slots:
+            return 'hours'
+        mask = span_mask(time, duration)
+        if self.class_busy(class_name, day) & mask:
+            return 'class'
+        if teacher is not None and self.teacher_busy(teacher, day) & mask:
+            return 'teacher'
+        if room is not None and self.room_busy(room, day) & mask:
+            return 'room'
+        return None
+
+    def has_teacher_class(self, day: int, teacher: Hashable, class_name: Hashable) -> bool:
+        return self.teacher_class_days[(teacher, class_name, day)] > 0
+
+    def book(self, day: int, time: int, duration: int, teacher: Optional[Hashable], class_name: Hashable,
+             room: Optional[Hashable] = None):
+        """Record a booking. `teacher` and `room` are None for a recess row stored by an older version."""
+        mask = span_mask(time, duration)
+        self._row(self.classes, class_name)[day] |= mask
+        if teacher is not None:
+            self._row(self.teachers, teacher)[day] |= mask
+            self.teacher_class_days[(teacher, class_name, day)] += 1
+        if room is not None:
+            self._row(self.rooms, room)[day] |= mask
+
+    def release(self, day: int, time: int, duration: int, teacher: Optional[Hashable], class_name: Hashable,
+                room: Optional[Hashable] = None):
+        """Undo a booking previously recorded with `book`."""
+        mask = ~span_mask(time, duration)
+        self._row(self.classes, class_name)[day] &= mask
+        if teacher is not None:
+            self._row(self.teachers, teacher)[day] &= mask
+            key = (teacher, class_name, day)
+            self.teacher_class_days[key] -= 1
+            if self.teacher_class_days[key] <= 0:
+                del self.teacher_class_days[key]
+        if room is not None:
+            self._row(self.rooms, room)[day] &= mask
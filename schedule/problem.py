@@ -0,0 +1,210 @@
+"""
+A scheduling instance as plain Python data, and seeded solves over it.
+
+`SchedulingService.prepare_data` turns the database into a `Problem`; everything here works on that snapshot
+alone, so attempts can be shipped to worker processes and run without Django. Budgets are given in seconds
+rather than as deadlines, as each worker process measures time on its own clock. A problem whose classes,
+teachers and room types fall apart into unrelated groups is split by `components`, and its parts are solved
+independently.
+
+Worker processes are spawned rather than forked. Generation runs on job and request threads, and a process forked
+while other threads run can inherit locks that no thread will ever release.
+"""
+import copy
+import multiprocessing
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from time import monotonic, perf_counter
+from typing import Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .localsearch import LocalSearch
+from .occupancy import Occupancy
+from .scoring import SoftWeights, score
+from .solvers import Lecture, SolveResult, get_solver
+
+
+PARALLEL_MIN_LECTURES = 2000  # Below this, a single attempt is solved part after part in the calling process
+
+
+class Problem(NamedTuple):
+    num_days: int
+    time_slots: int
+    lectures: List[Lecture]
+    rooms_by_type: Dict[Hashable, List[Hashable]]
+    occupancy: Occupancy  # Teacher availability, class breaks and room blocks, before any lecture is booked
+    weights: SoftWeights = SoftWeights()
+    search_steps: int = 0  # Local search steps per placed lecture after the solver, none by default
+
+
+class Attempt(NamedTuple):
+    seed: int
+    result: SolveResult
+    score: Tuple[int, int]
+    timings: Dict[str, float]  # Seconds spent placing lectures
+    stats: Dict[str, int]  # The solver's and the local search's counters
+
+
+def solve(problem: Problem, solver: str, seed: int, progress: Optional[Callable[[int, int], None]] = None,
+          budget: Optional[float] = None) -> Attempt:
+    """
+    One seeded attempt: place every lecture, then polish the soft penalty by local search if
+    `problem.search_steps` asks for it, stopping after `budget` seconds if given. `problem` is left untouched.
+    """
+    deadline = None if budget is None else monotonic() + budget
+    started = perf_counter()
+    rng = random.Random(seed)
+    occupancy = copy.deepcopy(problem.occupancy)
+    engine = get_solver(solver, rng=rng, progress=progress, deadline=deadline)
+    result = engine.solve(problem.lectures, problem.rooms_by_type, occupancy)
+    stats = dict(engine.stats)
+    if problem.search_steps and result.placements:
+        search = LocalSearch(result.placements, problem.rooms_by_type, occupancy, problem.weights, rng, deadline)
+        result = result._replace(placements=search.run(problem.search_steps * len(result.placements)))
+        stats.update(search.stats)
+    timings = {'placement': perf_counter() - started}
+    return Attempt(seed, result,
+                   score(result.placements, result.unplaced, problem.num_days, problem.weights,
+                         problem.occupancy.class_blocked), timings, stats)
+
+
+def _solve_args(args):
+    return solve(*args)
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def components(problem: Problem) -> List[Problem]:
+    """
+    `problem` split into independent parts. Lectures are linked through their class, their teacher and their room
+    type, so no two parts share any of them and each can be solved on its own. Parts come in the order of their
+    first lecture, and keep the order of the lectures and classes within. A problem that does not split comes
+    back whole.
+    """
+    parent: Dict[Tuple[str, Hashable], Tuple[str, Hashable]] = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = node = parent[parent[node]]
+        return node
+
+    for lecture in problem.lectures:
+        root = find(('class', lecture.class_name))
+        for node in (('teacher', lecture.teacher), ('room_type', lecture.room_type)):
+            other = find(node)
+            if other != root:
+                parent[other] = root
+
+    groups: Dict[Tuple[str, Hashable], List[Lecture]] = {}
+    for lecture in problem.lectures:
+        groups.setdefault(find(('class', lecture.class_name)), []).append(lecture)
+    if len(groups) <= 1:
+        return [problem]
+
+    parts = []
+    for lectures in groups.values():
+        room_types = {lecture.room_type for lecture in lectures}
+        rooms_by_type = {room_type: rooms for room_type, rooms in problem.rooms_by_type.items()
+                         if room_type in room_types}
+        occupancy = problem.occupancy.subset({lecture.teacher for lecture in lectures},
+                                             {lecture.class_name for lecture in lectures},
+                                             [room for rooms in rooms_by_type.values() for room in rooms])
+        parts.append(problem._replace(lectures=lectures, rooms_by_type=rooms_by_type, occupancy=occupancy))
+    return parts
+
+
+def merge(problem: Problem, attempts: Sequence[Attempt]) -> Attempt:
+    """Attempts at the parts of `problem` put together into one. Timings and counters are summed."""
+    placements, unplaced, reasons = [], [], []
+    timings, stats = Counter(), Counter()
+    for attempt in attempts:
+        placements.extend(attempt.result.placements)
+        unplaced.extend(attempt.result.unplaced)
+        reasons.extend(attempt.result.reasons)
+        timings.update(attempt.timings)
+        stats.update(attempt.stats)
+    result = SolveResult(placements, unplaced, reasons)
+    return Attempt(attempts[0].seed, result,
+                   score(placements, unplaced, problem.num_days, problem.weights, problem.occupancy.class_blocked),
+                   dict(timings), dict(stats))
+
+
+def solve_best(problem: Problem, solver: str, seeds: Sequence[int], workers: Optional[int] = None,
+               progress: Optional[Callable[[int, int], None]] = None) -> Attempt:
+    """
+    Run one attempt per seed on every part of `problem` (see `components`), spread over `workers` processes (one
+    per CPU by default), and merge the best attempt at each part. Ties go to the earlier seed so results do not
+    depend on which process finishes first. Problems smaller than `PARALLEL_MIN_LECTURES` lectures with a
+    single attempt are solved in this process, where starting workers would cost more than it saves.
+    """
+    parts = components(problem)
+    tasks = [(part, solver, seed) for part in parts for seed in seeds]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if len(seeds) == 1 and len(problem.lectures) < PARALLEL_MIN_LECTURES:
+        workers = 1
+    if len(tasks) == 1:
+        return solve(problem, solver, seeds[0], progress)  # The solver reports its progress itself
+    if workers <= 1:
+        return _merge_best(problem, parts, len(seeds), map(_solve_args, tasks), progress)
+    with _pool(workers) as pool:
+        return _merge_best(problem, parts, len(seeds), pool.map(_solve_args, tasks), progress)
+
+
+def _merge_best(problem: Problem, parts: List[Problem], per_part: int, attempts: Iterator[Attempt],
+                progress: Optional[Callable[[int, int], None]]) -> Attempt:
+    """`attempts` come `per_part` for each of `parts` in turn; the best of each are merged."""
+    if len(parts) == 1:
+        return _pick(attempts, len(problem.lectures), progress)
+    best, placed = [], 0
+    for part in parts:
+        best.append(_pick(islice(attempts, per_part), len(part.lectures), None))
+        placed += len(best[-1].result.placements)
+        if progress:
+            progress(placed, len(problem.lectures))
+    return merge(problem, best)
+
+
+def solve_within(problem: Problem, solver: str, seeds: Iterator[int], budget: float, per_round: int = 1,
+                 workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> Tuple[Attempt, int]:
+    """
+    Anytime solving: run rounds of `per_round` attempts, seeded from `seeds`, until `budget` seconds have passed
+    or a timetable with every lecture placed and no soft penalty turns up. Returns the best attempt and the
+    number of attempts made. The first round always runs; attempts still placing when the budget runs out stop
+    and count with what they placed so far, their lectures left over being unplaced for 'time_budget'.
+    """
+    deadline = monotonic() + budget
+    workers = min(workers or os.cpu_count() or 1, per_round)
+    total = len(problem.lectures)
+    pool = _pool(workers) if workers > 1 else None
+    best, count = None, 0
+    try:
+        while best is None or (best.score != (0, 0) and monotonic() < deadline):
+            remaining = max(0.0, deadline - monotonic())
+            round_seeds = list(islice(seeds, per_round))
+            if pool:
+                attempts = pool.map(_solve_args, [(problem, solver, seed, None, remaining) for seed in round_seeds])
+            else:
+                # The solver reports progress itself on the first attempt; after that only a better best counts
+                attempts = (solve(problem, solver, seed, progress if best is None and per_round == 1 else None,
+                                  remaining) for seed in round_seeds)
+            best = _pick(attempts, total, progress, best)
+            count += len(round_seeds)
+    finally:
+        if pool:
+            pool.shutdown()
+    return best, count
+
+
+def _pick(attempts, total: int, progress: Optional[Callable[[int, int], None]],
+          best: Optional[Attempt] = None) -> Attempt:
+    for attempt in attempts:
+        if best is None or attempt.score < best.score:
+            best = attempt
+        if progress:
+            progress(len(best.result.placements), total)
+    return best
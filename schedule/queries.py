@@ -0,0 +1,110 @@
+"""
+Read side of the timetable: the stored schedule per class, teacher or room, cached per timetable version.
+
+Every cached payload is keyed by the current version number, so invalidating all of them is a single
+`cache.incr`. The version is bumped whenever a timetable is published (`versions.publish`) or schedule rows are
+written (`SchedulingService.repair`, `Schedule.save`) and whenever a row they display is renamed or deleted (see
+`signals`). Entries for older versions are never read again and simply expire. Only the published timetable
+version is ever read. The HTML pages cache a grid per class, teacher or room the same way, and their rendered
+fragments are keyed by the version too. The counter lives in the cache next to the payloads, so the cache
+backend must be shared by every process (see `CACHES` in the settings).
+"""
+import time
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from .models import DAYS_PER_WEEK, FIRST_HOUR, HOURS_PER_DAY, Schedule
+
+VERSION_KEY = 'schedule:timetable-version'
+CACHE_TIMEOUT = 60 * 60
+
+
+def timetable_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock rather than 1, so a version lost to eviction is never handed out again
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_timetable_version():
+    """Invalidate every cached timetable."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        timetable_version()
+
+
+TIMETABLE_FIELDS = ('day', 'hour', 'class_object_id', 'class_object__name', 'class_subject_id',
+                    'class_subject__subject__name', 'class_subject__teacher_id', 'class_subject__teacher__name',
+                    'classroom_id', 'classroom__classroom_name')
+
+
+def timetable_rows(**filters) -> QuerySet:
+    """
+    Stored schedule rows matching `filters` as `TIMETABLE_FIELDS` tuples, ordered by day and hour, in one joined
+    query. Recess rows have no class subject, teacher or classroom.
+    """
+    return Schedule.objects.filter(**filters).order_by('day', 'hour', 'class_object__name').values_list(
+        *TIMETABLE_FIELDS)
+
+
+def timetable_entries(**filters) -> List[Dict]:
+    """`timetable_rows(**filters)` as JSON-ready dicts."""
+    return [{
+        'day': day,
+        'hour': hour,
+        'class': {'id': class_id, 'name': class_name},
+        # Recess rows have no subject, teacher or room
+        'subject': subject or 'Recess',
+        'teacher': {'id': teacher_id, 'name': teacher_name} if teacher_id else None,
+        'classroom': {'id': classroom_id, 'name': classroom_name} if classroom_id else None,
+    } for day, hour, class_id, class_name, _, subject, teacher_id, teacher_name, classroom_id, classroom_name
+        in timetable_rows(**filters)]
+
+
+def cached_timetable(kind: str, owner_id: int, **filters) -> Tuple[int, List[Dict]]:
+    """
+    `timetable_entries(**filters)` for one class, teacher or room, served from the cache when current.
+    Returns the timetable version along with the entries.
+    """
+    version = timetable_version()
+    key = f'schedule:timetable:{version}:{kind}:{owner_id}'
+    entries = cache.get(key)
+    if entries is None:
+        entries = timetable_entries(**filters)
+        cache.set(key, entries, CACHE_TIMEOUT)
+    return version, entries
+
+
+# Schedule field pointing at the class, teacher or room a timetable belongs to, by the key of its entries
+OWNER_FIELDS = {'class': 'class_object_id', 'teacher': 'class_subject__teacher_id', 'classroom': 'classroom_id'}
+
+
+def timetable_grids(kind: str, owner_ids: List[int]) -> Dict[int, List[Dict]]:
+    """
+    `timetable_entries` of several classes, teachers or rooms laid out for display, read in one query: per owner
+    one row per hour, `{'hour': clock hour, 'days': [entries at that hour, for each day of the week]}`.
+    """
+    grids = {owner_id: [{'hour': FIRST_HOUR + time, 'days': [[] for _ in range(DAYS_PER_WEEK)]}
+                        for time in range(HOURS_PER_DAY)] for owner_id in owner_ids}
+    for entry in timetable_entries(**{f'{OWNER_FIELDS[kind]}__in': owner_ids}):
+        grids[entry[kind]['id']][entry['hour'] - FIRST_HOUR]['days'][entry['day']].append(entry)
+    return grids
+
+
+def cached_grids(kind: str, owner_ids: List[int]) -> Dict[int, List[Dict]]:
+    """`timetable_grids`, each served from the cache when current and the others built together."""
+    version = timetable_version()
+    keys = {owner_id: f'schedule:grid:{version}:{kind}:{owner_id}' for owner_id in owner_ids}
+    found = cache.get_many(keys.values())
+    grids = {owner_id: found[key] for owner_id, key in keys.items() if key in found}
+    missing = [owner_id for owner_id in owner_ids if owner_id not in grids]
+    if missing:
+        built = timetable_grids(kind, missing)
+        cache.set_many({keys[owner_id]: grid for owner_id, grid in built.items()}, CACHE_TIMEOUT)
+        grids.update(built)
+    return grids
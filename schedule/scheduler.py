@@ -1,84 +1,124 @@
+import logging
 import random
+from collections import Counter
 from datetime import timedelta
-from typing import List, Tuple, Optional
-
-from django.db.models import Q
-
-from .models import (Availability, AvailabilityStatus, ClassSubject, Teacher, Schedule, Classrooms,
-                     Class)
-
-
-def delete_all_schedules():
-    """Deletes all entries in the Schedule model."""
-    Schedule.objects.all().delete()
-    print("All schedule entries have been deleted.")
-
-
-def book_slot(day: int, time: int, class_subject: Optional[ClassSubject], duration: int,
-              classroom: Optional[Classrooms], class_name: str):
-    print(f"DEBUG: Booking slot for day {day}, time {time}, class subject {class_subject}")
-
-    # Retrieve the class instance based on class_name (assuming 'Class' model is being used)
-    try:
-        class_instance = Class.objects.get(name=class_name)  # Adjust to the actual model name and field
-    except Class.DoesNotExist:
-        print(f"ERROR: Class with name {class_name} does not exist")
-        return
-
-    # Loop to book consecutive time slots based on duration
-    for slot_offset in range(duration):
-        # Handle booking either a class subject or a recess (if class_subject is None)
-        if class_subject:
-            Schedule.objects.create(
-                class_subject=class_subject,
-                day=day,
-                hour=(time + slot_offset) + 9,  # Adjust to the actual time format
-                duration=timedelta(hours=1),  # Each slot is booked for 1 hour
-                classroom=classroom,
-                class_object=class_instance
-            )
-        else:
-            Schedule.objects.create(
-                class_subject=None,
-                day=day,
-                hour=(time + slot_offset) + 9,  # Adjust to the actual time format
-                duration=timedelta(hours=1),
-                classroom=None,  # No classroom for recess
-                # Optionally, you could store the class name if needed for identification
-                class_object=class_instance
-            )
-
-        # Book classroom only if not recess
-        if classroom and class_subject:
-            classroom.book_classroom((time + slot_offset) + 9)
-
-
-def has_teacher_scheduled_class(day: int, teacher: str, class_name: str) -> bool:
-    print(f"DEBUG: Checking if teacher {teacher} is already scheduled for class {class_name} on day {day}")
-    exists = Schedule.objects.filter(
-        class_subject__teacher__name=teacher,
-        class_subject__class_name__name=class_name,
-        day=day
-    ).exists()
-    print(f"DEBUG: Teacher already scheduled: {exists}")
-    return exists
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import (POINTER_ID, ClassSubject, Schedule, Classrooms, ClassroomOccupancy, PublishedTimetable,
+                     TimetableVersion, hour_mask, published_version_id)
+from .breaks import BreakPolicy, compile_breaks
+from .metrics import RunMetrics, record
+from .occupancy import Occupancy
+from .problem import Attempt, Problem, solve_best, solve_within
+from .queries import bump_timetable_version
+from .scoring import SoftWeights
+from .snapshots import load_result, save_problem
+from .solvers import UNPLACED_REASONS, Lecture, Placement, SolveResult, get_solver
+from .versions import publish, stored_room_hours, update_room_occupancy
+
+logger = logging.getLogger(__name__)
+
+SEARCH_STEPS = 10  # Local search steps per placed lecture, unless `SCHEDULE_SEARCH_STEPS` says otherwise
+
+
+class Booking(NamedTuple):
+    """
+    A lecture placed during a run, kept in memory until `SchedulingService.commit`. Class subject and classroom
+    are None only for recess rows read back from versions stored before breaks became a policy (`schedule.breaks`).
+    """
+    day: int
+    time: int
+    duration: int
+    class_name: str
+    class_subject: Optional[ClassSubject]
+    classroom: Optional[Classrooms]
+
+
+class StoredBooking(NamedTuple):
+    """A booking read back from the stored timetable, with the ids of its 1 hour `Schedule` rows."""
+    booking: Booking
+    row_ids: List[int]
+
+
+class TimetableChanged(Exception):
+    """The published timetable was replaced while a repair of it was running."""
+
+
+class RepairResult(NamedTuple):
+    removed: List[Booking]  # Stored bookings that were no longer valid, or no longer needed
+    placements: List[Placement]  # Replacements for them, and lectures that were missing
+    unplaced: List[Lecture]
+
+
+def room_hours(bookings: Iterable[Booking]) -> Dict[Tuple[int, int], int]:
+    """Room hours taken by `bookings`, as {(classroom id, day): hour bitmask}."""
+    masks = {}
+    for booking in bookings:
+        if booking.classroom:
+            key = (booking.classroom.id, booking.day)
+            masks[key] = masks.get(key, 0) | hour_mask(booking.time + 9, booking.duration)
+    return masks
 
 
 class SchedulingService:
-    def __init__(self, num_days: int = 6):
+    def __init__(self, num_days: int = 6, solver: Optional[str] = None, seed: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None, attempts: int = 1,
+                 workers: Optional[int] = None, time_budget: Optional[float] = None,
+                 weights: Optional[SoftWeights] = None, search_steps: Optional[int] = None,
+                 breaks: Optional[BreakPolicy] = None):
         self.num_days = num_days
+        self.solver = get_solver(solver).name  # Raises ValueError for unknown solvers
+        self.rng = random.Random(seed)
+        self.progress = progress  # Called with (lectures placed, lectures in total) while placing
+        # With more than one attempt, independently seeded solves run on `workers` processes and the best is kept
+        self.attempts = max(1, attempts)
+        self.workers = workers
+        # Seconds a run may take before persisting. Within it rounds of `attempts` solves are repeated and the
+        # best kept; once it is spent the best timetable so far is stored, complete or not
+        self.time_budget = time_budget
+        # Soft-constraint weights, and how hard each attempt polishes its timetable against them once placed
+        self.weights = weights or SoftWeights(**getattr(settings, 'SCHEDULE_SOFT_WEIGHTS', {}))
+        if search_steps is None:
+            search_steps = getattr(settings, 'SCHEDULE_SEARCH_STEPS', SEARCH_STEPS)
+        self.search_steps = search_steps
+        # When each class breaks, blocked out of its hours before any lecture is placed
+        self.breaks = breaks or BreakPolicy.from_setting(getattr(settings, 'SCHEDULE_BREAKS', {}))
+        self.metrics = RunMetrics()
+        self.score = None
+        self.unplaced = []  # `unplaced_report` of the last run
+        self.version = None  # The `TimetableVersion` written by the last run
         self.time_slots = 8  # 9 AM to 5 PM, 1-hour slots
         self.teachers = {}
         self.classes = {}
         self.schedule = []
-        self.potential_recess_slots = [2, 3, 4]  # 11 AM, 12 PM, 1 PM (0-based index)
-        self.chosen_recess_slots = {}
-        print("DEBUG: TimetableGenerator initialized")
+        self.class_subjects = {}
+        self.classrooms = {}
+        self.rooms_by_type = {}
+        self.class_objects = {}
+        self.occupancy = Occupancy(num_days, self.time_slots)
+        logger.debug("TimetableGenerator initialized")
 
     def prepare_data(self):
-        print("DEBUG: Preparing data")
-        # Fetch all ClassSubject entries
-        class_subjects = ClassSubject.objects.all()
+        """
+        Load everything the scheduler needs in a handful of queries. All feasibility checks afterwards
+        are answered from `self.occupancy` without touching the database.
+        """
+        logger.debug("Preparing data")
+        self.classes = {}
+        self.teachers = {}
+        self.schedule = []
+        self.class_subjects = {}
+        self.classrooms = {}
+        self.rooms_by_type = {}
+        self.class_objects = {}
+        self.occupancy = Occupancy(self.num_days, self.time_slots)
+
+        # Fetch all ClassSubject entries together with their class, subject and teacher
+        class_subjects = ClassSubject.objects.select_related('class_name', 'subject', 'teacher')
 
         # Prepare data structures
         for cs in class_subjects:
@@ -87,113 +127,339 @@ class SchedulingService:
             if cs.teacher.name not in self.classes[cs.class_name.name]:
                 self.classes[cs.class_name.name][cs.teacher.name] = []
             self.classes[cs.class_name.name][cs.teacher.name].append(cs)
-
-        print(f"DEBUG: Prepared data - Classes: {self.classes}, Teachers: {self.teachers}")
-
-    def is_slot_available(self, day: int, time: int, teacher: str, class_name: str, classroom: Classrooms) -> bool:
-        print(f"DEBUG: Checking availability for day {day}, time {time}, teacher {teacher}, class {class_name}")
-
-        # Check if the slot is the chosen recess slot for this day
-        if self.chosen_recess_slots.get(day) == time:
-            print(f"DEBUG: Slot {time} is the chosen recess slot for day {day}")
-            return False
-
-        # Check teacher availability
-        try:
-            teacher_obj = Teacher.objects.get(name=teacher)
-            availability = Availability.objects.get(teacher=teacher_obj, day=day)
-            slot_field = f'slot_{time + 9}_{time + 10}'
-            if getattr(availability, slot_field) == AvailabilityStatus.NOT_AVAILABLE:
-                print(f"DEBUG: Teacher {teacher} not available")
-                return False
-        except (Teacher.DoesNotExist, Availability.DoesNotExist):
-            print(f"DEBUG: No availability data for teacher {teacher}")
-            # If no availability is defined, assume the teacher is available
-            pass
-
-            # Check classroom availability
-            if not classroom.check_availability(time + 9):
-                print(f"DEBUG: Classroom {classroom} not available")
-                return False
-
-        # Check if the slot is already booked
-        existing_schedule = Schedule.objects.filter(
-            Q(class_subject__teacher__name=teacher) | Q(class_subject__class_name__name=class_name),
-            day=day,
-            hour=time + 9
-        )
-        if existing_schedule.exists():
-            print(f"DEBUG: Slot already booked")
-            return False
-
-        print(f"DEBUG: Slot is available")
-        return True
-
-    def generate_timetable(self):
-        print("DEBUG: Starting timetable generation")
-        delete_all_schedules()
-        self.prepare_data()
-
-        for class_name in self.classes:
-            # Choose and book one recess slot for this class each day
-            for day in range(self.num_days):
-                recess_time = random.choice(self.potential_recess_slots)
-                self.chosen_recess_slots[day] = recess_time
-                # Use book_slot to book the recess for this class
-                book_slot(day, recess_time, None, 1, None, class_name)
-                print(f"DEBUG: Booked recess for class {class_name} on day {day} at time {recess_time + 9}")
+            if cs.teacher.name not in self.teachers:
+                self.teachers[cs.teacher.name] = cs.teacher
+                # Teacher availability comes with the teacher row, no extra query needed
+                for day in range(self.num_days):
+                    self.occupancy.block_teacher(cs.teacher.name, day, cs.teacher.unavailable_hours(day))
+            self.class_objects[cs.class_name.name] = cs.class_name
+            self.class_subjects[cs.id] = cs
+
+        breaks = compile_breaks(self.breaks, [(name, class_object.id, class_object.cohort)
+                                              for name, class_object in self.class_objects.items()], self.num_days)
+        for class_name, masks in breaks.items():
+            for day, mask in enumerate(masks):
+                self.occupancy.block_class(class_name, day, mask)
+
+        for classroom in Classrooms.objects.all():
+            self.classrooms[classroom.id] = classroom
+            self.rooms_by_type.setdefault(classroom.classroom_type_id, []).append(classroom.id)
+
+        # Room hours booked outside the timetable being replaced stay blocked
+        generated = stored_room_hours()
+        for classroom_id, day, booked in ClassroomOccupancy.objects.values_list('classroom_id', 'day', 'booked'):
+            if day < self.num_days:
+                self.occupancy.block_room(classroom_id, day, booked & ~generated.get((classroom_id, day), 0))
+
+        logger.debug("Prepared data - %d classes, %d teachers", len(self.classes), len(self.teachers))
+
+    def record_booking(self, day: int, time: int, class_subject: Optional[ClassSubject], duration: int,
+                       classroom: Optional[Classrooms], class_name: str):
+        """Add a booking that is already reflected in `self.occupancy` to the timetable being built."""
+        self.schedule.append(Booking(day, time, duration, class_name, class_subject, classroom))
+
+    def commit(self):
+        """
+        Store the timetable built in memory as a draft version, then publish it in place of the stored one.
+        Readers keep seeing the previous timetable until the publish commits; if writing the draft fails the
+        previous timetable stays published and the draft is rolled back.
+        """
+        with transaction.atomic():
+            self.version = TimetableVersion.objects.create(solver=self.solver)
+            rows = self.schedule_rows(self.schedule, self.version.id)
+            Schedule.objects.bulk_create(rows, batch_size=500)
+        logger.debug("Stored %d schedule entries as version %d", len(rows), self.version.id)
+        publish(self.version, room_hours(self.schedule))
+
+    def schedule_rows(self, bookings: Iterable[Booking], version_id: int) -> List[Schedule]:
+        """Unsaved `Schedule` rows of version `version_id` for `bookings`, one per hour."""
+        rows = []
+        for booking in bookings:
+            for slot_offset in range(booking.duration):
+                rows.append(Schedule(
+                    version_id=version_id,
+                    class_subject=booking.class_subject,
+                    day=booking.day,
+                    hour=(booking.time + slot_offset) + 9,
+                    duration=timedelta(hours=1),  # Each slot is stored as a 1 hour row
+                    classroom=booking.classroom,
+                    class_object=self.class_objects[booking.class_name],
+                ))
+        return rows
+
+    def lectures(self) -> List[Lecture]:
+        """Every lecture to place, one per `ClassSubject.number_of_lectures`, grouped by class and teacher."""
+        lectures = []
         for class_name, teachers in self.classes.items():
-
             for teacher, class_subjects in teachers.items():
-                print(f"DEBUG: Scheduling for class {class_name}, teacher {teacher}, {len(class_subjects)} subjects")
-
-                for class_subject in class_subjects:
-                    subject_duration = class_subject.subject.duration
-                    required_classroom_type = class_subject.subject.classroom_type
-                    lectures_to_schedule = class_subject.number_of_lectures
-
-                    lectures_scheduled = 0
-                    attempts = 0
-                    max_attempts = 100  # Prevent infinite loop
-                    while lectures_scheduled < lectures_to_schedule and attempts < max_attempts:
-                        day = random.randint(0, self.num_days - 1)
-                        time = random.randint(0, self.time_slots - 1)
-
-                        # Get available classrooms of the required type
-                        available_classrooms = Classrooms.objects.filter(classroom_type=required_classroom_type)
-
-                        for classroom in available_classrooms:
-                            slots_available = True
-                            for slot_offset in range(subject_duration):
-                                if (time + slot_offset >= self.time_slots or
-                                        not self.is_slot_available(day, time + slot_offset,
-                                                                   teacher, class_name, classroom)):
-                                    slots_available = False
-                                    break
-
-                            if slots_available and not has_teacher_scheduled_class(day, teacher, class_name):
-                                book_slot(day, time, class_subject, subject_duration, classroom, class_name)
-                                lectures_scheduled += 1
-                                print(
-                                    f"DEBUG: Scheduled {subject_duration}-hour lecture {lectures_scheduled}"
-                                    f" for {class_name} with {teacher} in {classroom}")
-                                break
-
-                        attempts += 1
-
-                    if lectures_scheduled < lectures_to_schedule:
-                        print(
-                            f"WARNING: Could not schedule all lectures for {class_name} with {teacher}."
-                            f" Scheduled {lectures_scheduled}/{lectures_to_schedule}")
-
-        print("DEBUG: Timetable generation complete")
+                for cs in class_subjects:
+                    lecture = Lecture(cs.id, teacher, class_name, cs.subject.duration, cs.subject.classroom_type_id)
+                    lectures.extend([lecture] * cs.number_of_lectures)
+        return lectures
+
+    def snapshot(self) -> Problem:
+        """The prepared data as a Django-free `Problem`, before any lecture is booked."""
+        return Problem(self.num_days, self.time_slots, self.lectures(), self.rooms_by_type, self.occupancy,
+                       self.weights, self.search_steps)
+
+    def apply(self, attempt: Attempt):
+        """Book the lectures of a solved attempt into this service's timetable."""
+        for placement in attempt.result.placements:
+            lecture = placement.lecture
+            self.occupancy.book(placement.day, placement.time, lecture.duration, lecture.teacher,
+                                lecture.class_name, placement.room)
+            self.record_booking(placement.day, placement.time, self.class_subjects[lecture.class_subject],
+                                lecture.duration, self.classrooms[placement.room], lecture.class_name)
+
+        self.unplaced = self.unplaced_report(attempt.result)
+        for entry in self.unplaced:
+            class_subject = self.class_subjects[entry['class_subject']]
+            logger.warning("Could not schedule %d of the %d lectures for %s with %s: %s",
+                           entry['missing'], class_subject.number_of_lectures, entry['class'], entry['teacher'],
+                           entry['reason'])
+
+    def unplaced_report(self, result: SolveResult) -> List[Dict]:
+        """The lectures `result` left unplaced, counted per class subject and reason."""
+        missing = Counter(zip((lecture.class_subject for lecture in result.unplaced), result.reasons))
+        report = []
+        for (class_subject_id, reason), count in missing.items():
+            class_subject = self.class_subjects[class_subject_id]
+            report.append({'class_subject': class_subject_id, 'class': class_subject.class_name.name,
+                           'subject': class_subject.subject.name, 'teacher': class_subject.teacher.name,
+                           'missing': count, 'reason': reason, 'detail': UNPLACED_REASONS[reason]})
+        return report
+
+    @property
+    def timings(self):
+        """Seconds per phase of the last run."""
+        return self.metrics.timings
+
+    def run(self, persist: bool = True) -> SolveResult:
+        """
+        Generate a timetable and store it, without reading it back; with `persist` false it is only built in
+        memory. Phase timings and counters end up in `self.metrics`; with several attempts the solver counters are
+        those of the attempt kept for each part of the problem (see `problem.components`).
+        """
+        logger.info("Starting timetable generation")
+        started = monotonic()
+        self.metrics = metrics = RunMetrics()
+        with metrics.phase('prepare'):
+            self.prepare_data()
+            problem = self.snapshot()
+
+        with metrics.phase('placement'):
+            if self.time_budget is not None:
+                budget = max(0.0, self.time_budget - (monotonic() - started))
+                logger.info("Placing %d lectures with the %s solver for up to %.1fs", len(problem.lectures),
+                            self.solver, budget)
+                seeds = iter(lambda: self.rng.randrange(2 ** 32), None)
+                attempt, attempts = solve_within(problem, self.solver, seeds, budget, self.attempts, self.workers,
+                                                 self.progress)
+            else:
+                seeds = [self.rng.randrange(2 ** 32) for _ in range(self.attempts)]
+                logger.info("Placing %d lectures with the %s solver, %d attempt(s)", len(problem.lectures),
+                            self.solver, len(seeds))
+                attempt = solve_best(problem, self.solver, seeds, self.workers, self.progress)
+                attempts = len(seeds)
+            self.apply(attempt)
+            self.score = attempt.score
+        metrics.counters.update(attempt.stats)
+        metrics.counters.update(lectures=len(problem.lectures), placed=len(attempt.result.placements),
+                                unplaced=len(attempt.result.unplaced), attempts=attempts)
+
+        if persist:
+            with metrics.phase('persist'):
+                self.commit()
+        record('generate', metrics)
+        logger.info("Timetable generation complete: placed %d/%d lectures in %.3fs",
+                    len(attempt.result.placements), len(problem.lectures), sum(metrics.timings.values()))
+        return attempt.result
+
+    def export_problem(self, path) -> str:
+        """
+        Write the scheduling instance, with the solver and seeds `run` would use, to a `schedule.snapshots`
+        problem file at `path` for solving elsewhere. Returns the problem's fingerprint.
+        """
+        self.prepare_data()
+        problem = self.snapshot()
+        seeds = [self.rng.randrange(2 ** 32) for _ in range(self.attempts)]
+        logger.info("Exporting %d lectures to %s", len(problem.lectures), path)
+        return save_problem(path, problem, self.solver, seeds)
+
+    def import_result(self, path) -> SolveResult:
+        """
+        Store and publish the timetable of a `schedule.snapshots` result file, as `run` would have. Raises
+        `SnapshotError` if the data changed since the problem was exported.
+        """
+        self.metrics = metrics = RunMetrics()
+        with metrics.phase('prepare'):
+            self.prepare_data()
+            attempt = load_result(path, self.snapshot())
+        self.apply(attempt)
+        self.score = attempt.score
+        metrics.counters.update(attempt.stats)
+        metrics.counters.update(placed=len(attempt.result.placements), unplaced=len(attempt.result.unplaced))
+        with metrics.phase('persist'):
+            self.commit()
+        record('import', metrics)
+        logger.info("Imported a timetable placing %d lectures from %s", len(attempt.result.placements), path)
+        return attempt.result
+
+    def load_stored_bookings(self, version_id: int) -> List[StoredBooking]:
+        """
+        Read timetable version `version_id` back as bookings. Consecutive hours of the same lecture are split into
+        blocks of the subject's duration; a block left shorter than that (the subject changed) keeps its actual
+        length. Rows of classes that no longer have any subject are left out.
+        """
+        class_names = {class_object.id: name for name, class_object in self.class_objects.items()}
+        rows = Schedule.all_versions.filter(version_id=version_id) \
+            .order_by('class_object_id', 'class_subject_id', 'day', 'classroom_id', 'hour') \
+            .values_list('id', 'class_object_id', 'class_subject_id', 'day', 'classroom_id', 'hour')
+
+        stored = []
+        block = None  # (class id, class subject id, day, classroom id), first hour, row ids
+        for row_id, class_id, class_subject_id, day, classroom_id, hour in rows:
+            if class_id not in class_names:
+                continue
+            key = (class_id, class_subject_id, day, classroom_id)
+            class_subject = self.class_subjects.get(class_subject_id)
+            length = class_subject.subject.duration if class_subject else 1
+            if block and block[0] == key and block[1] + len(block[2]) == hour and len(block[2]) < length:
+                block[2].append(row_id)
+                continue
+            if block:
+                stored.append(self._stored_booking(block, class_names))
+            block = (key, hour, [row_id])
+        if block:
+            stored.append(self._stored_booking(block, class_names))
+        return stored
+
+    def _stored_booking(self, block, class_names: Dict[int, str]) -> StoredBooking:
+        (class_id, class_subject_id, day, classroom_id), hour, row_ids = block
+        booking = Booking(day, hour - 9, len(row_ids), class_names[class_id],
+                          self.class_subjects.get(class_subject_id), self.classrooms.get(classroom_id))
+        return StoredBooking(booking, row_ids)
+
+    def still_fits(self, booking: Booking) -> bool:
+        """Whether a stored lecture may stay where it is, given the current data and what is booked so far."""
+        class_subject = booking.class_subject
+        subject = class_subject.subject
+        teacher = class_subject.teacher.name
+        return (booking.day < self.num_days
+                and booking.duration == subject.duration
+                and booking.class_name == class_subject.class_name.name
+                and booking.classroom is not None
+                and booking.classroom.classroom_type_id == subject.classroom_type_id
+                and not self.occupancy.has_teacher_class(booking.day, teacher, booking.class_name)
+                and self.occupancy.is_free(booking.day, booking.time, teacher, booking.class_name,
+                                           booking.classroom.id, booking.duration))
+
+    def select_repairs(self, stored: List[StoredBooking], teacher_id: Optional[int] = None,
+                       classroom_id: Optional[int] = None, class_subject_id: Optional[int] = None
+                       ) -> Tuple[List[StoredBooking], List[Lecture]]:
+        """
+        Book the stored lectures that stay into `self.occupancy`. Returns the stored lectures to remove and the
+        lectures to place instead.
+        """
+        everything = teacher_id is None and classroom_id is None and class_subject_id is None
+        room = self.classrooms.get(classroom_id)
+
+        def affected(class_subject: ClassSubject) -> bool:
+            # A changed room concerns every class subject that could use it, or all of them once it is deleted
+            return (everything or class_subject.teacher_id == teacher_id or class_subject.id == class_subject_id
+                    or (classroom_id is not None
+                        and (room is None or room.classroom_type_id == class_subject.subject.classroom_type_id)))
+
+        # Unaffected lectures, and recess rows stored before breaks became a policy, stay exactly where they are
+        checked = []
+        for entry in stored:
+            booking = entry.booking
+            class_subject = booking.class_subject
+            in_room = booking.classroom is not None and booking.classroom.id == classroom_id
+            if class_subject and (affected(class_subject) or in_room):
+                checked.append(entry)
+            elif booking.day < self.num_days:
+                self.occupancy.book(booking.day, booking.time, booking.duration,
+                                    class_subject.teacher.name if class_subject else None, booking.class_name,
+                                    booking.classroom.id if booking.classroom else None)
+
+        removed = []
+        kept = Counter()
+        for entry in sorted(checked, key=lambda entry: (entry.booking.day, entry.booking.time)):
+            booking = entry.booking
+            class_subject = booking.class_subject
+            if kept[class_subject.id] < class_subject.number_of_lectures and self.still_fits(booking):
+                self.occupancy.book(booking.day, booking.time, booking.duration, class_subject.teacher.name,
+                                    booking.class_name, booking.classroom.id)
+                kept[class_subject.id] += 1
+            else:
+                removed.append(entry)
+
+        missing = []
+        for lecture in self.lectures():
+            if affected(self.class_subjects[lecture.class_subject]):
+                if kept[lecture.class_subject]:
+                    kept[lecture.class_subject] -= 1
+                else:
+                    missing.append(lecture)
+        return removed, missing
+
+    def repair(self, teacher_id: Optional[int] = None, classroom_id: Optional[int] = None,
+               class_subject_id: Optional[int] = None) -> RepairResult:
+        """
+        Bring the stored timetable back in line after a teacher, classroom or class subject changed, instead of
+        regenerating it. Only lectures of the changed object are checked: those that still fit stay put, the
+        rest and any missing lectures are placed around the untouched remainder of the timetable. Without
+        arguments every stored lecture is checked. The published version is changed in place; raises
+        `TimetableChanged` if another version is published before the repair is stored.
+        """
+        logger.info("Starting timetable repair")
+        self.metrics = metrics = RunMetrics()
+        with metrics.phase('prepare'):
+            self.prepare_data()
+            version_id = published_version_id()
+            stored = self.load_stored_bookings(version_id)
+
+        with metrics.phase('placement'):
+            removed, missing = self.select_repairs(stored, teacher_id, classroom_id, class_subject_id)
+            solver = get_solver(self.solver, rng=self.rng, progress=self.progress)
+            result = solver.solve(missing, self.rooms_by_type, self.occupancy)
+            self.schedule = []
+            for placement in result.placements:
+                lecture = placement.lecture
+                self.record_booking(placement.day, placement.time, self.class_subjects[lecture.class_subject],
+                                    lecture.duration, self.classrooms[placement.room], lecture.class_name)
+        metrics.counters.update(solver.stats)
+        metrics.counters.update(removed=len(removed), lectures=len(missing), placed=len(result.placements),
+                                unplaced=len(result.unplaced))
+
+        removed_bookings = [entry.booking for entry in removed]
+        with metrics.phase('persist'), transaction.atomic():
+            # The published version is edited in place, unless a generation replaced it in the meantime
+            if not PublishedTimetable.objects.select_for_update().filter(pk=POINTER_ID, version_id=version_id).exists():
+                raise TimetableChanged("Another timetable was published during the repair.")
+            Schedule.all_versions.filter(id__in=[row_id for entry in removed for row_id in entry.row_ids]).delete()
+            Schedule.objects.bulk_create(self.schedule_rows(self.schedule, version_id), batch_size=500)
+            update_room_occupancy(room_hours(removed_bookings), room_hours(self.schedule))
+            transaction.on_commit(bump_timetable_version)
+        record('repair', metrics)
+        logger.info("Repair moved %d stored lectures, placed %d, %d left unplaced", len(removed_bookings),
+                    len(result.placements), len(result.unplaced))
+        return RepairResult(removed_bookings, result.placements, result.unplaced)
+
+    def generate_timetable(self, time_budget: Optional[float] = None):
+        """Generate and store a timetable, within `time_budget` seconds if given, and read it back."""
+        if time_budget is not None:
+            self.time_budget = time_budget
+        self.run()
         return self.get_schedule()
 
     def get_schedule(self) -> List[List[List[Tuple[str, str, str, str]]]]:
-        print("DEBUG: Fetching schedule from database")
+        logger.debug("Fetching schedule from database")
         schedule: List[List[List[Tuple[str, str, str, str]]]] = [[[] for _ in range(self.time_slots)] for _ in
                                                                  range(self.num_days)]
-        entries = Schedule.objects.all()
+        entries = Schedule.objects.select_related('class_object', 'class_subject__subject', 'class_subject__teacher',
+                                                  'classroom')
 
         for entry in entries:
             day = entry.day
@@ -201,7 +467,7 @@ class SchedulingService:
 
             class_name = entry.class_object.name
 
-            # Handle cases where class_subject or classroom is None (like for recess slots)
+            # Handle cases where class_subject or classroom is None (recess rows of older versions)
             if entry.class_subject:
                 subject = entry.class_subject.subject.name
                 teacher = entry.class_subject.teacher.name
@@ -213,12 +479,9 @@ class SchedulingService:
 
             schedule[day][time].append((class_name, subject, teacher, classroom))
 
-        print(f"DEBUG: Schedule Prepares")
-        print(f"Use print_timetable method to print the timetable")
         return schedule
 
     def print_timetable(self):
-        print("DEBUG: Printing timetable")
         schedule = self.get_schedule()
         days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
         times = ['9-10', '10-11', '11-12', '12-1', '1-2', '2-3', '3-4', '4-5']
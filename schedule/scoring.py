@@ -0,0 +1,71 @@
+"""
+Quality of a generated timetable. Lower is better throughout.
+
+Hard constraints are never violated by the solvers, so a timetable is judged first by how many lectures
+could not be placed and then by a soft-constraint penalty, a weighted sum of per-day and per-lecture terms
+that `schedule.localsearch` can update move by move.
+"""
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+from .occupancy import bit_count, span_mask
+from .solvers import Placement
+
+
+def gaps(mask: int, breaks: int = 0) -> int:
+    """Free hours between the first and the last busy hour of a day, other than the `breaks` hours."""
+    if not mask:
+        return 0
+    first = (mask & -mask).bit_length() - 1
+    span = span_mask(first, mask.bit_length() - first)
+    return bit_count(span & ~(mask | breaks))
+
+
+class SoftWeights(NamedTuple):
+    gaps: int = 1  # Per idle hour between two lectures in a teacher's or a class's day
+    day_balance: int = 1  # Per hour between a class's busiest and quietest day
+    off_hours: int = 0  # Per lecture hour outside `preferred_hours`
+    preferred_hours: int = -1  # Bitmask of the hour indexes lectures should keep to, all of them by default
+
+
+def day_balance(hours: Iterable[int]) -> int:
+    """Hours between the busiest and the quietest day."""
+    hours = list(hours)
+    return max(hours) - min(hours)
+
+
+def off_hours(time: int, duration: int, weights: SoftWeights) -> int:
+    """Hours of a lecture outside the preferred ones."""
+    return bit_count(span_mask(time, duration) & ~weights.preferred_hours)
+
+
+def soft_penalty(placements: Iterable[Placement], num_days: int, weights: SoftWeights = SoftWeights(),
+                 class_breaks: Optional[Dict[Hashable, List[int]]] = None) -> int:
+    """
+    Idle gaps in every teacher's and class's day, how unevenly each class's lectures spread over days, and the
+    lecture hours outside the preferred ones, each times its weight. A class's break hours, per-day bitmasks in
+    `class_breaks` by class, are not idle.
+    """
+    placements = list(placements)
+    teacher_days: Dict[Hashable, List[int]] = {}
+    class_days: Dict[Hashable, List[int]] = {}
+    for placement in placements:
+        lecture = placement.lecture
+        mask = span_mask(placement.time, lecture.duration)
+        teacher_days.setdefault(lecture.teacher, [0] * num_days)[placement.day] |= mask
+        class_days.setdefault(lecture.class_name, [0] * num_days)[placement.day] |= mask
+
+    idle = sum(gaps(mask) for days in teacher_days.values() for mask in days)
+    for class_name, days in class_days.items():
+        breaks = (class_breaks or {}).get(class_name) or [0] * num_days
+        idle += sum(gaps(mask, day_breaks) for mask, day_breaks in zip(days, breaks))
+    spread = sum(day_balance(bit_count(mask) for mask in days) for days in class_days.values())
+    penalty = weights.gaps * idle + weights.day_balance * spread
+    if weights.off_hours:
+        penalty += weights.off_hours * sum(off_hours(p.time, p.lecture.duration, weights) for p in placements)
+    return penalty
+
+
+def score(placements: List[Placement], unplaced: list, num_days: int, weights: SoftWeights = SoftWeights(),
+          class_breaks: Optional[Dict[Hashable, List[int]]] = None) -> Tuple[int, int]:
+    """(unplaced lectures, soft penalty), compared lexicographically."""
+    return len(unplaced), soft_penalty(placements, num_days, weights, class_breaks)
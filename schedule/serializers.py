@@ -1,7 +1,9 @@
-from datetime import timedelta
-
 from rest_framework import serializers
-from .models import Teacher, Class, Schedule, ClassSubject, Subject, Classrooms, ClassroomType
+from .bookings import book_slot
+from .models import (Teacher, Class, Schedule, ClassSubject, Subject, Classrooms, ClassroomType, GenerationJob,
+                     TimetableVersion, DAYS_PER_WEEK, FIRST_HOUR, HOURS_PER_DAY)
+
+MAX_ATTEMPTS = 256  # Seeded attempts one generation may ask for
 
 
 class TeacherSerializer(serializers.ModelSerializer):
@@ -40,24 +42,20 @@ class ScheduleSerializer(serializers.ModelSerializer):
 
 
 class BookSlotSerializer(serializers.Serializer):
-    day = serializers.IntegerField()
-    time = serializers.IntegerField()
+    day = serializers.IntegerField(min_value=0, max_value=DAYS_PER_WEEK - 1)
+    time = serializers.IntegerField(min_value=0, max_value=HOURS_PER_DAY - 1)  # Index 0-7 of the hours 9-16
     class_subject_id = serializers.PrimaryKeyRelatedField(queryset=ClassSubject.objects.all())
-    duration = serializers.IntegerField(default=1)  # Default duration is 1 hour
+    duration = serializers.IntegerField(default=1, min_value=1)  # Default duration is 1 hour
 
-    def create(self, validated_data):
-        class_subject = validated_data['class_subject_id']
-        day = validated_data['day']
-        time = validated_data['time']
-        duration = validated_data.get('duration', 1)
+    def validate(self, data):
+        if data['time'] + data.get('duration', 1) > HOURS_PER_DAY:
+            raise serializers.ValidationError("The slot must end by 5 PM.")
+        return data
 
-        schedule = Schedule.objects.create(
-            class_subject=class_subject,
-            day=day,
-            hour=time + 9,  # Assuming time is provided as an index (0-7) and maps to actual hours (9-17)
-            duration=timedelta(hours=duration)
-        )
-        return schedule
+    def create(self, validated_data):
+        """Raises `SlotTaken` if the teacher or the class is busy or unavailable, see `schedule.bookings`."""
+        return book_slot(validated_data['class_subject_id'], validated_data['day'],
+                         FIRST_HOUR + validated_data['time'], validated_data.get('duration', 1))
 
 
 class ClassroomTypeSerializer(serializers.ModelSerializer):
@@ -74,9 +72,85 @@ class ClassroomsSerializer(serializers.ModelSerializer):
 
 class ClassroomBookingSerializer(serializers.Serializer):
     classroom_id = serializers.IntegerField()
+    day = serializers.IntegerField(min_value=0, max_value=DAYS_PER_WEEK - 1)  # 0 = Monday
     hour = serializers.IntegerField()
 
     def validate_hour(self, value):
         if value < 9 or value > 16:
             raise serializers.ValidationError("Hour must be between 9 and 16 (inclusive).")
         return value
+
+
+class GenerationRequestSerializer(serializers.Serializer):
+    num_days = serializers.IntegerField(default=DAYS_PER_WEEK, min_value=1, max_value=DAYS_PER_WEEK)
+    solver = serializers.CharField(required=False, allow_blank=True)
+    seed = serializers.IntegerField(required=False, allow_null=True)
+    attempts = serializers.IntegerField(default=1, min_value=1, max_value=MAX_ATTEMPTS)
+    time_budget = serializers.FloatField(required=False, allow_null=True, min_value=0.1, max_value=3600)
+
+
+class RepairRequestSerializer(serializers.Serializer):
+    """What changed: any combination of a teacher, a classroom and a class subject, or nothing to check everything."""
+    teacher_id = serializers.IntegerField(required=False)
+    classroom_id = serializers.IntegerField(required=False)
+    class_subject_id = serializers.IntegerField(required=False)
+    num_days = serializers.IntegerField(default=DAYS_PER_WEEK, min_value=1, max_value=DAYS_PER_WEEK)
+    solver = serializers.CharField(required=False, allow_blank=True)
+    seed = serializers.IntegerField(required=False, allow_null=True)
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'status', 'num_days', 'solver', 'seed', 'attempts', 'time_budget', 'placed', 'total',
+                  'timings', 'counters', 'unplaced', 'version', 'error', 'created_at', 'started_at', 'finished_at']
+
+
+class TimetableVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TimetableVersion
+        fields = ['id', 'status', 'solver', 'created_at', 'published_at']
+
+
+# Bulk import rows (see `schedule.importers`). Related objects are given by name and resolved by the importer
+# from lookup maps, so validating a row never queries the database.
+class TeacherImportSerializer(TeacherSerializer):
+    # Hours the teacher is not available, as `day:hour` pairs separated by `;`, e.g. "0:9;0:10;4:16"
+    unavailable = serializers.CharField(required=False, allow_blank=True, default='')
+
+    class Meta(TeacherSerializer.Meta):
+        fields = ['name', 'unavailable']
+        extra_kwargs = {'name': {'validators': []}}  # Checked by the importer against its name map
+
+    def validate_unavailable(self, value):
+        mask = 0
+        for pair in filter(None, (part.strip() for part in value.split(';'))):
+            try:
+                day, hour = (int(part) for part in pair.split(':'))
+            except ValueError:
+                raise serializers.ValidationError(f"'{pair}' is not a day:hour pair.")
+            if not 0 <= day < DAYS_PER_WEEK or not FIRST_HOUR <= hour < FIRST_HOUR + HOURS_PER_DAY:
+                raise serializers.ValidationError(f"'{pair}' is outside the week.")
+            mask |= 1 << (day * HOURS_PER_DAY + hour - FIRST_HOUR)
+        return mask
+
+
+class SubjectImportSerializer(SubjectSerializer):
+    classroom_type = serializers.CharField()
+
+    class Meta(SubjectSerializer.Meta):
+        fields = ['name', 'duration', 'subject_code', 'classroom_type']
+        extra_kwargs = {'duration': {'min_value': 1, 'max_value': HOURS_PER_DAY}}
+
+
+class ClassImportSerializer(ClassSerializer):
+    class Meta(ClassSerializer.Meta):
+        fields = ['name', 'cohort']
+        extra_kwargs = {'name': {'validators': []}}
+
+
+class ClassSubjectImportSerializer(serializers.Serializer):
+    class_name = serializers.CharField()
+    subject = serializers.CharField()  # Subject code, or name
+    teacher = serializers.CharField()
+    number_of_lectures = serializers.IntegerField(min_value=1)
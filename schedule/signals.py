@@ -0,0 +1,26 @@
+"""
+Cache invalidation for the timetable read endpoints.
+
+Bulk writes made by `SchedulingService` bypass model signals and bump the version themselves. Only `post_save`
+is watched on `Schedule`: a delete receiver would stop Django from deleting schedule rows in bulk.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Class, ClassSubject, Classrooms, Schedule, Subject, Teacher
+from .queries import bump_timetable_version
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=ClassSubject)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Classrooms)
+@receiver(post_delete, sender=Class)
+@receiver(post_delete, sender=ClassSubject)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Classrooms)
+def invalidate_timetables(sender, **kwargs):
+    transaction.on_commit(bump_timetable_version)
@@ -0,0 +1,219 @@
+"""
+Scheduling instances and their solutions as portable `.npz` files.
+
+A problem file holds everything a solve reads: the `Problem` built by `SchedulingService.snapshot` (lectures
+with their class subject, teacher, class, duration and room type, the rooms of each type, teacher availability,
+class breaks, room blocks and soft-constraint weights) along with the solver and seeds the live run would use.
+Names and ids are kept once each in a JSON header, and the lectures and per-day masks as integer arrays
+indexing into them. A result file holds the placements of one `Attempt` by index into the same problem, plus
+the problem's fingerprint so it is never imported into a database that changed since.
+
+Nothing here imports Django, so a problem can be solved on another machine:
+
+    python -m schedule.snapshots problem.npz result.npz [--solver dsatur] [--seed 1] [--workers 8]
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+from collections import Counter
+from itertools import chain
+from time import perf_counter
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .occupancy import Occupancy
+from .problem import Attempt, Problem, solve_best, solve_within
+from .scoring import SoftWeights, score
+from .solvers import Lecture, Placement, SolveResult
+
+FORMAT_VERSION = 2
+# `Occupancy` attribute: names they are keyed by
+OCCUPANCY_TABLES = {'teachers': 'teachers', 'classes': 'classes', 'rooms': 'rooms', 'teacher_blocked': 'teachers',
+                    'class_blocked': 'classes', 'room_blocked': 'rooms'}
+
+
+class SnapshotError(ValueError):
+    """A snapshot file that cannot be read, or a result that belongs to another problem."""
+
+
+class Snapshot(NamedTuple):
+    problem: Problem
+    solver: str
+    seeds: List[int]  # One per attempt
+    fingerprint: str  # Of the problem alone, see `fingerprint`
+
+
+def _names(problem: Problem) -> Dict[str, List[Hashable]]:
+    """Every class subject, teacher, class, room type and room of `problem`, each listed once in a stable order."""
+    names = {'class_subjects': {}, 'teachers': {}, 'classes': {}, 'room_types': {}, 'rooms': {}}
+    for lecture in problem.lectures:
+        names['class_subjects'][lecture.class_subject] = None
+        names['teachers'][lecture.teacher] = None
+        names['classes'][lecture.class_name] = None
+        names['room_types'][lecture.room_type] = None
+    for room_type, rooms in problem.rooms_by_type.items():
+        names['room_types'][room_type] = None
+        names['rooms'].update(dict.fromkeys(rooms))
+    for table, kind in OCCUPANCY_TABLES.items():
+        names[kind].update(dict.fromkeys(getattr(problem.occupancy, table)))
+    for teacher, class_name, _ in problem.occupancy.teacher_class_days:
+        names['teachers'][teacher] = None
+        names['classes'][class_name] = None
+    return {kind: list(keys) for kind, keys in names.items()}
+
+
+def _encode(problem: Problem) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    names = _names(problem)
+    index = {kind: {name: position for position, name in enumerate(keys)} for kind, keys in names.items()}
+    header = {
+        'num_days': problem.num_days,
+        'time_slots': problem.time_slots,
+        'names': names,
+        'rooms_by_type': [[index['room_types'][room_type], [index['rooms'][room] for room in rooms]]
+                          for room_type, rooms in problem.rooms_by_type.items()],
+        'weights': problem.weights._asdict(),
+        'search_steps': problem.search_steps,
+    }
+    arrays = {'lectures': np.array([[index['class_subjects'][lecture.class_subject],
+                                     index['teachers'][lecture.teacher], index['classes'][lecture.class_name],
+                                     lecture.duration, index['room_types'][lecture.room_type]]
+                                    for lecture in problem.lectures], dtype=np.int64).reshape(-1, 5)}
+    for table, kind in OCCUPANCY_TABLES.items():
+        rows = getattr(problem.occupancy, table)
+        arrays[f'{table}.keys'] = np.array([index[kind][key] for key in rows], dtype=np.int64)
+        arrays[f'{table}.masks'] = np.array(list(rows.values()), dtype=np.int64).reshape(-1, problem.num_days)
+    arrays['teacher_class_days'] = np.array(
+        [[index['teachers'][teacher], index['classes'][class_name], day, count]
+         for (teacher, class_name, day), count in problem.occupancy.teacher_class_days.items()],
+        dtype=np.int64).reshape(-1, 4)
+    return header, arrays
+
+
+def _decode(header: Dict, arrays: Dict[str, np.ndarray]) -> Problem:
+    names = header['names']
+    occupancy = Occupancy(header['num_days'], header['time_slots'])
+    for table, kind in OCCUPANCY_TABLES.items():
+        setattr(occupancy, table, {names[kind][key]: masks for key, masks in
+                                   zip(arrays[f'{table}.keys'].tolist(), arrays[f'{table}.masks'].tolist())})
+    occupancy.teacher_class_days = Counter({
+        (names['teachers'][teacher], names['classes'][class_name], day): count
+        for teacher, class_name, day, count in arrays['teacher_class_days'].tolist()})
+    lectures = [Lecture(names['class_subjects'][class_subject], names['teachers'][teacher],
+                        names['classes'][class_name], duration, names['room_types'][room_type])
+                for class_subject, teacher, class_name, duration, room_type in arrays['lectures'].tolist()]
+    return Problem(
+        header['num_days'], header['time_slots'], lectures,
+        {names['room_types'][room_type]: [names['rooms'][room] for room in rooms]
+         for room_type, rooms in header['rooms_by_type']},
+        occupancy, SoftWeights(**header['weights']), header['search_steps'])
+
+
+def fingerprint(problem: Problem) -> str:
+    """A hash of everything in `problem`, the same whichever machine computes it."""
+    header, arrays = _encode(problem)
+    digest = hashlib.sha256(json.dumps(header, sort_keys=True).encode())
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(arrays[name], dtype='<i8').tobytes())
+    return digest.hexdigest()
+
+
+def _write(path, kind: str, header: Dict, arrays: Dict[str, np.ndarray]):
+    header = {'format': FORMAT_VERSION, 'kind': kind, **header}
+    np.savez_compressed(path, header=np.array(json.dumps(header)), **arrays)
+
+
+def _read(path, kind: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        header = json.loads(str(arrays.pop('header')))
+    except (OSError, KeyError, ValueError) as e:
+        raise SnapshotError(f"{path} is not a timetable snapshot: {e}")
+    if header.get('format') != FORMAT_VERSION or header.get('kind') != kind:
+        raise SnapshotError(f"{path} is a {header.get('kind')} file of format {header.get('format')}, "
+                            f"expected a {kind} file of format {FORMAT_VERSION}.")
+    return header, arrays
+
+
+def save_problem(path, problem: Problem, solver: str, seeds: Sequence[int]) -> str:
+    """Write `problem` and how to solve it to `path`. Returns its fingerprint."""
+    header, arrays = _encode(problem)
+    problem_fingerprint = fingerprint(problem)
+    _write(path, 'problem', {**header, 'solver': solver, 'seeds': list(seeds), 'fingerprint': problem_fingerprint},
+           arrays)
+    return problem_fingerprint
+
+
+def load_problem(path) -> Snapshot:
+    header, arrays = _read(path, 'problem')
+    return Snapshot(_decode(header, arrays), header['solver'], header['seeds'], header['fingerprint'])
+
+
+def save_result(path, problem: Problem, attempt: Attempt):
+    """Write the placements of `attempt`, a solution of `problem`, to `path`."""
+    names = _names(problem)
+    rooms = {name: position for position, name in enumerate(names['rooms'])}
+    positions: Dict[Hashable, List[int]] = {}
+    for position, lecture in reversed(list(enumerate(problem.lectures))):
+        positions.setdefault(lecture, []).append(position)
+    # Equal lectures are interchangeable, so each placement or unplaced lecture takes the next unused copy
+    placements = [[positions[p.lecture].pop(), p.day, p.time, rooms[p.room]] for p in attempt.result.placements]
+    unplaced = [positions[lecture].pop() for lecture in attempt.result.unplaced]
+    header = {'fingerprint': fingerprint(problem), 'seed': attempt.seed, 'timings': attempt.timings,
+              'stats': attempt.stats, 'reasons': list(attempt.result.reasons)}
+    _write(path, 'result', header, {
+        'placements': np.array(placements, dtype=np.int64).reshape(-1, 4),
+        'unplaced': np.array(unplaced, dtype=np.int64),
+    })
+
+
+def load_result(path, problem: Problem) -> Attempt:
+    """The attempt stored at `path`. Raises `SnapshotError` if it was not solved from `problem`."""
+    header, arrays = _read(path, 'result')
+    if header['fingerprint'] != fingerprint(problem):
+        raise SnapshotError(f"{path} solves another problem; the timetable data changed since it was exported.")
+    names = _names(problem)
+    placements = [Placement(problem.lectures[lecture], day, time, names['rooms'][room])
+                  for lecture, day, time, room in arrays['placements'].tolist()]
+    unplaced = [problem.lectures[lecture] for lecture in arrays['unplaced'].tolist()]
+    return Attempt(header['seed'], SolveResult(placements, unplaced, header['reasons']),
+                   score(placements, unplaced, problem.num_days, problem.weights, problem.occupancy.class_blocked),
+                   header['timings'], header['stats'])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m schedule.snapshots',
+                                     description="Solve an exported timetable problem without Django.")
+    parser.add_argument('problem', help="Problem file written by `SchedulingService.export_problem`.")
+    parser.add_argument('result', help="Where to write the result, to import with `SchedulingService.import_result`.")
+    parser.add_argument('--solver', help="Solver to use instead of the one stored with the problem.")
+    parser.add_argument('--seed', type=int, action='append', help="Seed to use instead of the stored ones, may be "
+                                                                  "repeated for several attempts.")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU).")
+    parser.add_argument('--time-budget', type=float, help="Keep solving for this many seconds.")
+    args = parser.parse_args(argv)
+
+    started = perf_counter()
+    snapshot = load_problem(args.problem)
+    loaded = perf_counter() - started
+    solver, seeds = args.solver or snapshot.solver, args.seed or snapshot.seeds
+    if args.time_budget is not None:
+        # Rounds after the given seeds draw theirs from the first, as `SchedulingService` does from its own seed
+        rng = random.Random(seeds[0])
+        more = chain(seeds, iter(lambda: rng.randrange(2 ** 32), None))
+        attempt, _ = solve_within(snapshot.problem, solver, more, args.time_budget, len(seeds), args.workers)
+    else:
+        attempt = solve_best(snapshot.problem, solver, seeds, args.workers)
+    save_result(args.result, snapshot.problem, attempt)
+    json.dump({'lectures': len(snapshot.problem.lectures), 'placed': len(attempt.result.placements),
+               'score': list(attempt.score), 'load_seconds': loaded, 'seconds': perf_counter() - started},
+              sys.stdout)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+"""
+Placement engines for `SchedulingService`.
+
+A solver receives the lectures still to be placed, the rooms grouped by classroom type and an `Occupancy`
+that already holds teacher availability, class break masks and room blocks. It books every placement it makes into
+that occupancy and returns them. Solvers only work on plain Python data, so they never touch the database.
+Each solver also counts its probes and why candidates were rejected in `stats`, and gives the reason each
+lecture it could not place failed. Given a deadline, a solver stops placing when it passes and returns what it
+has so far.
+"""
+import heapq
+import random
+from collections import Counter
+from itertools import groupby
+from time import monotonic
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .feasibility import RoomMatrix, lecture_starts, pack, popcount_table
+from .occupancy import Occupancy, bit_count, free_starts, span_mask
+
+
+class Lecture(NamedTuple):
+    class_subject: Hashable  # ClassSubject id
+    teacher: Hashable
+    class_name: Hashable
+    duration: int
+    room_type: Hashable
+
+
+class Placement(NamedTuple):
+    lecture: Lecture
+    day: int
+    time: int
+    room: Hashable
+
+
+class SolveResult(NamedTuple):
+    placements: List[Placement]
+    unplaced: List[Lecture]
+    reasons: Sequence[str] = ()  # Why each unplaced lecture failed, a key of `UNPLACED_REASONS`
+
+
+UNPLACED_REASONS = {
+    'time_budget': "The time budget ran out before the lecture was placed.",
+    'teacher_busy': "The teacher has no free hours left long enough for the lecture.",
+    'class_busy': "The class has no free hours left long enough for the lecture.",
+    'no_common_hour': "The teacher and the class are never free at the same time for long enough.",
+    'teacher_class_day': "The teacher already teaches the class on every day both have time.",
+    'no_room': "No room of the required type is free when the teacher and the class are.",
+    'not_found': "A free slot exists, but the solver did not find it.",
+}
+
+
+def diagnose(lecture: Lecture, rooms_by_type: Dict[Hashable, List[Hashable]], occupancy: Occupancy) -> str:
+    """Why `lecture` cannot be placed in `occupancy` as it stands, as a key of `UNPLACED_REASONS`."""
+    slots = occupancy.time_slots
+    teacher_free = class_free = common = other_day = 0  # Start hours OR-ed over the days, only tested for zero
+    for day in range(occupancy.num_days):
+        teacher_busy = occupancy.teacher_busy(lecture.teacher, day)
+        class_busy = occupancy.class_busy(lecture.class_name, day)
+        teacher_free |= free_starts(teacher_busy, lecture.duration, slots)
+        class_free |= free_starts(class_busy, lecture.duration, slots)
+        starts = free_starts(teacher_busy | class_busy, lecture.duration, slots)
+        common |= starts
+        if not starts or occupancy.has_teacher_class(day, lecture.teacher, lecture.class_name):
+            continue
+        other_day |= starts
+        for room in rooms_by_type.get(lecture.room_type, []):
+            if starts & free_starts(occupancy.room_busy(room, day), lecture.duration, slots):
+                return 'not_found'
+    if not teacher_free:
+        return 'teacher_busy'
+    if not class_free:
+        return 'class_busy'
+    if not common:
+        return 'no_common_hour'
+    if not other_day:
+        return 'teacher_class_day'
+    return 'no_room'
+
+
+class Solver:
+    name: str = ''
+
+    def __init__(self, rng: Optional[random.Random] = None, progress: Optional[Callable[[int, int], None]] = None,
+                 deadline: Optional[float] = None):
+        self.rng = rng or random.Random()
+        self.progress = progress
+        self.deadline = deadline  # `time.monotonic()` value after which no more lectures are placed
+        self.stats = Counter()
+
+    def out_of_time(self) -> bool:
+        return self.deadline is not None and monotonic() >= self.deadline
+
+    def report(self, placed: int, total: int):
+        """Tell the `progress` callback, if any, how many of the lectures are placed so far."""
+        if self.progress:
+            self.progress(placed, total)
+
+    def solve(self, lectures: Sequence[Lecture], rooms_by_type: Dict[Hashable, List[Hashable]],
+              occupancy: Occupancy) -> SolveResult:
+        raise NotImplementedError
+
+
+class GreedySolver(Solver):
+    """
+    The original strategy: for every ClassSubject draw random (day, time) pairs, up to `max_attempts` times,
+    and take the first room of the right type that is free for the whole lecture.
+    """
+    name = 'greedy'
+
+    def __init__(self, rng: Optional[random.Random] = None, progress: Optional[Callable[[int, int], None]] = None,
+                 deadline: Optional[float] = None, max_attempts: int = 100):
+        super().__init__(rng, progress, deadline)
+        self.max_attempts = max_attempts
+
+    def solve(self, lectures, rooms_by_type, occupancy):
+        placements, unplaced, reasons = [], [], []
+        for _, group in groupby(lectures, key=lambda lecture: lecture.class_subject):
+            pending = list(group)
+            if self.out_of_time():
+                unplaced.extend(pending)
+                reasons.extend(['time_budget'] * len(pending))
+                continue
+            attempts = 0
+            while pending and attempts < self.max_attempts:
+                lecture = pending[-1]
+                day = self.rng.randint(0, occupancy.num_days - 1)
+                time = self.rng.randint(0, occupancy.time_slots - 1)
+                attempts += 1
+                self.stats['probes'] += 1
+
+                if occupancy.has_teacher_class(day, lecture.teacher, lecture.class_name):
+                    self.stats['rejected.teacher_class_day'] += 1
+                    continue
+                reason = occupancy.conflict(day, time, lecture.teacher, lecture.class_name, None, lecture.duration)
+                if reason:
+                    self.stats[f'rejected.{reason}'] += 1
+                    continue
+                for room in rooms_by_type.get(lecture.room_type, []):
+                    if occupancy.is_free(day, time, lecture.teacher, lecture.class_name, room, lecture.duration):
+                        occupancy.book(day, time, lecture.duration, lecture.teacher, lecture.class_name, room)
+                        placements.append(Placement(pending.pop(), day, time, room))
+                        break
+                else:
+                    self.stats['rejected.room'] += 1
+            if pending:
+                unplaced.extend(pending)
+                reasons.extend([diagnose(pending[-1], rooms_by_type, occupancy)] * len(pending))
+            self.report(len(placements), len(lectures))
+        return SolveResult(placements, unplaced, reasons)
+
+
+class ConstraintSolver(Solver):
+    """
+    Constructive constraint-propagation solver.
+
+    Every lecture keeps a domain of feasible start hours per day, pre-filtered against teacher availability,
+    the class's bookings and break masks, and the rooms of its type. Lectures are placed most-constrained-first
+    (smallest domain, then longest duration) and every placement is forward-checked: the domains of lectures
+    sharing the teacher or the class lose the overlapping starts, the same teacher/class pair loses the whole day,
+    and lectures of the same room type lose starts for which no room of that type is left. Among a sample of
+    values, the one that removes the fewest options from the neighbouring lectures is chosen.
+
+    Domains are kept as a lectures x days NumPy array of start-hour bitmasks and rooms as a `RoomMatrix`, so
+    scoring the sampled values and pruning the neighbours of a placement are vectorised over the neighbours.
+    """
+    name = 'constraint'
+
+    def __init__(self, rng: Optional[random.Random] = None, progress: Optional[Callable[[int, int], None]] = None,
+                 deadline: Optional[float] = None, sample_size: int = 8):
+        super().__init__(rng, progress, deadline)
+        self.sample_size = sample_size
+
+    def solve(self, lectures, rooms_by_type, occupancy):
+        self.occupancy = occupancy
+        self.lectures = list(lectures)
+        n = len(self.lectures)
+
+        self.by_teacher: Dict[Hashable, List[int]] = {}
+        self.by_class: Dict[Hashable, List[int]] = {}
+        by_room_group: Dict[Tuple[Hashable, int], List[int]] = {}
+        for index, lecture in enumerate(self.lectures):
+            self.by_teacher.setdefault(lecture.teacher, []).append(index)
+            self.by_class.setdefault(lecture.class_name, []).append(index)
+            by_room_group.setdefault((lecture.room_type, lecture.duration), []).append(index)
+        self.room_type_groups: Dict[Hashable, List[Tuple[Tuple[Hashable, int], np.ndarray]]] = {}
+        for group, members in by_room_group.items():
+            self.room_type_groups.setdefault(group[0], []).append((group, np.array(members)))
+        self.durations = np.array([lecture.duration for lecture in self.lectures], dtype=np.int64)
+
+        # Domains, their sizes and the room feasibility are NumPy arrays, so the neighbours of a lecture are
+        # scored and pruned in one vectorised pass each
+        self.neighbours: Dict[Tuple[Hashable, Hashable], Tuple[np.ndarray, np.ndarray]] = {}
+        self.rooms = RoomMatrix(rooms_by_type, occupancy)
+        self.room_starts = {group: pack(self.rooms.type_starts(*group)).tolist() for group in by_room_group}
+        self.domains = lecture_starts(self.lectures, occupancy, self.rooms)
+        self.popcount = popcount_table(occupancy.time_slots)
+        self.sizes = self.popcount[self.domains].sum(axis=1)
+        self.assigned = np.zeros(n, dtype=bool)
+
+        heap = [self._priority(index) for index in range(n)]
+        heapq.heapify(heap)
+        placements, unplaced, reasons = [], [], []
+        while heap and not self.out_of_time():
+            size, _, _, index = heapq.heappop(heap)
+            if self.assigned[index] or size != self.sizes[index]:
+                continue  # Stale entry, a fresher one is in the heap
+            self.assigned[index] = True
+            lecture = self.lectures[index]
+            value = self._choose_value(index) if size else None
+            if value is None:
+                self.stats['unplaced.no_room' if size else 'unplaced.empty_domain'] += 1
+                unplaced.append(lecture)
+                reasons.append(diagnose(lecture, rooms_by_type, occupancy))
+                continue
+
+            day, time, room = value
+            occupancy.book(day, time, lecture.duration, lecture.teacher, lecture.class_name, room)
+            self.rooms.book(room, day, time, lecture.duration)
+            placements.append(Placement(lecture, day, time, room))
+            for neighbour in self._propagate(index, day, time):
+                heapq.heappush(heap, self._priority(neighbour))
+            self.report(len(placements), n)
+        late = np.flatnonzero(~self.assigned).tolist()  # Left when the deadline passed
+        unplaced.extend(self.lectures[index] for index in late)
+        reasons.extend(['time_budget'] * len(late))
+        return SolveResult(placements, unplaced, reasons)
+
+    def _priority(self, index: int):
+        lecture = self.lectures[index]
+        return int(self.sizes[index]), -lecture.duration, -len(self.by_teacher[lecture.teacher]), index
+
+    def _room_type_starts(self, group: Tuple[Hashable, int], day: int, wanted: int = -1) -> int:
+        """Start hours (out of `wanted`) at which some room of the group's type is free for its duration."""
+        room_type, duration = group
+        return self.rooms.day_starts(room_type, day, duration) & wanted
+
+    def _neighbours(self, lecture: Lecture) -> Tuple[np.ndarray, np.ndarray]:
+        """Indexes of the lectures sharing the teacher or the class, and which of them share both."""
+        key = (lecture.teacher, lecture.class_name)
+        neighbours = self.neighbours.get(key)
+        if neighbours is None:
+            same_pair = set(self.by_teacher[lecture.teacher]) & set(self.by_class[lecture.class_name])
+            members = sorted(set(self.by_teacher[lecture.teacher]) | set(self.by_class[lecture.class_name]))
+            neighbours = self.neighbours[key] = (np.array(members),
+                                                 np.array([other in same_pair for other in members], dtype=bool))
+        return neighbours
+
+    def _conflict_starts(self, time: int, duration: int, other_duration: int) -> int:
+        """Start hours at which a lecture of `other_duration` would overlap [time, time + duration)."""
+        first = max(0, time - other_duration + 1)
+        return span_mask(first, time + duration - first)
+
+    def _conflict_array(self, times: np.ndarray, duration: int, other_durations: np.ndarray) -> np.ndarray:
+        """`_conflict_starts` for arrays of times and other durations, broadcast against each other."""
+        first = np.maximum(0, times - other_durations + 1)
+        return ((1 << (times + duration - first)) - 1) << first
+
+    def _removed_by(self, index: int, days: np.ndarray, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        For each candidate (day, time) of lecture `index`: how many neighbours it would wipe out, and how many of
+        their start options it would remove.
+        """
+        lecture = self.lectures[index]
+        neighbours, same_pair = self._neighbours(lecture)
+        live = ~self.assigned[neighbours]
+        neighbours, same_pair = neighbours[live], same_pair[live]
+
+        options = self.domains[neighbours[np.newaxis, :], days[:, np.newaxis]]  # Candidates x neighbours
+        overlap = self._conflict_array(times[:, np.newaxis], lecture.duration, self.durations[neighbours])
+        lost = self.popcount[np.where(same_pair, options, options & overlap)]
+        wiped = ((lost > 0) & (lost == self.sizes[neighbours])).sum(axis=1)
+        return wiped, lost.sum(axis=1)
+
+    def _choose_value(self, index: int) -> Optional[Tuple[int, int, Hashable]]:
+        lecture = self.lectures[index]
+        candidates = [(day, time) for day, mask in enumerate(self.domains[index].tolist())
+                      for time in range(self.occupancy.time_slots) if mask >> time & 1]
+        self.rng.shuffle(candidates)
+        sample = candidates[:self.sample_size]
+        self.stats['probes'] += len(sample)
+        if not sample:
+            return None
+
+        days, times = np.array(sample).T
+        wiped, removed = self._removed_by(index, days, times)
+        # Fewest neighbours wiped out, then fewest options removed; ties go to the earlier candidate
+        day, time = sample[int(np.lexsort((removed, wiped))[0])]
+        # Best fit: prefer the busiest room that still has room for the lecture, keeping whole rooms free
+        room = self.rooms.best_fit(lecture.room_type, day, time, lecture.duration)
+        if room is None:
+            return None
+        return day, time, room
+
+    def _restrict(self, neighbours: np.ndarray, day: int, keep, touched: set, reason: str):
+        """Keep only the `keep` starts on `day` in the domains of `neighbours`."""
+        if not len(neighbours):
+            return
+        options = self.domains[neighbours, day]
+        restricted = options & keep
+        lost = self.popcount[options] - self.popcount[restricted]
+        changed = lost > 0
+        if changed.any():
+            self.domains[neighbours, day] = restricted
+            self.sizes[neighbours] -= lost
+            self.stats[reason] += int(lost.sum())
+            touched.update(neighbours[changed].tolist())
+
+    def _propagate(self, index: int, day: int, time: int) -> set:
+        lecture = self.lectures[index]
+        touched = set()
+        neighbours, same_pair = self._neighbours(lecture)
+        live = ~self.assigned[neighbours]
+        self._restrict(neighbours[live & same_pair], day, 0, touched, 'pruned.teacher_class_day')
+        others = neighbours[live & ~same_pair]
+        self._restrict(others, day, ~self._conflict_array(time, lecture.duration, self.durations[others]), touched,
+                       'pruned.overlap')
+
+        # Room capacity: drop the start hours no room of this type can serve any more
+        for group, members in self.room_type_groups[lecture.room_type]:
+            at_risk = self.room_starts[group][day] & self._conflict_starts(time, lecture.duration, group[1])
+            lost = at_risk & ~self._room_type_starts(group, day, at_risk)
+            if not lost:
+                continue
+            self.room_starts[group][day] &= ~lost
+            self._restrict(members[~self.assigned[members]], day, ~lost, touched, 'pruned.room')
+        return touched
+
+
+class DSaturSolver(Solver):
+    """
+    Graph-colouring construction in the style of DSatur.
+
+    Lectures are the vertices of a conflict graph, linked when they share a teacher or a class, and the colours
+    are (day, start hour) pairs. The next lecture coloured is always the most saturated one, the one with the
+    fewest colours left once its neighbours' bookings, the teacher's availability, the days the teacher already
+    meets the class and the hours at which every room of its type is taken are ruled out. Ties go to the longest
+    lecture, then to the one with the most neighbours. It takes the first colour left in hour-major order (the
+    first hour of every day, then the second, ...), which fills days from the morning and spreads each class
+    evenly over the week, in the first room of its type free for the whole lecture; see `_first_colour` for
+    how scarce rooms are kept back.
+
+    Colours left are counted per day from bitmasks, and a placement only recounts the day it booked for its
+    neighbours, plus for the lectures of its room type when an hour of that type fills up, so construction takes
+    about linear time in the size of the graph. There is no lookahead as in `ConstraintSolver`: this is a fast
+    start for the local search to refine.
+    """
+    name = 'dsatur'
+    spare_rooms = 3
+
+    def solve(self, lectures, rooms_by_type, occupancy):
+        self.occupancy = occupancy
+        self.rooms_by_type = rooms_by_type
+        lectures = list(lectures)
+        n = len(lectures)
+        by_teacher: Dict[Hashable, List[int]] = {}
+        by_class: Dict[Hashable, List[int]] = {}
+        by_room_type: Dict[Hashable, List[int]] = {}
+        for index, lecture in enumerate(lectures):
+            by_teacher.setdefault(lecture.teacher, []).append(index)
+            by_class.setdefault(lecture.class_name, []).append(index)
+            by_room_type.setdefault(lecture.room_type, []).append(index)
+
+        # Free rooms of each type per day and hour, and the hours at which none is left
+        self.free_rooms: Dict[Tuple[Hashable, int], List[int]] = {}
+        self.full: Dict[Tuple[Hashable, int], int] = {}
+        for room_type in by_room_type:
+            rooms = rooms_by_type.get(room_type, [])
+            for day in range(occupancy.num_days):
+                busy = [occupancy.room_busy(room, day) for room in rooms]
+                free = [sum(not mask >> time & 1 for mask in busy) for time in range(occupancy.time_slots)]
+                self.free_rooms[room_type, day] = free
+                self.full[room_type, day] = sum(1 << time for time, count in enumerate(free) if not count)
+
+        day_colours = [[bit_count(self._starts(lecture, day)) for day in range(occupancy.num_days)]
+                       for lecture in lectures]
+        colours = [sum(counts) for counts in day_colours]
+        # Ties on colours left: longest first, then most neighbours, then at random so seeds differ
+        ties = [(-lecture.duration, -(len(by_teacher[lecture.teacher]) + len(by_class[lecture.class_name])),
+                 self.rng.random()) for lecture in lectures]
+        heap = [(colours[index], ties[index], index) for index in range(n)]
+        heapq.heapify(heap)
+        assigned = [False] * n
+        placements, unplaced, reasons = [], [], []
+        while heap and not self.out_of_time():
+            left, _, index = heapq.heappop(heap)
+            if assigned[index] or left != colours[index]:
+                continue  # Stale entry, a fresher one is in the heap
+            assigned[index] = True
+            lecture = lectures[index]
+            value = self._first_colour(lecture) if left else None
+            if value is None:
+                self.stats['unplaced.no_room' if left else 'unplaced.no_colour'] += 1
+                unplaced.append(lecture)
+                reasons.append(diagnose(lecture, rooms_by_type, occupancy))
+                continue
+
+            day, time, room = value
+            occupancy.book(day, time, lecture.duration, lecture.teacher, lecture.class_name, room)
+            placements.append(Placement(lecture, day, time, room))
+            touched = by_teacher[lecture.teacher] + by_class[lecture.class_name]
+            if self._take_room(lecture.room_type, day, time, lecture.duration):
+                touched += by_room_type[lecture.room_type]
+            for other in set(touched):
+                if not assigned[other]:
+                    # Only the colours of the day just booked can change
+                    count = bit_count(self._starts(lectures[other], day))
+                    if count != day_colours[other][day]:
+                        colours[other] += count - day_colours[other][day]
+                        day_colours[other][day] = count
+                        heapq.heappush(heap, (colours[other], ties[other], other))
+            self.report(len(placements), n)
+        late = [index for index in range(n) if not assigned[index]]  # Left when the deadline passed
+        unplaced.extend(lectures[index] for index in late)
+        reasons.extend(['time_budget'] * len(late))
+        return SolveResult(placements, unplaced, reasons)
+
+    def _starts(self, lecture: Lecture, day: int) -> int:
+        """Start hours on `day` the lecture could still take, as a bitmask."""
+        occupancy = self.occupancy
+        if occupancy.has_teacher_class(day, lecture.teacher, lecture.class_name):
+            return 0
+        busy = (occupancy.teacher_busy(lecture.teacher, day) | occupancy.class_busy(lecture.class_name, day)
+                | self.full[lecture.room_type, day])
+        return free_starts(busy, lecture.duration, occupancy.time_slots)
+
+    def _first_colour(self, lecture: Lecture) -> Optional[Tuple[int, int, Hashable]]:
+        """
+        The first (day, start hour) left in hour-major order with a room free for the whole lecture. Colours at
+        which fewer than `spare_rooms` rooms of its type are left come last, so the hours every class wants
+        first do not use up a room type while other hours still have plenty.
+        """
+        occupancy = self.occupancy
+        starts = [self._starts(lecture, day) for day in range(occupancy.num_days)]
+        best, best_spare = None, 0
+        for time in range(occupancy.time_slots):
+            mask = span_mask(time, lecture.duration)
+            for day, day_starts in enumerate(starts):
+                if not day_starts >> time & 1:
+                    continue
+                spare = min(min(self.free_rooms[lecture.room_type, day][time:time + lecture.duration]),
+                            self.spare_rooms)
+                if spare <= best_spare:
+                    continue
+                self.stats['probes'] += 1
+                room = next((room for room in self.rooms_by_type.get(lecture.room_type, [])
+                             if not occupancy.room_busy(room, day) & mask), None)
+                if room is None:
+                    self.stats['rejected.room'] += 1  # Rooms are free at every hour, but no single one for all
+                    continue
+                best, best_spare = (day, time, room), spare
+                if spare == self.spare_rooms:
+                    return best
+        return best
+
+    def _take_room(self, room_type: Hashable, day: int, time: int, duration: int) -> bool:
+        """Count a room of `room_type` as taken for the lecture's hours. Whether an hour ran out of rooms."""
+        free = self.free_rooms[room_type, day]
+        filled = False
+        for hour in range(time, time + duration):
+            free[hour] -= 1
+            if not free[hour]:
+                self.full[room_type, day] |= 1 << hour
+                filled = True
+        return filled
+
+
+SOLVERS = {solver.name: solver for solver in (ConstraintSolver, DSaturSolver, GreedySolver)}
+DEFAULT_SOLVER = ConstraintSolver.name
+
+
+def get_solver(name: Optional[str] = None, rng: Optional[random.Random] = None,
+               progress: Optional[Callable[[int, int], None]] = None, deadline: Optional[float] = None) -> Solver:
+    try:
+        solver_class = SOLVERS[name or DEFAULT_SOLVER]
+    except KeyError:
+        raise ValueError(f"Unknown solver '{name}'. Choose one of: {', '.join(sorted(SOLVERS))}.")
+    return solver_class(rng=rng, progress=progress, deadline=deadline)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from ..benchmark import CollegeSpec, build_college, clear_college, run_benchmark
+from ..models import ClassSubject, Classrooms, ClassroomType, Schedule, Teacher
+from ..problem import components
+from ..scheduler import SchedulingService
+
+
+class BenchmarkTestCase(TestCase):
+    spec = CollegeSpec(classes=3, teachers=3, subjects=4, halls=2, labs=1, hours_per_class=6)
+
+    def test_build_college_is_seeded(self):
+        lectures = build_college(self.spec, seed=4)
+
+        self.assertEqual(Teacher.objects.count(), 3)
+        self.assertEqual(Classrooms.objects.count(), 3)
+        self.assertEqual(sum(ClassSubject.objects.values_list('number_of_lectures', flat=True)), lectures)
+        rows = list(ClassSubject.objects.values_list('class_name__name', 'subject__name', 'number_of_lectures'))
+
+        clear_college()
+        build_college(self.spec, seed=4)
+        self.assertEqual(list(ClassSubject.objects.values_list('class_name__name', 'subject__name',
+                                                               'number_of_lectures')), rows)
+
+    def test_departments_share_nothing(self):
+        build_college(self.spec._replace(teachers=4, departments=2), seed=4)
+        service = SchedulingService()
+        service.prepare_data()
+
+        self.assertEqual(ClassroomType.objects.count(), 4)
+        self.assertEqual(len(components(service.snapshot())), 2)
+
+    def test_run_benchmark_reports_measurements(self):
+        result = run_benchmark('tiny', self.spec, seed=1)
+
+        self.assertEqual(result['preset'], 'tiny')
+        self.assertGreater(result['queries'], 0)
+        self.assertGreater(result['peak_memory'], 0)
+        self.assertEqual(result['placement_rate'], 1.0)
+        self.assertEqual(result['runs'][0]['placed'], result['lectures'])
+        self.assertTrue(Schedule.objects.exists())
@@ -0,0 +1,173 @@
+import random
+import threading
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import bookings
+from ..bookings import book_slot
+from ..breaks import BreakPolicy
+from ..models import (Class, ClassroomOccupancy, Classrooms, ClassroomType, ClassSubject, Schedule, SlotTaken,
+                      Subject, Teacher, hour_mask)
+
+
+def hammer(requests, threads=8):
+    """Send `requests`, callables returning a status code, from `threads` threads started together."""
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    queue = list(requests)
+
+    def worker():
+        client = APIClient()
+        barrier.wait()
+        try:
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    request = queue.pop()
+                code = request(client)
+                with lock:
+                    statuses[code] += 1
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return statuses
+
+
+@override_settings(SCHEDULE_BREAKS={'windows': []})
+class BookingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        hall = ClassroomType.objects.create(name="Lecture Hall")
+        subject = Subject.objects.create(name="Math", duration=1, classroom_type=hall, subject_code="M1")
+        self.teacher = Teacher.objects.create(name="Mr. Smith")
+        self.class_a = Class.objects.create(name="Class A")
+        self.math = ClassSubject.objects.create(class_name=self.class_a, subject=subject, teacher=self.teacher,
+                                                number_of_lectures=2)
+        self.other_class = ClassSubject.objects.create(class_name=Class.objects.create(name="Class B"),
+                                                       subject=subject, teacher=self.teacher, number_of_lectures=2)
+        self.other_teacher = ClassSubject.objects.create(class_name=self.class_a, subject=subject,
+                                                         teacher=Teacher.objects.create(name="Ms. Jones"),
+                                                         number_of_lectures=2)
+
+    def book(self, class_subject, day, time, duration=1):
+        return self.client.post(reverse('book-slot'), {'class_subject_id': class_subject.id, 'day': day,
+                                                       'time': time, 'duration': duration}, format='json')
+
+    def test_teacher_and_class_clashes_are_conflicts(self):
+        self.assertEqual(self.book(self.math, 0, 1, duration=2).status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.book(self.other_class, 0, 2).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.book(self.other_teacher, 0, 0, duration=2).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.book(self.other_teacher, 0, 3).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(self.other_class, 1, 2).status_code, status.HTTP_201_CREATED)
+
+    def test_each_hour_is_a_row(self):
+        self.assertEqual(self.book(self.math, 0, 1, duration=3).status_code, status.HTTP_201_CREATED)
+
+        rows = Schedule.objects.order_by('hour')
+        self.assertEqual([(row.hour, row.duration) for row in rows],
+                         [(hour, timedelta(hours=1)) for hour in (10, 11, 12)])
+        self.assertEqual(self.book(self.other_class, 0, 3).status_code, status.HTTP_409_CONFLICT)
+
+    def test_unavailable_teachers_are_conflicts(self):
+        Teacher.objects.filter(pk=self.teacher.pk).update(unavailable=hour_mask(11))  # Day 0, 11 AM
+
+        self.assertEqual(self.book(self.math, 0, 1, duration=3).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.book(self.math, 1, 2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_break_hours_are_conflicts(self):
+        (time, _), = BreakPolicy().breaks(self.class_a.id, 0)
+        with self.settings(SCHEDULE_BREAKS={}):
+            self.assertEqual(self.book(self.math, 0, time).status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(self.book(self.math, 0, time - 1, duration=2).status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(self.book(self.math, 0, 0).status_code, status.HTTP_201_CREATED)
+
+    def test_slots_must_end_by_five(self):
+        self.assertEqual(self.book(self.math, 0, 7, duration=2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Schedule.objects.exists())
+
+    def test_a_lost_race_is_checked_again(self):
+        checks = []
+
+        def booked_meanwhile(*args):
+            taken = check(*args)
+            checks.append(taken)
+            if len(checks) == 1:
+                book_slot(self.other_teacher, 2, 10)  # Commits between the first check and the write
+            return taken
+
+        check = bookings.clash
+        with mock.patch('schedule.bookings.clash', side_effect=booked_meanwhile):
+            with self.assertRaises(SlotTaken):
+                book_slot(self.math, 2, 10)  # Class A is taken by then, which only the second check sees
+
+        self.assertEqual(len(checks), 3)
+        self.assertEqual(Schedule.objects.get().class_subject, self.other_teacher)
+        self.assertEqual(Teacher.objects.get(pk=self.teacher.pk).booking_revision, 0)
+
+
+@override_settings(SCHEDULE_BREAKS={'windows': []})
+class ConcurrentBookingTestCase(TransactionTestCase):
+    def setUp(self):
+        hall = ClassroomType.objects.create(name="Lecture Hall")
+        self.room = Classrooms.objects.create(classroom_type=hall, classroom_name="LH-1")
+        subject = Subject.objects.create(name="Math", duration=1, classroom_type=hall, subject_code="M1")
+        teachers = [Teacher.objects.create(name=f"Teacher {i}") for i in range(3)]
+        classes = [Class.objects.create(name=f"Class {i}") for i in range(3)]
+        self.class_subjects = [ClassSubject.objects.create(class_name=c, subject=subject, teacher=t,
+                                                           number_of_lectures=1)
+                               for t in teachers for c in classes]
+
+    def test_one_of_many_room_bookings_wins(self):
+        def book(client):
+            return client.post(reverse('book-classroom'), {'classroom_id': self.room.id, 'day': 0, 'hour': 9},
+                               format='json').status_code
+
+        statuses = hammer([book] * 64)
+
+        self.assertEqual(statuses, {status.HTTP_201_CREATED: 1, status.HTTP_409_CONFLICT: 63})
+        self.assertEqual(ClassroomOccupancy.objects.get(classroom=self.room, day=0).booked, 1)
+
+    def test_concurrent_slot_bookings_never_overlap(self):
+        rng = random.Random(1)
+        booked = []
+
+        def request(class_subject, time, duration):
+            def book(client):
+                code = client.post(reverse('book-slot'), {'class_subject_id': class_subject.id, 'day': 0,
+                                                          'time': time, 'duration': duration},
+                                   format='json').status_code
+                if code == status.HTTP_201_CREATED:
+                    booked.append(duration)
+                return code
+            return book
+
+        requests = [request(rng.choice(self.class_subjects), rng.randrange(7), rng.choice([1, 2]))
+                    for _ in range(200)]
+
+        statuses = hammer(requests)
+
+        self.assertEqual(set(statuses), {status.HTTP_201_CREATED, status.HTTP_409_CONFLICT})
+        taken = Counter()
+        for row in Schedule.objects.select_related('class_subject'):
+            self.assertEqual(row.duration, timedelta(hours=1))
+            taken[('teacher', row.class_subject.teacher_id, row.hour)] += 1
+            taken[('class', row.class_subject.class_name_id, row.hour)] += 1
+        self.assertEqual(len(booked), statuses[status.HTTP_201_CREATED])
+        self.assertEqual(sum(booked), Schedule.objects.count())
+        self.assertEqual(max(taken.values()), 1)
@@ -0,0 +1,68 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..exports import export_lectures
+from ..models import Class, ClassSubject, Classrooms, ClassroomType, Schedule, Subject, Teacher
+
+
+class TimetableExportTestCase(TestCase):
+    def setUp(self):
+        lab = ClassroomType.objects.create(name="Lab")
+        self.room = Classrooms.objects.create(classroom_type=lab, classroom_name="LAB-1")
+        self.teacher = Teacher.objects.create(name="Ms. Jones")
+        self.class_a = Class.objects.create(name="Class A")
+        physics = Subject.objects.create(name="Physics, Lab", subject_code="P2", duration=2, classroom_type=lab)
+        class_subject = ClassSubject.objects.create(class_name=self.class_a, subject=physics, teacher=self.teacher,
+                                                    number_of_lectures=2)
+        for day, hour in [(0, 9), (0, 10), (2, 14), (2, 15)]:
+            Schedule.objects.create(class_subject=class_subject, class_object=self.class_a, day=day, hour=hour,
+                                    classroom=self.room)
+        Schedule.objects.create(class_object=self.class_a, day=0, hour=12)  # Recess
+
+    def export(self, fmt, **params):
+        response = self.client.get(reverse('timetable-export', args=[fmt]), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_consecutive_hours_are_merged_into_lectures(self):
+        with self.assertNumQueries(1):
+            lectures = sorted(export_lectures(class_object_id=self.class_a.id))
+
+        self.assertEqual([(lecture.day, lecture.start, lecture.end, lecture.subject) for lecture in lectures],
+                         [(0, 9, 11, "Physics, Lab"), (0, 12, 13, "Recess"), (2, 14, 16, "Physics, Lab")])
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv', teacher=self.teacher.id).decode())))
+
+        self.assertEqual(rows[0], ['Day', 'Start', 'End', 'Class', 'Subject', 'Teacher', 'Classroom'])
+        self.assertEqual(rows[1:], [['Monday', '9:00', '11:00', 'Class A', 'Physics, Lab', 'Ms. Jones', 'LAB-1'],
+                                    ['Wednesday', '14:00', '16:00', 'Class A', 'Physics, Lab', 'Ms. Jones', 'LAB-1']])
+
+    def test_ics_has_one_event_per_lecture(self):
+        calendar = self.export('ics', room=self.room.id, week_of='2026-10-21').decode()
+
+        self.assertTrue(calendar.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(calendar.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTSTART:20261019T090000\r\nDTEND:20261019T110000\r\n', calendar)
+        self.assertIn('SUMMARY:Physics\\, Lab (Class A)\r\n', calendar)
+
+    def test_xlsx_is_a_readable_workbook(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export('xlsx')))
+
+        self.assertIsNone(archive.testzip())
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        namespace = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        rows = [[cell.text for cell in row.iterfind('.//x:t', namespace)]
+                for row in sheet.iterfind('.//x:row', namespace)]
+        self.assertEqual(len(rows), 4)  # Header, two lectures and the recess
+        self.assertEqual(rows[1][:3], ['Monday', '9:00', '11:00'])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('timetable-export', args=['pdf'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('timetable-export', args=['csv']), {'class': 'x'}).status_code,
+                         400)
@@ -0,0 +1,65 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ..feasibility import RoomMatrix, lecture_starts, popcount_table, window_starts
+from ..occupancy import Occupancy, free_starts, span_mask
+from ..solvers import Lecture
+
+
+class FeasibilityMatrixTestCase(SimpleTestCase):
+    def random_instance(self, seed):
+        """Random teacher, class and room bookings, and lectures of one and two hours."""
+        rng = random.Random(seed)
+        occupancy = Occupancy(num_days=6, time_slots=8)
+        rooms = {"hall": [1, 2, 3], "lab": [4, 5]}
+        for day in range(6):
+            for teacher in ("T1", "T2", "T3"):
+                occupancy.block_teacher(teacher, day, rng.getrandbits(8) & rng.getrandbits(8))
+            for room in range(1, 6):
+                occupancy.block_room(room, day, rng.getrandbits(8))
+            for class_name in ("A", "B"):
+                time = rng.randrange(8)
+                occupancy.book(day, time, 1, "T1" if time % 2 else None, class_name)
+        lectures = [Lecture(cs, rng.choice(["T1", "T2", "T3"]), rng.choice("AB"), duration, room_type)
+                    for cs in range(20) for room_type, duration in [rng.choice([("hall", 1), ("lab", 2)])]]
+        return lectures, rooms, occupancy
+
+    def expected_starts(self, lecture, rooms, occupancy, day):
+        """The start hours the bitmask checks of `Occupancy` allow, one lecture and day at a time."""
+        if occupancy.has_teacher_class(day, lecture.teacher, lecture.class_name):
+            return 0
+        busy = occupancy.teacher_busy(lecture.teacher, day) | occupancy.class_busy(lecture.class_name, day)
+        room_starts = 0
+        for room in rooms[lecture.room_type]:
+            room_starts |= free_starts(occupancy.room_busy(room, day), lecture.duration, 8)
+        return free_starts(busy, lecture.duration, 8) & room_starts
+
+    def test_lecture_starts_match_the_bitmask_checks(self):
+        for seed in range(5):
+            lectures, rooms, occupancy = self.random_instance(seed)
+
+            domains = lecture_starts(lectures, occupancy, RoomMatrix(rooms, occupancy))
+
+            self.assertEqual(domains.tolist(), [[self.expected_starts(lecture, rooms, occupancy, day)
+                                                 for day in range(6)] for lecture in lectures])
+
+    def test_best_fit_takes_the_busiest_free_room(self):
+        occupancy = Occupancy(num_days=1, time_slots=8)
+        occupancy.block_room(1, 0, span_mask(0))
+        occupancy.block_room(2, 0, span_mask(0, 3))
+        occupancy.block_room(3, 0, span_mask(4))
+        matrix = RoomMatrix({"hall": [1, 2, 3]}, occupancy)
+
+        self.assertEqual(matrix.best_fit("hall", 0, 5, 2), 2)
+        self.assertEqual(matrix.best_fit("hall", 0, 4, 1), 2)
+        self.assertEqual(matrix.best_fit("hall", 0, 0, 1), 3)
+        self.assertIsNone(matrix.best_fit("lab", 0, 0, 1))
+
+        matrix.book(2, 0, 4, 4)
+        self.assertEqual(matrix.day_starts("hall", 0, 2), free_starts(span_mask(0), 2, 8) | free_starts(
+            span_mask(4), 2, 8))
+
+    def test_windows_longer_than_the_day(self):
+        self.assertEqual(window_starts(RoomMatrix({}, Occupancy(1, 2)).busy, 3).shape, (0, 1, 0))
+        self.assertEqual(popcount_table(3).tolist(), [0, 1, 1, 2, 1, 2, 2, 3])
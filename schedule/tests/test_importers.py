@@ -0,0 +1,87 @@
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..importers import import_rows, read_rows
+from ..models import Class, ClassroomType, ClassSubject, Subject, Teacher
+
+
+class BulkImportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, kind, body, content_type):
+        return self.client.post(reverse('bulk-import', args=[kind]), data=body, content_type=content_type)
+
+    def test_csv_teachers_with_availability(self):
+        body = "name,unavailable\nMr. Smith,0:9;0:10\nMs. Jones,\nMr. Brown,7:9\n"
+
+        response = self.post('teachers', body, 'text/csv')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3])
+        smith = Teacher.objects.get(name="Mr. Smith")
+        self.assertEqual(smith.free_slots(0), list(range(11, 17)))
+        self.assertTrue(Teacher.objects.get(name="Ms. Jones").is_available(0, 9))
+
+    def test_jsonl_class_subjects_resolve_names(self):
+        lab = ClassroomType.objects.create(name="Lab")
+        Subject.objects.create(name="Physics Lab", subject_code="P2", duration=2, classroom_type=lab)
+        Class.objects.create(name="Class A")
+        Teacher.objects.create(name="Ms. Jones")
+        rows = [
+            {'class_name': "Class A", 'subject': "P2", 'teacher': "Ms. Jones", 'number_of_lectures': 2},
+            {'class_name': "Class A", 'subject': "Physics Lab", 'teacher': "Ms. Jones", 'number_of_lectures': 1},
+            {'class_name': "Class B", 'subject': "P2", 'teacher': "Ms. Jones", 'number_of_lectures': 1},
+        ]
+        body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+
+        response = self.post('class-subjects', body, 'application/x-ndjson')
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['error_count'], 2)
+        self.assertEqual(response.data['errors'][0], {'row': 3, 'errors': {
+            'non_field_errors': ["Class 'Class B' does not exist."]}})
+        self.assertEqual(sorted(ClassSubject.objects.values_list('number_of_lectures', flat=True)), [1, 2])
+
+    def test_multipart_subject_upload(self):
+        ClassroomType.objects.create(name="Lecture Hall")
+        upload = SimpleUploadedFile("subjects.csv", b"name,duration,subject_code,classroom_type\n"
+                                                    b"Math,1,M1,Lecture Hall\nArt,0,A1,Lecture Hall\n")
+
+        response = self.client.post(reverse('bulk-import', args=['subjects']), {'file': upload})
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(list(Subject.objects.values_list('subject_code', flat=True)), ["M1"])
+        self.assertIn('duration', response.data['errors'][0]['errors'])
+
+    def test_unknown_kind_and_format(self):
+        self.assertEqual(self.post('rooms', "name\nx\n", 'text/csv').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.post('classes', "name\nx\n", 'text/plain').status_code,
+                         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_queries_do_not_grow_with_rows(self):
+        lines = [b"name\n"] + [f"Class {i}\n".encode() for i in range(1200)]
+
+        with self.assertNumQueries(7):  # Savepoint, existing names, four batch inserts, release
+            result = import_rows('classes', read_rows(lines, 'csv'))
+
+        self.assertEqual(result['created'], 1200)
+        self.assertEqual(Class.objects.count(), 1200)
+
+    def test_duplicate_names_are_row_errors(self):
+        Teacher.objects.create(name="Mr. Smith")
+        lines = [b"name\n", b"Mr. Smith\n", b"Ms. Jones\n", b"Ms. Jones\n"]
+
+        result = import_rows('teachers', read_rows(lines, 'csv'))
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['errors'], [
+            {'row': 1, 'errors': {'non_field_errors': ["Teacher 'Mr. Smith' already exists."]}},
+            {'row': 3, 'errors': {'non_field_errors': ["Teacher 'Ms. Jones' already exists."]}},
+        ])
@@ -0,0 +1,65 @@
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from ..models import Class, ClassroomType, Classrooms, ClassSubject, Schedule, Subject, Teacher
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked in SQLite's EXPLAIN QUERY PLAN format")
+class QueryPlanTestCase(TestCase):
+    def assertUsesIndex(self, queryset, columns):
+        plan = queryset.explain()
+        self.assertIn('USING', plan)
+        self.assertIn(f'({columns})', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_timetable_lookups_use_indexes(self):
+        # `Schedule.objects` is the published version, so every lookup starts from it
+        self.assertUsesIndex(Schedule.objects.filter(class_object_id=1).order_by('day', 'hour'),
+                             'version_id=? AND class_object_id=?')
+        self.assertUsesIndex(Schedule.objects.filter(classroom_id=1).order_by('day', 'hour'),
+                             'version_id=? AND classroom_id=?')
+        self.assertUsesIndex(Schedule.objects.filter(day=0, hour=9), 'version_id=? AND day=? AND hour=?')
+        self.assertUsesIndex(Schedule.all_versions.filter(class_subject_id=1).order_by('day', 'hour'),
+                             'class_subject_id=?')
+
+    def test_name_lookups_use_indexes(self):
+        self.assertUsesIndex(Teacher.objects.filter(name="Mr. Smith"), 'name=?')
+        self.assertUsesIndex(Class.objects.filter(name="Class A"), 'name=?')
+
+
+class ScheduleConstraintTestCase(TestCase):
+    def setUp(self):
+        hall = ClassroomType.objects.create(name="Lecture Hall")
+        self.room = Classrooms.objects.create(classroom_type=hall, classroom_name="LH-1")
+        subject = Subject.objects.create(name="Math", subject_code="M1", duration=1, classroom_type=hall)
+        self.class_a = Class.objects.create(name="Class A")
+        self.class_b = Class.objects.create(name="Class B")
+        teacher = Teacher.objects.create(name="Mr. Smith")
+        self.math_a = ClassSubject.objects.create(class_name=self.class_a, subject=subject, teacher=teacher,
+                                                  number_of_lectures=2)
+        self.math_b = ClassSubject.objects.create(class_name=self.class_b, subject=subject, teacher=teacher,
+                                                  number_of_lectures=2)
+        Schedule.objects.create(class_object=self.class_a, class_subject=self.math_a, classroom=self.room, day=0,
+                                hour=9)
+
+    def test_class_cannot_be_booked_twice_in_an_hour(self):
+        with self.assertRaises(IntegrityError):
+            Schedule.objects.create(class_object=self.class_a, class_subject=self.math_a, day=0, hour=9)
+
+    def test_room_cannot_be_booked_twice_in_an_hour(self):
+        with self.assertRaises(IntegrityError):
+            Schedule.objects.create(class_object=self.class_b, class_subject=self.math_b, classroom=self.room,
+                                    day=0, hour=9)
+
+    def test_rows_without_a_room_never_collide(self):
+        # Recess rows have no classroom, and NULLs never collide in a unique constraint
+        Schedule.objects.create(class_object=self.class_b, day=0, hour=9)
+        Schedule.objects.create(class_object=self.class_b, day=0, hour=10)
+
+        self.assertEqual(Schedule.objects.filter(classroom__isnull=True).count(), 2)
+
+    def test_names_are_unique(self):
+        with self.assertRaises(IntegrityError):
+            Teacher.objects.create(name="Mr. Smith")
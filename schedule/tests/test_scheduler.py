@@ -0,0 +1,557 @@
+import copy
+import io
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import (Class, ClassSubject, ClassroomOccupancy, Classrooms,
+                      ClassroomType, Schedule, Subject, Teacher)
+from .. import metrics
+from ..breaks import BreakPolicy, BreakWindow, compile_breaks
+from ..localsearch import LocalSearch
+from ..occupancy import Occupancy, span_mask
+from ..problem import Problem, components, solve, solve_best, solve_within
+from ..scheduler import SchedulingService
+from ..scoring import SoftWeights, gaps, off_hours, soft_penalty
+from ..solvers import SOLVERS, ConstraintSolver, DSaturSolver, GreedySolver, Lecture, Placement
+
+
+class SchedulingServiceTestCase(TestCase):
+    def setUp(self):
+        self.lecture_hall = ClassroomType.objects.create(name="Lecture Hall")
+        self.lab = ClassroomType.objects.create(name="Lab")
+        self.room = Classrooms.objects.create(classroom_type=self.lecture_hall, classroom_name="LH-1")
+        self.lab_room = Classrooms.objects.create(classroom_type=self.lab, classroom_name="LAB-1")
+        self.teacher = Teacher.objects.create(name="Mr. Smith")
+        self.other_teacher = Teacher.objects.create(name="Ms. Jones")
+        self.class_a = Class.objects.create(name="Class A")
+        self.class_b = Class.objects.create(name="Class B")
+        math = Subject.objects.create(name="Math", duration=1, classroom_type=self.lecture_hall, subject_code="M1")
+        physics_lab = Subject.objects.create(name="Physics Lab", duration=2, classroom_type=self.lab,
+                                             subject_code="P2")
+        self.math_a = ClassSubject.objects.create(class_name=self.class_a, subject=math, teacher=self.teacher,
+                                                  number_of_lectures=3)
+        ClassSubject.objects.create(class_name=self.class_b, subject=math, teacher=self.teacher,
+                                    number_of_lectures=3)
+        ClassSubject.objects.create(class_name=self.class_a, subject=physics_lab, teacher=self.other_teacher,
+                                    number_of_lectures=2)
+
+    def test_teacher_availability_is_respected(self):
+        self.teacher.set_availability(0, 9, available=False)
+        self.teacher.save()
+
+        service = SchedulingService()
+        service.prepare_data()
+
+        self.assertEqual(service.occupancy.teacher_busy("Mr. Smith", 0), span_mask(0))
+        self.assertEqual(service.occupancy.teacher_busy("Mr. Smith", 1), 0)
+
+    def test_breaks_are_kept_free_per_class(self):
+        service = SchedulingService(breaks=BreakPolicy((BreakWindow(11, 13),)))
+        service.prepare_data()
+
+        # Each class keeps its own break free, not whichever class was booked last
+        a_break, b_break = (service.breaks.breaks(class_id, 0)[0][0] for class_id in (self.class_a.id,
+                                                                                        self.class_b.id))
+        self.assertNotEqual(a_break, b_break)
+        self.assertFalse(service.occupancy.is_free(0, a_break, "Mr. Smith", "Class A", self.room.id))
+        self.assertTrue(service.occupancy.is_free(0, a_break, "Mr. Smith", "Class B", self.room.id))
+
+        service.run()
+        self.assertFalse(Schedule.objects.filter(class_subject__isnull=True).exists())
+        for entry in Schedule.objects.select_related('class_object'):
+            self.assertFalse(service.occupancy.class_blocked[entry.class_object.name][entry.day]
+                             & span_mask(entry.hour - 9))
+
+    def test_generate_timetable_has_no_clashes(self):
+        for solver in SOLVERS:
+            with self.subTest(solver=solver):
+                SchedulingService(solver=solver, seed=1).generate_timetable()
+
+                lectures = Schedule.objects.filter(class_subject__isnull=False).select_related('class_subject')
+                self.assertTrue(lectures.exists())
+                teacher_slots = [(s.class_subject.teacher_id, s.day, s.hour) for s in lectures]
+                class_slots = [(s.class_object_id, s.day, s.hour) for s in Schedule.objects.all()]
+                self.assertEqual(len(teacher_slots), len(set(teacher_slots)))
+                self.assertEqual(len(class_slots), len(set(class_slots)))
+
+    def test_multi_start_keeps_the_best_attempt(self):
+        service = SchedulingService(seed=5, attempts=4, workers=2)
+        result = service.run()
+
+        service.prepare_data()
+        problem = service.snapshot()
+        rng = random.Random(5)
+        seeds = [rng.randrange(2 ** 32) for _ in range(4)]
+        scores = [solve(problem, service.solver, seed).score for seed in seeds]
+        self.assertEqual(service.score, min(scores))
+        self.assertEqual(Schedule.objects.filter(class_subject__isnull=False).count(),
+                         sum(p.lecture.duration for p in result.placements))
+
+    def test_worker_processes_are_spawned(self):
+        # Generation jobs run on threads, and forking a process that has threads running is unsafe
+        with mock.patch('schedule.problem.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            SchedulingService(seed=5, attempts=2, workers=2).run()
+
+        self.assertEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+
+    def test_unknown_solver_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SchedulingService(solver="quantum")
+
+    def test_time_budget_keeps_the_best_timetable_and_reports_unplaced_lectures(self):
+        self.other_teacher.unavailable = (1 << 48) - 1  # Never available, so the physics labs cannot be placed
+        self.other_teacher.save()
+        service = SchedulingService(seed=2)
+
+        service.generate_timetable(time_budget=0.3)
+
+        self.assertGreater(service.metrics.counters['attempts'], 1)
+        self.assertEqual(service.score[0], 2)
+        self.assertEqual(service.unplaced, [{
+            'class_subject': service.unplaced[0]['class_subject'], 'class': "Class A", 'subject': "Physics Lab",
+            'teacher': "Ms. Jones", 'missing': 2, 'reason': 'teacher_busy',
+            'detail': "The teacher has no free hours left long enough for the lecture."}])
+        self.assertEqual(Schedule.objects.filter(class_subject=self.math_a).count(), 3)
+
+    def test_generate_timetable_writes_in_bulk(self):
+        SchedulingService().generate_timetable()
+        with CaptureQueriesContext(connection) as queries:
+            SchedulingService().generate_timetable()
+
+        # Inserts for the draft version, its schedule rows and room occupancy; the publish updates the occupancy,
+        # the pointer and the statuses of both versions. The previous version is archived, not deleted
+        statements = [query['sql'].split(' ', 1)[0] for query in queries]
+        self.assertEqual(statements.count('DELETE'), 0)
+        self.assertLessEqual(statements.count('INSERT'), 3)
+        self.assertLessEqual(statements.count('UPDATE'), 4)
+
+    def test_room_occupancy_follows_the_generated_timetable(self):
+        self.room.book_classroom(9, day=0)  # Booked by hand, not part of any timetable
+        for _ in range(2):
+            SchedulingService(seed=3).generate_timetable()
+
+        expected = {}
+        for classroom_id, day, hour in Schedule.objects.filter(classroom__isnull=False).values_list(
+                'classroom_id', 'day', 'hour'):
+            expected[(classroom_id, day)] = expected.get((classroom_id, day), 0) | 1 << (hour - 9)
+        expected[(self.room.id, 0)] = expected.get((self.room.id, 0), 0) | 1
+        stored = {(o.classroom_id, o.day): o.booked for o in ClassroomOccupancy.objects.exclude(booked=0)}
+        self.assertEqual(stored, expected)
+
+    def test_failed_commit_keeps_previous_timetable(self):
+        SchedulingService().generate_timetable()
+        previous = list(Schedule.objects.order_by('id').values_list('id', flat=True))
+
+        with mock.patch.object(Schedule.objects, 'bulk_create', side_effect=DatabaseError("disk full")):
+            with self.assertRaises(DatabaseError):
+                SchedulingService().generate_timetable()
+
+        self.assertEqual(list(Schedule.objects.order_by('id').values_list('id', flat=True)), previous)
+
+
+    def test_get_schedule_reads_in_one_query(self):
+        service = SchedulingService(seed=3)
+        service.run()
+
+        with self.assertNumQueries(1):
+            schedule = service.get_schedule()
+        self.assertEqual(sum(len(slot) for day in schedule for slot in day), Schedule.objects.count())
+
+    def stored_lectures(self):
+        return set(Schedule.objects.filter(class_subject__isnull=False).values_list(
+            'class_subject_id', 'day', 'hour', 'classroom_id'))
+
+    def test_repair_moves_only_lectures_clashing_with_new_availability(self):
+        SchedulingService(seed=3).generate_timetable()
+        before = self.stored_lectures()
+        clash = Schedule.objects.filter(class_subject=self.math_a).order_by('day', 'hour').first()
+        self.teacher.set_availability(clash.day, clash.hour, available=False)
+        self.teacher.save()
+
+        result = SchedulingService(seed=3).repair(teacher_id=self.teacher.id)
+
+        after = self.stored_lectures()
+        self.assertEqual(len(result.removed), 1)
+        self.assertEqual(len(result.placements), 1)
+        self.assertEqual(before - after, {(self.math_a.id, clash.day, clash.hour, self.room.id)})
+        self.assertEqual(len(after - before), 1)
+        self.assertFalse(Schedule.objects.filter(class_subject__teacher=self.teacher, day=clash.day,
+                                                 hour=clash.hour).exists())
+        self.assertEqual(ClassroomOccupancy.objects.get(classroom=self.room, day=clash.day).booked
+                         & (1 << (clash.hour - 9)), 0)
+
+    def test_repair_follows_the_number_of_lectures(self):
+        SchedulingService(seed=3).generate_timetable()
+        before = self.stored_lectures()
+
+        self.math_a.number_of_lectures = 1
+        self.math_a.save()
+        SchedulingService(seed=3).repair(class_subject_id=self.math_a.id)
+        self.assertEqual(Schedule.objects.filter(class_subject=self.math_a).count(), 1)
+        self.assertTrue(self.stored_lectures() <= before)
+
+        self.math_a.number_of_lectures = 2
+        self.math_a.save()
+        result = SchedulingService(seed=3).repair(class_subject_id=self.math_a.id)
+        self.assertEqual(result.removed, [])
+        self.assertEqual(Schedule.objects.filter(class_subject=self.math_a).count(), 2)
+
+    def test_repair_of_an_unchanged_timetable_writes_nothing(self):
+        SchedulingService(seed=3).generate_timetable()
+
+        with CaptureQueriesContext(connection) as queries:
+            result = SchedulingService(seed=3).repair()
+
+        self.assertEqual((result.removed, result.placements, result.unplaced), ([], [], []))
+        self.assertFalse([q for q in queries.captured_queries
+                          if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+
+
+    def test_run_records_phase_timings_and_counters(self):
+        metrics.reset()
+        service = SchedulingService(seed=3)
+        result = service.run()
+
+        self.assertEqual(set(service.timings), {'prepare', 'placement', 'persist'})
+        counters = service.metrics.counters
+        self.assertEqual(counters['placed'], len(result.placements))
+        self.assertGreater(counters['probes'], 0)
+        self.assertGreater(counters['db_queries.prepare'], 0)
+        self.assertGreater(counters['db_queries.persist'], 0)
+        self.assertEqual(counters['db_queries.placement'], 0)
+        self.assertEqual(metrics.snapshot()['runs'], {'generate': 1})
+
+
+class SolverTestCase(SimpleTestCase):
+    def dense_instance(self):
+        """One teacher free for a single hour per day and one lecture per day to give."""
+        occupancy = Occupancy(num_days=6, time_slots=8)
+        for day in range(6):
+            occupancy.block_teacher("T", day, span_mask(0, 8) & ~span_mask(day))
+        lectures = [Lecture(1, "T", "A", 1, "hall")] * 6
+        return lectures, {"hall": [1, 2]}, occupancy
+
+    def test_greedy_solver_counts_rejections_by_reason(self):
+        lectures, rooms, occupancy = self.dense_instance()
+        solver = GreedySolver(rng=random.Random(1))
+        result = solver.solve(lectures, rooms, occupancy)
+
+        rejected = sum(count for key, count in solver.stats.items() if key.startswith('rejected.'))
+        self.assertGreater(solver.stats['rejected.teacher'], 0)
+        self.assertEqual(solver.stats['probes'], rejected + len(result.placements))
+
+    def test_constraint_solver_places_dense_instance(self):
+        lectures, rooms, occupancy = self.dense_instance()
+        result = ConstraintSolver().solve(lectures, rooms, occupancy)
+
+        self.assertEqual(result.unplaced, [])
+        self.assertEqual(sorted((p.day, p.time) for p in result.placements), [(day, day) for day in range(6)])
+
+    def test_greedy_solver_books_what_it_places(self):
+        lectures, rooms, occupancy = self.dense_instance()
+        result = GreedySolver().solve(lectures, rooms, occupancy)
+
+        self.assertEqual(len(result.placements) + len(result.unplaced), 6)
+        for placement in result.placements:
+            self.assertFalse(occupancy.is_free(placement.day, placement.time, None, "A"))
+
+    def test_constraint_solver_respects_room_capacity(self):
+        occupancy = Occupancy(num_days=1, time_slots=2)
+        lectures = [Lecture(cs, f"T{cs}", f"C{cs}", 1, "lab") for cs in range(3)]
+        result = ConstraintSolver().solve(lectures, {"lab": [1]}, occupancy)
+
+        self.assertEqual(len(result.placements), 2)
+        self.assertEqual(len(result.unplaced), 1)
+        self.assertEqual({p.time for p in result.placements}, {0, 1})
+
+    def test_dsatur_places_dense_instance_and_respects_room_capacity(self):
+        lectures, rooms, occupancy = self.dense_instance()
+        result = DSaturSolver().solve(lectures, rooms, occupancy)
+        self.assertEqual(sorted((p.day, p.time) for p in result.placements), [(day, day) for day in range(6)])
+
+        lectures = [Lecture(cs, f"T{cs}", f"C{cs}", 1, "lab") for cs in range(3)]
+        result = DSaturSolver().solve(lectures, {"lab": [1]}, Occupancy(num_days=1, time_slots=2))
+        self.assertEqual((len(result.placements), len(result.unplaced)), (2, 1))
+        self.assertEqual({p.time for p in result.placements}, {0, 1})
+
+    def test_dsatur_colours_the_most_saturated_lecture_first(self):
+        occupancy = Occupancy(num_days=2, time_slots=4)
+        for day in range(2):
+            occupancy.block_teacher("Lab", day, span_mask(0, 4) & ~span_mask(0, 2) if day else span_mask(0, 4))
+        # The lab can only go first thing on Tuesday, which the easy lectures would otherwise take first
+        lectures = [Lecture(cs, f"T{cs}", "A", 1, "hall") for cs in range(6)] + [Lecture(9, "Lab", "A", 2, "lab")]
+        solver = DSaturSolver(rng=random.Random(1))
+
+        result = solver.solve(lectures, {"hall": [1], "lab": [2]}, occupancy)
+
+        self.assertEqual(result.unplaced, [])
+        self.assertEqual(result.placements[0], Placement(lectures[-1], 1, 0, 2))
+        self.assertEqual(sorted((p.day, p.time) for p in result.placements[1:]),
+                         [(0, 0), (0, 1), (0, 2), (0, 3), (1, 2), (1, 3)])
+
+
+    def test_solvers_stop_at_the_deadline(self):
+        for solver_class in (GreedySolver, ConstraintSolver, DSaturSolver):
+            with self.subTest(solver=solver_class.name):
+                lectures, rooms, occupancy = self.dense_instance()
+                result = solver_class(deadline=monotonic() - 1).solve(lectures, rooms, occupancy)
+
+                self.assertEqual(result.placements, [])
+                self.assertEqual(list(result.reasons), ['time_budget'] * 6)
+
+    def test_unplaced_lectures_say_why(self):
+        occupancy = Occupancy(num_days=1, time_slots=2)
+        occupancy.block_teacher("Busy", 0, span_mask(0, 2))
+        occupancy.block_class("A", 0, span_mask(0))  # A break
+        lectures = [Lecture(1, "Busy", "B", 1, "hall"), Lecture(2, "T", "A", 2, "hall"), Lecture(3, "T", "C", 1, "lab"),
+                    Lecture(4, "U", "D", 1, "hall"), Lecture(4, "U", "D", 1, "hall")]
+
+        for solver_class in (GreedySolver, ConstraintSolver, DSaturSolver):
+            with self.subTest(solver=solver_class.name):
+                result = solver_class(rng=random.Random(1)).solve(lectures, {"hall": [1]}, copy.deepcopy(occupancy))
+
+                reasons = {(lecture.class_subject, reason) for lecture, reason in zip(result.unplaced, result.reasons)}
+                self.assertEqual(reasons, {(1, 'teacher_busy'), (2, 'class_busy'), (3, 'no_room'),
+                                           (4, 'teacher_class_day')})
+
+    def test_anytime_solving_runs_attempts_until_the_budget_is_spent(self):
+        lecture = Lecture(1, "T", "A", 1, "hall")
+        one_day = Problem(1, 8, [lecture], {"hall": [1]}, Occupancy(1, 8))
+        two_days = one_day._replace(num_days=2, occupancy=Occupancy(2, 8))
+
+        best, attempts = solve_within(one_day, 'constraint', iter(range(100)), budget=10)
+        self.assertEqual((best.score, attempts), ((0, 0), 1))  # Perfect at once, so no point going on
+
+        started = monotonic()
+        best, attempts = solve_within(two_days, 'constraint', iter(range(1000)), budget=0.1)
+        self.assertGreaterEqual(monotonic() - started, 0.1)
+        self.assertEqual(best.score, (0, 1))  # One day without the lecture
+        self.assertGreater(attempts, 1)
+
+
+    def two_departments(self):
+        """Sciences and arts share no class, teacher or room type; the arts teacher is unavailable on Monday."""
+        occupancy = Occupancy(num_days=2, time_slots=4)
+        occupancy.block_teacher("Art", 0, span_mask(0, 4))
+        occupancy.block_room(3, 1, span_mask(0))
+        occupancy.block_class("S1", 1, span_mask(2))
+        lectures = [Lecture(1, "Physics", "S1", 1, "lab"), Lecture(2, "Art", "A1", 1, "studio"),
+                    Lecture(3, "Maths", "S2", 1, "hall"), Lecture(4, "Maths", "S1", 1, "hall"),
+                    Lecture(5, "Physics", "S2", 2, "lab"), Lecture(6, "Art", "A2", 1, "studio")] * 2
+        rooms = {"hall": [1], "lab": [2], "studio": [3]}
+        return Problem(2, 4, lectures, rooms, occupancy)
+
+    def test_problems_split_into_unrelated_parts(self):
+        problem = self.two_departments()
+
+        sciences, arts = components(problem)
+
+        self.assertEqual(sciences.lectures, [lecture for lecture in problem.lectures if lecture.teacher != "Art"])
+        self.assertEqual(arts.lectures, [lecture for lecture in problem.lectures if lecture.teacher == "Art"])
+        self.assertEqual((sciences.rooms_by_type, arts.rooms_by_type),
+                         ({"hall": [1], "lab": [2]}, {"studio": [3]}))
+        self.assertEqual((sciences.occupancy.teacher_blocked, sciences.occupancy.room_blocked), ({}, {}))
+        self.assertEqual((sciences.occupancy.class_blocked, arts.occupancy.class_blocked),
+                         ({"S1": [0, span_mask(2)]}, {}))
+        self.assertEqual(arts.occupancy.teacher_busy("Art", 0), span_mask(0, 4))
+        self.assertEqual(arts.occupancy.room_busy(3, 1), span_mask(0))
+        self.assertEqual(components(problem._replace(lectures=problem.lectures[:1])), [
+            problem._replace(lectures=problem.lectures[:1])])
+
+    def test_parts_keep_their_own_best_attempt(self):
+        problem = self.two_departments()
+        seeds = [3, 4, 5]
+
+        merged = solve_best(problem, 'greedy', seeds, workers=1)
+
+        best = [min((solve(part, 'greedy', seed) for seed in seeds), key=lambda attempt: attempt.score)
+                for part in components(problem)]
+        self.assertEqual(merged.score, tuple(map(sum, zip(*(attempt.score for attempt in best)))))
+        self.assertEqual(merged.result.placements, best[0].result.placements + best[1].result.placements)
+        self.assertEqual(merged.stats['probes'], best[0].stats['probes'] + best[1].stats['probes'])
+
+
+class BreakPolicyTestCase(SimpleTestCase):
+    def test_breaks_are_staggered_over_the_window(self):
+        policy = BreakPolicy((BreakWindow(11, 14), BreakWindow(15, 17, 2)))
+
+        self.assertEqual([policy.breaks(group, 0) for group in range(3)],
+                         [[(2, 1), (6, 2)], [(3, 1), (6, 2)], [(4, 1), (6, 2)]])
+        self.assertEqual([policy.breaks(0, day)[0] for day in range(4)], [(2, 1), (3, 1), (4, 1), (2, 1)])
+        self.assertEqual(policy.masks(1, 2), [span_mask(3) | span_mask(6, 2), span_mask(4) | span_mask(6, 2)])
+
+    def test_cohorts_break_together(self):
+        classes = [("A", 1, "First year"), ("B", 2, "First year"), ("C", 3, ""), ("D", 4, "")]
+
+        by_class = compile_breaks(BreakPolicy(), classes, 6)
+        by_cohort = compile_breaks(BreakPolicy(align='cohort'), classes, 6)
+
+        self.assertNotEqual(by_class["A"], by_class["B"])
+        self.assertEqual(by_cohort["A"], by_cohort["B"])
+        self.assertNotEqual(by_cohort["C"], by_cohort["D"])  # Classes without a cohort stay on their own
+        self.assertEqual((by_cohort["C"], by_cohort["D"]), (by_class["C"], by_class["D"]))
+
+    def test_setting_is_checked(self):
+        policy = BreakPolicy.from_setting({'windows': [(12, 14, 2)], 'align': 'cohort'})
+        self.assertEqual(policy, BreakPolicy((BreakWindow(12, 14, 2),), 'cohort'))
+        self.assertEqual(BreakPolicy.from_setting({}), BreakPolicy())
+
+        for setting in ({'windows': [(16, 18)]}, {'windows': [(11, 12, 2)]}, {'align': 'school'}):
+            with self.assertRaises(ValueError):
+                BreakPolicy.from_setting(setting)
+
+
+class ScoringTestCase(SimpleTestCase):
+    def test_gaps(self):
+        self.assertEqual(gaps(0), 0)
+        self.assertEqual(gaps(0b111), 0)
+        self.assertEqual(gaps(0b10011), 2)
+        self.assertEqual(gaps(0b10011, breaks=0b100), 1)
+        self.assertEqual(gaps(0b11, breaks=0b1100), 0)  # A break outside the day's lectures is no gap either
+
+    def test_class_breaks_are_not_gaps(self):
+        lecture = Lecture(1, "T", "A", 1, "hall")
+        placements = [Placement(lecture, 0, 0, 1), Placement(lecture, 0, 2, 1)]
+
+        self.assertEqual(soft_penalty(placements, 1), 2)  # Hour 1 idle for both the teacher and the class
+        self.assertEqual(soft_penalty(placements, 1, class_breaks={"A": [span_mask(1, 1)]}), 1)
+
+    def test_soft_penalty_counts_gaps_and_day_imbalance(self):
+        lecture = Lecture(1, "T", "A", 1, "hall")
+        packed = [Placement(lecture, 0, 0, 1), Placement(lecture, 0, 1, 1)]
+        spread = [Placement(lecture, 0, 0, 1), Placement(lecture, 1, 0, 1)]
+
+        self.assertEqual(soft_penalty(packed, num_days=2), 2)  # Two hours on Monday, none on Tuesday
+        self.assertEqual(soft_penalty(spread, num_days=2), 0)
+        self.assertEqual(soft_penalty([Placement(lecture, 0, 0, 1), Placement(lecture, 0, 3, 1)], 1), 4)
+
+    def test_weights_scale_each_term(self):
+        lecture = Lecture(1, "T", "A", 2, "hall")
+        placements = [Placement(lecture, 0, 0, 1), Placement(lecture, 0, 5, 1)]  # Hours 0-1 and 5-6, 3 idle
+        weights = SoftWeights(gaps=2, day_balance=0, off_hours=3, preferred_hours=span_mask(0, 6))
+
+        self.assertEqual(off_hours(5, 2, weights), 1)
+        self.assertEqual(soft_penalty(placements, 1, weights), 2 * 3 * 2 + 3 * 1)
+
+
+class LocalSearchTestCase(SimpleTestCase):
+    def solved_instance(self, seed):
+        """A random instance placed by the greedy solver, with the occupancy it started from."""
+        rng = random.Random(seed)
+        occupancy = Occupancy(num_days=5, time_slots=8)
+        for day in range(5):
+            occupancy.block_teacher("T1", day, rng.getrandbits(8) & rng.getrandbits(8))
+        lectures = [Lecture(cs, rng.choice(["T1", "T2", "T3"]), rng.choice("ABC"), duration, room_type)
+                    for cs in range(12) for room_type, duration in [rng.choice([("hall", 1), ("lab", 2)])]] * 3
+        rooms = {"hall": [1, 2], "lab": [3]}
+        solved = copy.deepcopy(occupancy)
+        result = GreedySolver(rng=rng).solve(lectures, rooms, solved)
+        return result.placements, rooms, occupancy, solved
+
+    def test_search_keeps_hard_constraints_and_lowers_the_penalty(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                placements, rooms, occupancy, solved = self.solved_instance(seed)
+                search = LocalSearch(placements, rooms, solved, rng=random.Random(seed))
+
+                improved = search.run(200 * len(placements))
+
+                self.assertEqual(sorted(p.lecture for p in improved), sorted(p.lecture for p in placements))
+                self.assertEqual(search.penalty, soft_penalty(improved, 5))
+                self.assertLessEqual(search.penalty, soft_penalty(placements, 5))
+                self.assertEqual(search.stats['search.improvement'],
+                                 soft_penalty(placements, 5) - soft_penalty(improved, 5))
+                # Booking the result from scratch gives the occupancy the search kept up to date
+                for p in improved:
+                    self.assertTrue(occupancy.is_free(p.day, p.time, p.lecture.teacher, p.lecture.class_name, p.room,
+                                                      p.lecture.duration))
+                    self.assertFalse(occupancy.has_teacher_class(p.day, p.lecture.teacher, p.lecture.class_name))
+                    self.assertIn(p.room, rooms[p.lecture.room_type])
+                    occupancy.book(p.day, p.time, p.lecture.duration, p.lecture.teacher, p.lecture.class_name, p.room)
+                for table in ('teachers', 'classes', 'rooms'):
+                    self.assertEqual({key: days for key, days in getattr(solved, table).items() if any(days)},
+                                     getattr(occupancy, table))
+
+    def test_search_keeps_track_of_breaks_and_the_best_placements(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                placements, rooms, occupancy, solved = self.solved_instance(seed)
+                breaks = {class_name: [span_mask(3, 1)] * 5 for class_name in "ABC"}
+                solved.class_blocked = breaks  # Blocked after solving, so placements may sit on them
+                search = LocalSearch(placements, rooms, solved, rng=random.Random(seed))
+                search.start_temperature = search.end_temperature = 10.0  # Accepts most moves, good or bad
+
+                improved = search.run(50 * len(placements))
+
+                self.assertEqual(search.penalty, soft_penalty(improved, 5, class_breaks=breaks))
+                self.assertLessEqual(search.penalty, soft_penalty(placements, 5, class_breaks=breaks))
+                self.assertEqual(search.class_days, LocalSearch(improved, rooms, solved).class_days)
+
+    def test_preferred_hours_pull_lectures_in(self):
+        lectures = [Lecture(cs, f"T{cs}", "A", 1, "hall") for cs in range(4)]
+        placements = [Placement(lecture, cs, 7, cs) for cs, lecture in enumerate(lectures)]
+        occupancy = Occupancy(num_days=4, time_slots=8)
+        for p in placements:
+            occupancy.book(p.day, p.time, 1, p.lecture.teacher, "A", p.room)
+        weights = SoftWeights(off_hours=5, preferred_hours=span_mask(0, 4))
+
+        improved = LocalSearch(placements, {"hall": [0, 1, 2, 3]}, occupancy, weights, random.Random(1)).run(400)
+
+        self.assertEqual(sum(off_hours(p.time, 1, weights) for p in improved), 0)
+        self.assertEqual(soft_penalty(improved, 4, weights), 0)
+
+    def test_solve_polishes_when_asked(self):
+        placements, rooms, occupancy, _ = self.solved_instance(0)
+        lectures = [p.lecture for p in placements]
+        problem = Problem(5, 8, lectures, rooms, occupancy)
+
+        plain = solve(problem, 'greedy', 1)
+        polished = solve(problem._replace(search_steps=50), 'greedy', 1)
+
+        self.assertEqual(polished.score[0], plain.score[0])
+        self.assertLess(polished.score[1], plain.score[1])
+        self.assertGreater(polished.stats['search.moves'] + polished.stats['search.swaps'], 0)
+        self.assertNotIn('search.moves', plain.stats)
+
+
+class GenerateTimetableCommandTestCase(TestCase):
+    def setUp(self):
+        lecture_hall = ClassroomType.objects.create(name="Lecture Hall")
+        Classrooms.objects.create(classroom_type=lecture_hall, classroom_name="LH-1")
+        math = Subject.objects.create(name="Math", duration=1, classroom_type=lecture_hall, subject_code="M1")
+        ClassSubject.objects.create(class_name=Class.objects.create(name="Class A"), subject=math,
+                                    teacher=Teacher.objects.create(name="Mr. Smith"), number_of_lectures=4)
+
+    def generate(self, *args):
+        output = io.StringIO()
+        call_command('generate_timetable', *args, stdout=output)
+        return output.getvalue()
+
+    def test_dry_run_reports_stats_without_storing(self):
+        stats = json.loads(self.generate('--seed', '3', '--workers', '1', '--attempts', '2', '--dry-run', '--json'))
+
+        self.assertEqual((stats['version'], stats['score']['hard'], stats['unplaced']), (None, 0, []))
+        self.assertEqual(stats['counters']['placed'], 4)
+        self.assertEqual(stats['counters']['attempts'], 2)
+        self.assertNotIn('persist', stats['timings'])
+        self.assertFalse(Schedule.objects.exists())
+
+    def test_timetable_is_published(self):
+        self.assertIn("Placed 4 of 4 lectures", self.generate('--num-days', '5', '--time-budget', '0.2'))
+
+        self.assertEqual(Schedule.objects.filter(class_subject__isnull=False).count(), 4)
+        self.assertEqual(Schedule.objects.filter(day=5).count(), 0)
+
+    def test_invalid_options_are_rejected(self):
+        for args in (['--time-budget', '0'], ['--workers', '0'], ['--num-days', '8']):
+            with self.assertRaises(CommandError):
+                self.generate(*args)
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from ..models import Teacher, Class, Schedule, ClassSubject, Subject, Classrooms, ClassroomType
 from ..serializers import (
     TeacherSerializer, SubjectSerializer, ClassSerializer,
@@ -61,6 +61,7 @@ class ScheduleSerializerTestCase(TestCase):
         })
 
 
+@override_settings(SCHEDULE_BREAKS={'windows': []})
 class BookSlotSerializerTestCase(TestCase):
     def test_book_slot_serialization(self):
         # Create a ClassroomType first
@@ -87,12 +88,15 @@ class BookSlotSerializerTestCase(TestCase):
 
         serializer = BookSlotSerializer(data=data)
         self.assertTrue(serializer.is_valid())
-        schedule = serializer.save()
+        schedules = serializer.save()
 
-        self.assertEqual(schedule.class_subject, class_subject)
-        self.assertEqual(schedule.day, data['day'])
-        self.assertEqual(schedule.hour, data['time'] + 9)  # Time is an index from 0-7 mapping to hours (9-17)
-        self.assertEqual(schedule.duration, timedelta(hours=data['duration']))
+        self.assertEqual(len(schedules), data['duration'])  # One row per hour
+        for offset, schedule in enumerate(schedules):
+            self.assertEqual(schedule.class_subject, class_subject)
+            self.assertEqual(schedule.day, data['day'])
+            # Time is an index from 0-7 mapping to hours (9-17)
+            self.assertEqual(schedule.hour, data['time'] + 9 + offset)
+            self.assertEqual(schedule.duration, timedelta(hours=1))
 
 
 class ClassroomTypeSerializerTestCase(TestCase):
@@ -112,11 +116,11 @@ class ClassroomsSerializerTestCase(TestCase):
 
 class ClassroomBookingSerializerTestCase(TestCase):
     def test_classroom_booking_hour_validation(self):
-        data = {'classroom_id': 1, 'hour': 17}
+        data = {'classroom_id': 1, 'day': 0, 'hour': 17}
         serializer = ClassroomBookingSerializer(data=data)
         self.assertFalse(serializer.is_valid())
         self.assertEqual(serializer.errors['hour'], ['Hour must be between 9 and 16 (inclusive).'])
 
-        valid_data = {'classroom_id': 1, 'hour': 10}
+        valid_data = {'classroom_id': 1, 'day': 0, 'hour': 10}
         valid_serializer = ClassroomBookingSerializer(data=valid_data)
         self.assertTrue(valid_serializer.is_valid())
@@ -0,0 +1,105 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Class, ClassSubject, Classrooms, ClassroomType, Schedule, Subject, Teacher, TimetableVersion
+from ..scheduler import SchedulingService
+from ..snapshots import SnapshotError, fingerprint, load_problem, load_result, main, save_problem
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        lecture_hall = ClassroomType.objects.create(name="Lecture Hall")
+        lab = ClassroomType.objects.create(name="Lab")
+        Classrooms.objects.create(classroom_type=lecture_hall, classroom_name="LH-1")
+        Classrooms.objects.create(classroom_type=lab, classroom_name="LAB-1")
+        self.teacher = Teacher.objects.create(name="Mr. Smith")
+        self.teacher.set_availability(0, 9, available=False)
+        self.teacher.save()
+        class_a = Class.objects.create(name="Class A")
+        math = Subject.objects.create(name="Math", duration=1, classroom_type=lecture_hall, subject_code="M1")
+        physics_lab = Subject.objects.create(name="Physics Lab", duration=2, classroom_type=lab, subject_code="P2")
+        self.math = ClassSubject.objects.create(class_name=class_a, subject=math, teacher=self.teacher,
+                                                number_of_lectures=4)
+        ClassSubject.objects.create(class_name=Class.objects.create(name="Class B"), subject=physics_lab,
+                                    teacher=Teacher.objects.create(name="Ms. Jones"), number_of_lectures=2)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.problem_path = os.path.join(directory.name, 'problem.npz')
+        self.result_path = os.path.join(directory.name, 'result.npz')
+
+    def solve_offline(self, *args):
+        with redirect_stdout(io.StringIO()) as output:
+            main([self.problem_path, self.result_path, *args])
+        return json.loads(output.getvalue())
+
+    def test_problem_round_trips(self):
+        service = SchedulingService(solver='greedy', seed=3, attempts=2)
+        service.prepare_data()
+        problem = service.snapshot()
+
+        stored = save_problem(self.problem_path, problem, 'greedy', [5, 6])
+        snapshot = load_problem(self.problem_path)
+
+        self.assertEqual(snapshot.problem._replace(occupancy=None), problem._replace(occupancy=None))
+        self.assertEqual(vars(snapshot.problem.occupancy), vars(problem.occupancy))
+        self.assertEqual((snapshot.solver, snapshot.seeds), ('greedy', [5, 6]))
+        self.assertEqual(snapshot.fingerprint, stored)
+        self.assertEqual(fingerprint(snapshot.problem), stored)
+
+    def test_timetable_solved_offline_is_published(self):
+        SchedulingService(seed=1, attempts=2).export_problem(self.problem_path)
+
+        stats = self.solve_offline('--workers', '1')
+        self.assertEqual((stats['lectures'], stats['placed'], stats['score'][0]), (6, 6, 0))
+
+        result = SchedulingService().import_result(self.result_path)
+
+        self.assertEqual((len(result.placements), result.unplaced), (6, []))
+        self.assertTrue(TimetableVersion.objects.filter(status=TimetableVersion.Status.PUBLISHED).exists())
+        self.assertEqual(Schedule.objects.filter(class_subject__isnull=False).count(), 8)  # Labs take two hours
+        self.assertFalse(Schedule.objects.filter(class_subject__isnull=True).exists())
+        self.assertFalse(Schedule.objects.filter(class_subject__teacher=self.teacher, day=0, hour=9).exists())
+
+    def test_result_is_not_imported_after_the_data_changed(self):
+        SchedulingService(seed=1).export_problem(self.problem_path)
+        self.solve_offline('--seed', '4', '--solver', 'dsatur')
+
+        self.math.number_of_lectures = 5
+        self.math.save()
+
+        with self.assertRaises(SnapshotError):
+            SchedulingService().import_result(self.result_path)
+        self.assertFalse(Schedule.objects.exists())
+
+    def test_files_of_the_wrong_kind_are_rejected(self):
+        service = SchedulingService(seed=1)
+        service.export_problem(self.problem_path)
+
+        with self.assertRaises(SnapshotError):
+            load_result(self.problem_path, service.snapshot())
+        with self.assertRaises(SnapshotError):
+            load_problem(__file__)
+
+    def test_management_command(self):
+        call_command('timetable_snapshot', 'export', self.problem_path, '--seed', '2', stdout=io.StringIO())
+        self.solve_offline()
+
+        output = io.StringIO()
+        call_command('timetable_snapshot', 'import', self.result_path, stdout=output)
+        self.assertIn("6 lectures placed, 0 unplaced", output.getvalue())
+
+        self.math.delete()
+        with self.assertRaises(CommandError):
+            call_command('timetable_snapshot', 'import', self.result_path, stdout=io.StringIO())
+
+        for option, value in (('--num-days', '0'), ('--num-days', '7'), ('--attempts', '0')):
+            with self.assertRaises(CommandError):
+                call_command('timetable_snapshot', 'export', self.problem_path, option, value, stdout=io.StringIO())
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import (Class, ClassroomOccupancy, Classrooms, ClassroomType, ClassSubject, Schedule, Subject, Teacher,
+                      TimetableVersion, published_version_id)
+from ..scheduler import SchedulingService, TimetableChanged
+from ..versions import collect_versions, publish, stored_room_hours
+
+
+class TimetableVersionTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        hall = ClassroomType.objects.create(name="Lecture Hall")
+        self.rooms = [Classrooms.objects.create(classroom_type=hall, classroom_name=f"LH-{i}") for i in range(3)]
+        subject = Subject.objects.create(name="Math", duration=1, classroom_type=hall, subject_code="M1")
+        self.class_subject = ClassSubject.objects.create(
+            class_name=Class.objects.create(name="Class A"), subject=subject,
+            teacher=Teacher.objects.create(name="Mr. Smith"), number_of_lectures=4)
+
+    def generate(self, seed):
+        service = SchedulingService(seed=seed)
+        service.run()
+        return service.version
+
+    def rows(self, queryset):
+        return set(queryset.values_list('class_subject_id', 'day', 'hour', 'classroom_id'))
+
+    def test_generation_publishes_a_new_version_and_archives_the_old_one(self):
+        first = self.generate(1)
+        second = self.generate(2)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, TimetableVersion.Status.ARCHIVED)
+        self.assertEqual(second.status, TimetableVersion.Status.PUBLISHED)
+        self.assertEqual(published_version_id(), second.id)
+        self.assertEqual(self.rows(Schedule.objects.all()), self.rows(second.entries.all()))
+        self.assertEqual(Schedule.all_versions.count(), first.entries.count() + second.entries.count())
+
+    def test_drafts_are_invisible_to_readers(self):
+        published = self.generate(1)
+        draft = TimetableVersion.objects.create()
+        Schedule.objects.create(version=draft, class_object=self.class_subject.class_name, day=5, hour=16)
+
+        self.assertFalse(Schedule.objects.filter(version=draft).exists())
+        self.assertEqual(Schedule.objects.count(), published.entries.count())
+
+    def test_rollback_restores_rows_and_room_occupancy(self):
+        self.rooms[0].book_classroom(16, day=5)  # Booked by hand, kept across versions
+        first = self.generate(1)
+        first_rooms = stored_room_hours()
+        self.generate(2)
+
+        previous_id = publish(first)
+
+        self.assertNotEqual(previous_id, first.id)
+        self.assertEqual(self.rows(Schedule.objects.all()), self.rows(first.entries.all()))
+        first_rooms[(self.rooms[0].id, 5)] = first_rooms.get((self.rooms[0].id, 5), 0) | 1 << 7
+        self.assertEqual({(o.classroom_id, o.day): o.booked for o in ClassroomOccupancy.objects.exclude(booked=0)},
+                         first_rooms)
+
+    def test_failed_publish_leaves_a_draft_and_the_previous_timetable(self):
+        published = self.generate(1)
+
+        with mock.patch('schedule.scheduler.publish', side_effect=RuntimeError("crashed")):
+            with self.assertRaises(RuntimeError):
+                self.generate(2)
+
+        self.assertEqual(published_version_id(), published.id)
+        self.assertEqual(TimetableVersion.objects.filter(status=TimetableVersion.Status.DRAFT).count(), 1)
+
+    def test_collection_keeps_recent_versions_and_live_drafts(self):
+        versions = [self.generate(seed) for seed in range(4)]
+        abandoned = TimetableVersion.objects.create()
+        TimetableVersion.objects.filter(id=abandoned.id).update(created_at=timezone.now() - timedelta(hours=2))
+        running = TimetableVersion.objects.create()
+        kept = {versions[2].id, versions[3].id, running.id}
+        stale = TimetableVersion.objects.exclude(id__in=kept).count()  # Including the empty first version
+
+        self.assertEqual(collect_versions(keep=1), stale)
+
+        self.assertEqual(set(TimetableVersion.objects.values_list('id', flat=True)), kept)
+        self.assertEqual(set(Schedule.all_versions.values_list('version_id', flat=True)),
+                         {versions[2].id, versions[3].id})
+        self.assertEqual(collect_versions(keep=1), 0)
+
+    def test_repair_refuses_a_replaced_version(self):
+        self.generate(1)
+        service = SchedulingService(seed=3)
+        select_repairs = service.select_repairs
+
+        def generate_meanwhile(*args, **kwargs):
+            self.generate(2)
+            return select_repairs(*args, **kwargs)
+
+        with mock.patch.object(service, 'select_repairs', side_effect=generate_meanwhile):
+            with self.assertRaises(TimetableChanged):
+                service.repair()
+
+    def test_list_and_publish_endpoints(self):
+        first = self.generate(1)
+        second = self.generate(2)
+
+        listed = self.client.get(reverse('timetable-versions')).data
+        self.assertEqual([(v['id'], v['status']) for v in listed if v['id'] in (first.id, second.id)],
+                         [(second.id, 'published'), (first.id, 'archived')])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('timetable-version-publish', args=[first.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['status'], response.data['previous']), ('published', second.id))
+        self.assertEqual(len(callbacks), 2)  # Cache invalidation and collection in the background
+
+        response = self.client.post(reverse('timetable-version-publish', args=[404]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
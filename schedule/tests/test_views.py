@@ -0,0 +1,245 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..jobs import run_generation_job
+from ..queries import bump_timetable_version, timetable_version
+from ..scheduler import SchedulingService
+from ..models import (Class, ClassSubject, Classrooms, ClassroomType, GenerationJob, Schedule, Subject,
+                      Teacher, TimetableVersion)
+
+
+class ClassroomBookingViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        classroom_type = ClassroomType.objects.create(name="Lecture Hall")
+        self.classroom = Classrooms.objects.create(classroom_type=classroom_type, classroom_name="LH-1")
+
+    def book(self, day, hour):
+        return self.client.post(reverse('book-classroom'),
+                                {'classroom_id': self.classroom.id, 'day': day, 'hour': hour}, format='json')
+
+    def test_room_can_be_booked_at_the_same_hour_on_different_days(self):
+        self.assertEqual(self.book(0, 9).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(1, 9).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(0, 9).status_code, status.HTTP_409_CONFLICT)
+
+
+class GenerationJobViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        classroom_type = ClassroomType.objects.create(name="Lecture Hall")
+        Classrooms.objects.create(classroom_type=classroom_type, classroom_name="LH-1")
+        subject = Subject.objects.create(name="Math", duration=1, classroom_type=classroom_type, subject_code="M1")
+        ClassSubject.objects.create(class_name=Class.objects.create(name="Class A"), subject=subject,
+                                    teacher=Teacher.objects.create(name="Mr. Smith"), number_of_lectures=4)
+
+    def test_job_is_queued_and_can_be_polled(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('generation-job-create'), {'solver': 'greedy', 'seed': 7},
+                                        format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], GenerationJob.Status.QUEUED)
+        self.assertEqual(len(callbacks), 1)
+
+        # Run the worker inline instead of on the thread pool
+        run_generation_job(response.data['id'])
+
+        job = self.client.get(reverse('generation-job-detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], GenerationJob.Status.SUCCEEDED)
+        self.assertEqual((job['placed'], job['total']), (4, 4))
+        self.assertEqual(set(job['timings']), {'prepare', 'placement', 'persist'})
+        self.assertEqual(job['counters']['placed'], 4)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.data['last']['generate']['counters']['placed'], 4)
+        self.assertEqual(Schedule.objects.filter(class_subject__isnull=False).count(), 4)
+
+    def test_failed_job_keeps_the_error_and_logs_the_traceback(self):
+        job = GenerationJob.objects.create()
+
+        with mock.patch.object(SchedulingService, 'run', side_effect=RuntimeError("disk full")), \
+                self.assertLogs('schedule.jobs', 'ERROR') as logs:
+            run_generation_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (GenerationJob.Status.FAILED, "disk full"))
+        self.assertIn(f"Generation job {job.id} failed", logs.output[0])
+        self.assertIn("Traceback", logs.output[0])
+
+    def test_job_with_a_time_budget(self):
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(reverse('generation-job-create'), {'seed': 7, 'time_budget': 0.2},
+                                        format='json')
+        self.assertEqual(response.data['time_budget'], 0.2)
+
+        run_generation_job(response.data['id'])
+
+        job = self.client.get(reverse('generation-job-detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], GenerationJob.Status.SUCCEEDED)
+        self.assertEqual((job['placed'], job['unplaced']), (4, []))
+        self.assertGreaterEqual(job['counters']['attempts'], 1)
+
+        response = self.client.post(reverse('generation-job-create'), {'time_budget': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_solver_is_rejected(self):
+        response = self.client.post(reverse('generation-job-create'), {'solver': 'quantum'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_missing_job(self):
+        response = self.client.get(reverse('generation-job-detail', args=[404]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RepairScheduleViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        classroom_type = ClassroomType.objects.create(name="Lecture Hall")
+        Classrooms.objects.create(classroom_type=classroom_type, classroom_name="LH-1")
+        subject = Subject.objects.create(name="Math", duration=1, classroom_type=classroom_type, subject_code="M1")
+        self.class_subject = ClassSubject.objects.create(
+            class_name=Class.objects.create(name="Class A"), subject=subject,
+            teacher=Teacher.objects.create(name="Mr. Smith"), number_of_lectures=4)
+        SchedulingService(seed=1).generate_timetable()
+
+    def test_repair_places_added_lectures(self):
+        self.class_subject.number_of_lectures = 5
+        self.class_subject.save()
+
+        response = self.client.post(reverse('repair-schedule'), {'class_subject_id': self.class_subject.id},
+                                    format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['removed'], response.data['placed'], response.data['unplaced']), (0, 1, 0))
+        self.assertEqual(Schedule.objects.filter(class_subject__isnull=False).count(), 5)
+
+
+class TimetableViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        classroom_type = ClassroomType.objects.create(name="Lecture Hall")
+        self.room = Classrooms.objects.create(classroom_type=classroom_type, classroom_name="LH-1")
+        subject = Subject.objects.create(name="Math", duration=1, classroom_type=classroom_type, subject_code="M1")
+        self.teacher = Teacher.objects.create(name="Mr. Smith")
+        self.class_a = Class.objects.create(name="Class A")
+        self.class_subject = ClassSubject.objects.create(class_name=self.class_a, subject=subject,
+                                                         teacher=self.teacher, number_of_lectures=4)
+        SchedulingService(seed=1).generate_timetable()
+
+    def test_timetables_per_class_teacher_and_room(self):
+        by_class = self.client.get(reverse('class-timetable', args=[self.class_a.id])).data['entries']
+        by_teacher = self.client.get(reverse('teacher-timetable', args=[self.teacher.id])).data['entries']
+        by_room = self.client.get(reverse('room-timetable', args=[self.room.id])).data['entries']
+
+        self.assertEqual(len(by_teacher), 4)
+        self.assertEqual(by_class, by_teacher)  # Breaks are kept free, not stored
+        self.assertEqual(by_teacher, by_room)
+        self.assertEqual(by_teacher[0]['teacher'], {'id': self.teacher.id, 'name': "Mr. Smith"})
+        self.assertEqual(by_teacher, sorted(by_teacher, key=lambda e: (e['day'], e['hour'])))
+
+    def test_unchanged_timetable_is_served_from_the_cache(self):
+        url = reverse('class-timetable', args=[self.class_a.id])
+        with self.assertNumQueries(1):
+            first = self.client.get(url).data
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data, first)
+
+    def test_writes_invalidate_the_cache(self):
+        url = reverse('teacher-timetable', args=[self.teacher.id])
+        before = self.client.get(url).data
+
+        self.class_subject.number_of_lectures = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.class_subject.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            SchedulingService(seed=1).repair(class_subject_id=self.class_subject.id)
+
+        after = self.client.get(url).data
+        self.assertNotEqual(after['version'], before['version'])
+        self.assertEqual(len(after['entries']), 5)
+
+    def test_other_processes_invalidate_the_cache(self):
+        location = str(settings.CACHES['default']['LOCATION'])
+        self.assertNotEqual(location, str(settings.BASE_DIR / '.cache'))
+        before = timetable_version()
+
+        # As `generate_timetable` or `timetable_snapshot import` would after publishing
+        subprocess.run([sys.executable, '-c', "import django; django.setup(); "
+                        "from schedule.queries import bump_timetable_version; bump_timetable_version()"],
+                       check=True, env={**os.environ, 'TIMETABLE_CACHE_DIR': location})
+
+        self.assertNotEqual(timetable_version(), before)
+
+    def test_missing_object(self):
+        response = self.client.get(reverse('class-timetable', args=[404]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_timetable_pages_paginate_and_filter(self):
+        for name in ("Class B", "Class C", "Lab Group"):
+            Class.objects.create(name=name)
+
+        first = self.client.get(reverse('class-timetable-page'), {'per_page': 2})
+        second = self.client.get(reverse('class-timetable-page'), {'per_page': 2, 'page': 2})
+        labs = self.client.get(reverse('class-timetable-page'), {'q': 'lab'})
+
+        self.assertEqual([owner['name'] for owner in first.context['owners']], ["Class A", "Class B"])
+        self.assertEqual([owner['name'] for owner in second.context['owners']], ["Class C", "Lab Group"])
+        self.assertEqual([owner['name'] for owner in labs.context['owners']], ["Lab Group"])
+        self.assertContains(first, "Math", count=4)
+        self.assertNotContains(first, "Recess")
+        self.assertContains(self.client.get(reverse('room-timetable-page')), "Class A", count=4)
+        self.assertEqual(self.client.get(reverse('teacher-timetable-page'), {'per_page': 0}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_rendered_grids_are_reused_until_the_timetable_changes(self):
+        url = reverse('teacher-timetable-page')
+
+        def schedule_reads():
+            with CaptureQueriesContext(connection) as queries:
+                content = self.client.get(url).content
+            return content, sum('schedule_schedule' in query['sql'] for query in queries)
+
+        first, reads = schedule_reads()
+        self.assertEqual(reads, 1)
+        self.assertEqual(schedule_reads(), (first, 0))
+
+        bump_timetable_version()
+        self.assertEqual(schedule_reads(), (first, 1))
+
+    def test_generating_shows_the_first_page_of_class_timetables(self):
+        response = self.client.get(reverse('generate-schedule'), {'time_budget': 1})
+
+        self.assertTemplateUsed(response, 'timetable.html')
+        self.assertEqual([owner['name'] for owner in response.context['owners']], ["Class A"])
+        self.assertEqual(response.context['page_url'], reverse('class-timetable-page'))  # Paging never regenerates
+
+    def test_generating_rejects_invalid_day_counts(self):
+        versions = TimetableVersion.objects.count()
+        for num_days in ('x', '0', '7'):
+            response = self.client.get(reverse('generate-schedule'), {'num_days': num_days})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(TimetableVersion.objects.count(), versions)
+
+    def test_generating_rejects_invalid_attempt_counts(self):
+        versions = TimetableVersion.objects.count()
+        for attempts in ('x', '0', '257'):
+            response = self.client.get(reverse('generate-schedule'), {'attempts': attempts})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(TimetableVersion.objects.count(), versions)
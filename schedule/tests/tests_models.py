@@ -0,0 +1,63 @@
+from django.test import TestCase
+
+from ..models import ClassroomOccupancy, Classrooms, ClassroomType, SlotTaken, Teacher
+
+
+class TeacherAvailabilityTestCase(TestCase):
+    def test_new_teacher_is_available_all_week_with_one_insert(self):
+        with self.assertNumQueries(1):
+            teacher = Teacher.objects.create(name="Mr. Smith")
+
+        self.assertTrue(all(teacher.is_available(day, hour) for day in range(6) for hour in range(9, 17)))
+        self.assertEqual(teacher.free_slots(5), list(range(9, 17)))
+
+    def test_set_availability(self):
+        teacher = Teacher.objects.create(name="Mr. Smith")
+        teacher.set_availability(2, 10, available=False, duration=3)
+        teacher.save()
+        teacher.refresh_from_db()
+
+        self.assertFalse(teacher.is_available(2, 11))
+        self.assertTrue(teacher.is_available(1, 11))
+        self.assertEqual(teacher.free_slots(2), [9, 13, 14, 15, 16])
+        self.assertEqual(teacher.unavailable_hours(2), 0b1110)
+
+        teacher.set_availability(2, 11, available=True)
+        self.assertEqual(teacher.free_slots(2), [9, 11, 13, 14, 15, 16])
+
+
+class ClassroomOccupancyTestCase(TestCase):
+    def setUp(self):
+        classroom_type = ClassroomType.objects.create(name="Lab")
+        self.classroom = Classrooms.objects.create(classroom_type=classroom_type, classroom_name="LAB-1")
+
+    def test_booking_only_blocks_that_day(self):
+        self.classroom.book_classroom(10, day=0)
+
+        self.assertFalse(self.classroom.check_availability(10, day=0))
+        self.assertTrue(self.classroom.check_availability(10, day=1))
+        self.assertTrue(self.classroom.check_availability(11, day=0))
+
+    def test_double_booking_is_rejected(self):
+        self.classroom.book_classroom(10, day=2, duration=2)
+
+        with self.assertRaises(SlotTaken):
+            self.classroom.book_classroom(11, day=2)
+        self.assertEqual(ClassroomOccupancy.objects.get(classroom=self.classroom, day=2).booked, 0b110)
+
+    def test_booking_updates_a_single_row(self):
+        self.classroom.book_classroom(9, day=3)
+
+        with self.assertNumQueries(1):
+            self.classroom.book_classroom(12, day=3)
+        self.assertEqual(ClassroomOccupancy.objects.get(classroom=self.classroom, day=3).booked, 0b1001)
+
+    def test_release_clears_only_the_given_hours(self):
+        self.classroom.book_classroom(9, day=4, duration=3)
+        self.classroom.release_classroom(10, day=4)
+
+        self.assertEqual(ClassroomOccupancy.objects.get(classroom=self.classroom, day=4).booked, 0b101)
+
+    def test_hours_outside_the_day_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.classroom.book_classroom(16, day=0, duration=2)
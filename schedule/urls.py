@@ -1,10 +1,29 @@
 from django.urls import path
 from .views import (GenerateScheduleView, TeacherCreateView, ClassSubjectCreateView, SubjectCreateView, ClassCreateView,
-                    BookSlotView, ClassroomTypeCreateView, ClassroomsCreateView, ClassroomBookingView)
+                    BookSlotView, ClassroomTypeCreateView, ClassroomsCreateView, ClassroomBookingView,
+                    GenerationJobCreateView, GenerationJobDetailView, RepairScheduleView,
+                    ClassTimetableView, TeacherTimetableView, RoomTimetableView, MetricsView,
+                    ClassTimetablePageView, TeacherTimetablePageView, RoomTimetablePageView,
+                    BulkImportView, TimetableExportView, TimetableVersionListView, TimetableVersionPublishView)
 
 urlpatterns = [
     # path('', frontend, name='frontend'),
     path('generate-schedule/', GenerateScheduleView.as_view(), name='generate-schedule'),
+    path('generate-schedule/jobs/', GenerationJobCreateView.as_view(), name='generation-job-create'),
+    path('generate-schedule/jobs/<int:job_id>/', GenerationJobDetailView.as_view(), name='generation-job-detail'),
+    path('generate-schedule/repair/', RepairScheduleView.as_view(), name='repair-schedule'),
+    path('timetable/classes/<int:pk>/', ClassTimetableView.as_view(), name='class-timetable'),
+    path('timetable/teachers/<int:pk>/', TeacherTimetableView.as_view(), name='teacher-timetable'),
+    path('timetable/rooms/<int:pk>/', RoomTimetableView.as_view(), name='room-timetable'),
+    path('timetable/classes/', ClassTimetablePageView.as_view(), name='class-timetable-page'),
+    path('timetable/teachers/', TeacherTimetablePageView.as_view(), name='teacher-timetable-page'),
+    path('timetable/rooms/', RoomTimetablePageView.as_view(), name='room-timetable-page'),
+    path('timetable/versions/', TimetableVersionListView.as_view(), name='timetable-versions'),
+    path('timetable/versions/<int:pk>/publish/', TimetableVersionPublishView.as_view(),
+         name='timetable-version-publish'),
+    path('timetable/export/<str:fmt>/', TimetableExportView.as_view(), name='timetable-export'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('import/<str:kind>/', BulkImportView.as_view(), name='bulk-import'),
     path('teachers/', TeacherCreateView.as_view(), name='teacher-create'),
     path('add-class-subject/', ClassSubjectCreateView.as_view(), name='add-class-subject'),
     path('add-subject/', SubjectCreateView.as_view(), name='add-subject'),
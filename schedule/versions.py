@@ -0,0 +1,129 @@
+"""
+Timetable versions: publishing, rollback and garbage collection.
+
+A generation writes its rows under a new draft `TimetableVersion` in one transaction and publishes it in a
+second, short one that repoints `PublishedTimetable` and swaps the room hours in `ClassroomOccupancy`. Readers go
+through `Schedule.objects`, which resolves the pointer in the same query, so they see either the old timetable or
+the new one and never wait for a generation. Superseded versions are archived for rollback; the oldest of them,
+and drafts abandoned by a crashed run, are deleted in bulk by a background thread.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import POINTER_ID, ClassroomOccupancy, PublishedTimetable, Schedule, TimetableVersion, hour_mask
+from .queries import bump_timetable_version
+
+logger = logging.getLogger(__name__)
+
+KEEP_VERSIONS = 5  # Archived versions kept for rollback, unless `SCHEDULE_KEEP_VERSIONS` says otherwise
+DRAFT_TTL = timedelta(hours=1)  # Drafts older than this belong to a run that never finished
+
+
+def stored_room_hours(version_id: Optional[int] = None) -> Dict[Tuple[int, int], int]:
+    """
+    Room hours taken by a stored timetable, the published one by default, as {(classroom id, day): hour bitmask}.
+    """
+    rows = Schedule.objects.all() if version_id is None else Schedule.all_versions.filter(version_id=version_id)
+    masks = {}
+    for classroom_id, day, hour in rows.filter(classroom__isnull=False).values_list('classroom_id', 'day', 'hour'):
+        masks[(classroom_id, day)] = masks.get((classroom_id, day), 0) | hour_mask(hour)
+    return masks
+
+
+def update_room_occupancy(previous: Dict[Tuple[int, int], int], generated: Dict[Tuple[int, int], int]):
+    """
+    Swap the room hours of the previous timetable for those of the new one, keeping bookings made
+    through `ClassroomBookingView`.
+    """
+    keys = previous.keys() | generated.keys()
+    existing = {(o.classroom_id, o.day): o for o in
+                ClassroomOccupancy.objects.filter(classroom_id__in={classroom_id for classroom_id, _ in keys})}
+    changed, created = [], []
+    for key in keys:
+        occupancy = existing.get(key)
+        booked = ((occupancy.booked if occupancy else 0) & ~previous.get(key, 0)) | generated.get(key, 0)
+        if occupancy is None:
+            created.append(ClassroomOccupancy(classroom_id=key[0], day=key[1], booked=booked))
+        elif occupancy.booked != booked:
+            occupancy.booked = booked
+            changed.append(occupancy)
+    ClassroomOccupancy.objects.bulk_update(changed, ['booked'], batch_size=500)
+    ClassroomOccupancy.objects.bulk_create(created, batch_size=500)
+
+
+def publish(version: TimetableVersion, generated: Optional[Dict[Tuple[int, int], int]] = None
+            ) -> Optional[int]:
+    """
+    Make `version` the published timetable and archive the one it replaces. `generated` are the version's room
+    hours when the caller already has them. Returns the id of the previously published version.
+    """
+    if generated is None:
+        generated = stored_room_hours(version.id)
+    with transaction.atomic():
+        pointer = PublishedTimetable.objects.select_for_update().filter(pk=POINTER_ID).first()
+        previous_id = pointer.version_id if pointer else None
+        if previous_id == version.id:
+            return previous_id
+        update_room_occupancy(stored_room_hours(previous_id) if previous_id else {}, generated)
+        # The flip itself: every read after this commits sees the new version
+        PublishedTimetable.objects.update_or_create(pk=POINTER_ID, defaults={'version': version})
+        if previous_id:
+            TimetableVersion.objects.filter(id=previous_id).update(status=TimetableVersion.Status.ARCHIVED)
+        version.status = TimetableVersion.Status.PUBLISHED
+        version.published_at = timezone.now()
+        version.save(update_fields=['status', 'published_at'])
+        transaction.on_commit(bump_timetable_version)
+        transaction.on_commit(collect_in_background)
+    logger.info("Published timetable version %d, replacing %s", version.id, previous_id)
+    return previous_id
+
+
+def collect_versions(keep: Optional[int] = None) -> int:
+    """
+    Delete archived versions beyond the newest `keep` and abandoned drafts, with their rows. Returns the number
+    of versions deleted.
+    """
+    if keep is None:
+        keep = getattr(settings, 'SCHEDULE_KEEP_VERSIONS', KEEP_VERSIONS)
+    with transaction.atomic():
+        archived = TimetableVersion.objects.filter(status=TimetableVersion.Status.ARCHIVED).order_by('-published_at')
+        stale = set(archived.values_list('id', flat=True)[keep:])
+        drafts = TimetableVersion.objects.filter(status=TimetableVersion.Status.DRAFT,
+                                                 created_at__lt=timezone.now() - DRAFT_TTL)
+        stale.update(drafts.values_list('id', flat=True))
+        if not stale:
+            return 0
+        # Schedule rows have no receivers or dependents, so they go in a single DELETE rather than one by one
+        Schedule.all_versions.filter(version_id__in=stale).delete()
+        TimetableVersion.objects.filter(id__in=stale).delete()
+    logger.info("Collected %d timetable versions", len(stale))
+    return len(stale)
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def _collect():
+    try:
+        collect_versions()
+    except Exception:
+        logger.exception("Collecting timetable versions failed")
+    finally:
+        close_old_connections()
+
+
+def collect_in_background():
+    """Run `collect_versions` on a background thread, so publishing never waits for the deletes."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = ThreadPoolExecutor(max_workers=1, thread_name_prefix='timetable-gc')
+    _collector.submit(_collect)
@@ -1,13 +1,27 @@
+from datetime import date
+from functools import cached_property, partial
+
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.urls import reverse
+from django.views import View
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Classrooms
-from .scheduler import SchedulingService
+from . import metrics
+from .exports import DAY_NAMES, EXPORT_FORMATS, csv_stream, export_lectures, ics_stream, xlsx_stream
+from .importers import IMPORTERS, import_rows, read_rows, upload_format
+from .jobs import enqueue_generation
+from .models import DAYS_PER_WEEK, Class, Classrooms, GenerationJob, SlotTaken, Teacher, TimetableVersion
+from .queries import CACHE_TIMEOUT, cached_grids, cached_timetable, timetable_version
+from .scheduler import SchedulingService, TimetableChanged
 from .serializers import TeacherSerializer, ClassSubjectSerializer, \
     SubjectSerializer, ClassSerializer, BookSlotSerializer, ClassroomsSerializer, ClassroomTypeSerializer, \
-    ClassroomBookingSerializer
+    ClassroomBookingSerializer, GenerationRequestSerializer, GenerationJobSerializer, RepairRequestSerializer, \
+    TimetableVersionSerializer, MAX_ATTEMPTS
+from .versions import publish
 
 
 # def frontend(request):
@@ -54,36 +68,289 @@ class ClassSubjectCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkImportView(APIView):
+    """
+    Create many teachers, subjects, classes or class subjects from one CSV or JSON Lines upload, sent either as
+    a multipart `file` or as the raw request body (Content-Type text/csv or application/x-ndjson). Related
+    objects are referred to by name. Rows that fail validation are reported and skipped.
+    """
+
+    def post(self, request, kind):
+        if kind not in IMPORTERS:
+            return Response({"error": f"Unknown import '{kind}'. Choose one of: {', '.join(IMPORTERS)}."},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"file": ["No file was submitted."]}, status=status.HTTP_400_BAD_REQUEST)
+            lines, fmt = upload, upload_format(upload.name, upload.content_type)
+        else:
+            lines, fmt = request.stream or [], upload_format(content_type=request.content_type)
+        if fmt is None:
+            return Response({"error": "Upload a .csv or .jsonl file."}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        result = import_rows(kind, read_rows(lines, fmt))
+        if not result['error_count']:
+            response_status = status.HTTP_201_CREATED
+        elif result['created']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(result, status=response_status)
+
+
 class GenerateScheduleView(APIView):
     def get(self, request):
-        num_days = int(request.GET.get('num_days', 6))
+        # The placement engine can be picked per request, e.g. ?solver=greedy, and ?attempts=8 keeps the best
+        # of 8 seeded runs made in parallel. ?time_budget=5 keeps improving for up to 5 seconds
+        try:
+            num_days = int(request.GET.get('num_days', DAYS_PER_WEEK))
+            if not 1 <= num_days <= DAYS_PER_WEEK:
+                raise ValueError(f"num_days must be between 1 and {DAYS_PER_WEEK}.")
+            time_budget = request.GET.get('time_budget')
+            time_budget = float(time_budget) if time_budget else None
+            if time_budget is not None and time_budget <= 0:
+                raise ValueError("time_budget must be a positive number of seconds.")
+            attempts = int(request.GET.get('attempts', 1))
+            if not 1 <= attempts <= MAX_ATTEMPTS:
+                raise ValueError(f"attempts must be between 1 and {MAX_ATTEMPTS}.")
+            scheduling_service = SchedulingService(num_days, solver=request.GET.get('solver'), attempts=attempts,
+                                                   time_budget=time_budget)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        scheduling_service.run()
+
+        # Show the first page of class timetables rather than every class at once
+        return ClassTimetablePageView().render_page(request, {}, unplaced=scheduling_service.unplaced)
+
+
+class GenerationJobCreateView(APIView):
+    """Queue a timetable generation and return immediately; poll the job to follow its progress."""
+
+    def post(self, request):
+        serializer = GenerationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            job = enqueue_generation(**serializer.validated_data)
+        except ValueError as e:
+            return Response({"solver": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class GenerationJobDetailView(APIView):
+    def get(self, request, job_id):
+        try:
+            job = GenerationJob.objects.get(id=job_id)
+        except GenerationJob.DoesNotExist:
+            return Response({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(GenerationJobSerializer(job).data)
+
+
+class RepairScheduleView(APIView):
+    """Fix the stored timetable after a teacher, classroom or class subject changed, without regenerating it."""
+
+    def post(self, request):
+        serializer = RepairRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            scheduling_service = SchedulingService(data['num_days'], solver=data.get('solver'), seed=data.get('seed'))
+        except ValueError as e:
+            return Response({"solver": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = scheduling_service.repair(teacher_id=data.get('teacher_id'),
+                                               classroom_id=data.get('classroom_id'),
+                                               class_subject_id=data.get('class_subject_id'))
+        except TimetableChanged as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            "removed": len(result.removed),
+            "placed": len(result.placements),
+            "unplaced": len(result.unplaced),
+            **scheduling_service.metrics.summary(),
+        })
+
+
+class TimetableVersionListView(APIView):
+    """Stored timetable versions, newest first: the published one, archived ones kept for rollback and drafts."""
+
+    def get(self, request):
+        versions = TimetableVersion.objects.order_by('-id')
+        return Response(TimetableVersionSerializer(versions, many=True).data)
 
-        # Your existing code to get the schedule
-        scheduling_service = SchedulingService(num_days)
-        schedule = scheduling_service.generate_timetable()
 
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        times = ['9-10', '10-11', '11-12', '12-1', '1-2', '2-3', '3-4', '4-5']
+class TimetableVersionPublishView(APIView):
+    """Publish a stored version, e.g. to roll back to an archived timetable."""
+
+    def post(self, request, pk):
+        try:
+            version = TimetableVersion.objects.get(pk=pk)
+        except TimetableVersion.DoesNotExist:
+            return Response({"error": "Timetable version not found."}, status=status.HTTP_404_NOT_FOUND)
+        previous_id = publish(version)
+        return Response({"previous": previous_id, **TimetableVersionSerializer(version).data})
+
+
+class TimetableView(APIView):
+    """
+    The stored timetable of one class, teacher or room as JSON. Read-only: nothing is generated here, and
+    repeated reads of an unchanged timetable are served from the cache without touching the database.
+    """
+    model = None
+    kind = None
+    lookup = None  # Schedule field that points at the requested object
+
+    def get(self, request, pk):
+        version, entries = cached_timetable(self.kind, pk, **{self.lookup: pk})
+        # An object without a single lecture still has an (empty) timetable
+        if not entries and not self.model.objects.filter(pk=pk).exists():
+            return Response({"error": f"{self.model._meta.verbose_name.capitalize()} not found."},
+                            status=status.HTTP_404_NOT_FOUND)
+        return Response({"version": version, self.kind: pk, "entries": entries})
+
+
+class ClassTimetableView(TimetableView):
+    model = Class
+    kind = 'class'
+    lookup = 'class_object_id'
+
+
+class TeacherTimetableView(TimetableView):
+    model = Teacher
+    kind = 'teacher'
+    lookup = 'class_subject__teacher_id'
+
+
+class RoomTimetableView(TimetableView):
+    model = Classrooms
+    kind = 'classroom'
+    lookup = 'classroom_id'
+
+
+class GridPage:
+    """
+    The classes, teachers or rooms shown on one HTML page. Their grids are read together, and only when the
+    template asks for one whose rendered fragment is not cached.
+    """
+
+    def __init__(self, kind: str, owners):
+        self.kind = kind
+        self.owners = [{'id': owner_id, 'name': name, 'grid': partial(self.grid, owner_id)}
+                       for owner_id, name in owners]
+
+    @cached_property
+    def grids(self):
+        return cached_grids(self.kind, [owner['id'] for owner in self.owners])
+
+    def grid(self, owner_id: int):
+        return self.grids[owner_id]
+
+
+class TimetablePageView(View):
+    """
+    Stored timetables of classes, teachers or rooms as HTML grids, ?per_page= of them at a time (at most 100) on
+    page ?page=, optionally only those whose name contains ?q=. Each grid is rendered once per timetable version
+    and then reused from the template fragment cache until the timetable changes.
+    """
+    model = None
+    kind = None
+    name_field = 'name'
+    title = None
+    url_name = None
+    per_page = 20
+    max_per_page = 100
 
-        # Combine days and time slots for easier access in the template
-        timetable = []
-        for day_index, day_schedule in enumerate(schedule):
-            day_data = []
-            for time_index, time_slot in enumerate(day_schedule):
-                day_data.append({
-                    'time': times[time_index],
-                    'classes': time_slot  # This is the list of classes in the current slot
-                })
-            timetable.append({
-                'day': days[day_index],
-                'slots': day_data
-            })
+    def get(self, request):
+        return self.render_page(request, request.GET)
 
-        context = {
-            'timetable': timetable
-        }
+    def render_page(self, request, params, **context):
+        try:
+            per_page = int(params.get('per_page', self.per_page))
+            if not 1 <= per_page <= self.max_per_page:
+                raise ValueError(f"per_page must be between 1 and {self.max_per_page}.")
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        query = params.get('q', '')
+        owners = self.model.objects.order_by(self.name_field, 'id').values_list('id', self.name_field)
+        if query:
+            owners = owners.filter(**{f'{self.name_field}__icontains': query})
+        page = Paginator(owners, per_page).get_page(params.get('page'))
+
+        return render(request, 'timetable.html', {
+            'title': self.title,
+            'kind': self.kind,
+            'page': page,
+            'owners': GridPage(self.kind, page).owners,
+            'days': DAY_NAMES,
+            'query': query,
+            'per_page': per_page,
+            'page_url': reverse(self.url_name),
+            'version': timetable_version(),
+            'cache_timeout': CACHE_TIMEOUT,
+            **context,
+        })
+
+
+class ClassTimetablePageView(TimetablePageView):
+    model = Class
+    kind = 'class'
+    title = "Class timetables"
+    url_name = 'class-timetable-page'
+
+
+class TeacherTimetablePageView(TimetablePageView):
+    model = Teacher
+    kind = 'teacher'
+    title = "Teacher timetables"
+    url_name = 'teacher-timetable-page'
+
+
+class RoomTimetablePageView(TimetablePageView):
+    model = Classrooms
+    kind = 'classroom'
+    name_field = 'classroom_name'
+    title = "Room timetables"
+    url_name = 'room-timetable-page'
+
+
+class TimetableExportView(View):
+    """
+    Stream the stored timetable as CSV, iCalendar or XLSX, for everyone or for one ?class=, ?teacher= or ?room=
+    id. Calendar events repeat weekly from the week of ?week_of= (YYYY-MM-DD, this week by default). A plain
+    Django view, so calendar clients asking for text/calendar are not turned away by content negotiation.
+    """
+    filters = {'class': 'class_object_id', 'teacher': 'class_subject__teacher_id', 'room': 'classroom_id'}
+
+    def get(self, request, fmt):
+        if fmt not in EXPORT_FORMATS:
+            return JsonResponse({"error": f"Unknown format '{fmt}'. Choose one of: {', '.join(EXPORT_FORMATS)}."},
+                                status=status.HTTP_404_NOT_FOUND)
+        try:
+            filters = {field: int(request.GET[param]) for param, field in self.filters.items() if param in request.GET}
+            week_of = date.fromisoformat(request.GET['week_of']) if 'week_of' in request.GET else date.today()
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        lectures = export_lectures(**filters)
+        if fmt == 'csv':
+            content = csv_stream(lectures)
+        elif fmt == 'ics':
+            content = ics_stream(lectures, week_of)
+        else:
+            content = xlsx_stream(lectures)
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="timetable.{fmt}"'
+        return response
+
+
+class MetricsView(APIView):
+    """Process-wide timetable run metrics: run counts, summed phase timings and counters, and the last runs."""
 
-        return render(request, 'timetable.html', context)
+    def get(self, request):
+        return Response(metrics.snapshot())
 
 
 class BookSlotView(APIView):
@@ -93,7 +360,10 @@ class BookSlotView(APIView):
         # Validate incoming data
         if serializer.is_valid():
             # Create the schedule slot using validated data
-            schedule = serializer.save()
+            try:
+                serializer.save()
+            except SlotTaken as e:
+                return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
             return Response({"message": "Slot booked successfully"}, status=status.HTTP_201_CREATED)
 
         # Return errors if the data is invalid
@@ -142,13 +412,16 @@ class ClassroomBookingView(APIView):
         serializer.is_valid(raise_exception=True)
 
         classroom_id = serializer.validated_data['classroom_id']
+        day = serializer.validated_data['day']
         hour = serializer.validated_data['hour']
 
         try:
             classroom = Classrooms.objects.get(id=classroom_id)
-            classroom.book_classroom(hour)
+            classroom.book_classroom(hour, day)
             return Response({"message": "Classroom booked successfully."}, status=status.HTTP_201_CREATED)
         except Classrooms.DoesNotExist:
             return Response({"error": "Classroom not found."}, status=status.HTTP_404_NOT_FOUND)
+        except SlotTaken as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -9,7 +9,11 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -88,9 +92,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # On disk, so tests with several threads see SQLite's real locking rather than shared-cache table locks
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# The timetable version counter and every cached timetable live here (schedule.queries). The cache must be shared
+# by all processes that read or write timetables (web workers, the job pool, generate_timetable and
+# timetable_snapshot), or a bump in one leaves the others serving stale timetables; the per-process LocMemCache
+# default is not. Use Redis or Memcached where the processes do not share a disk
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TIMETABLE_CACHE_DIR', BASE_DIR / '.cache'),
+    }
+}
+# Like the database, test runs get a cache of their own rather than reading and bumping the real one. Processes
+# the tests start find it through TIMETABLE_CACHE_DIR
+if sys.argv[1:2] == ['test'] and 'TIMETABLE_CACHE_DIR' not in os.environ:
+    CACHES['default']['LOCATION'] = tempfile.mkdtemp(prefix='timetable-test-cache-')
+    atexit.register(shutil.rmtree, CACHES['default']['LOCATION'], ignore_errors=True)
+
 GRAPH_MODELS = {
     'all_applications': True,
     'group_models': True,
@@ -134,6 +156,34 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        # Set to DEBUG to follow every scheduling phase
+        'schedule': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Worker threads for background timetable generation jobs (schedule.jobs)
+SCHEDULE_JOB_WORKERS = 1
+
+# Soft-constraint weights of generated timetables (schedule.scoring.SoftWeights), e.g. {'off_hours': 2,
+# 'preferred_hours': 0b00111111} to keep lectures out of the last two hours, and local search steps per lecture
+SCHEDULE_SOFT_WEIGHTS = {}
+SCHEDULE_SEARCH_STEPS = 10
+
+# Daily breaks of every class (schedule.breaks.BreakPolicy): windows of clock hours each holding one break a day,
+# e.g. {'windows': [(10, 12), (12, 14, 1)], 'align': 'cohort'} for a morning break and a lunch break shared by
+# the classes of a cohort. The default is one hour between 11 AM and 2 PM, staggered per class
+SCHEDULE_BREAKS = {}
+
 REST_FRAMEWORK = {'DEFAULT_PERMISSION_CLASSES': [
     'rest_framework.permissions.AllowAny'
 ]}